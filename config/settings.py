@@ -14,11 +14,41 @@ class Config:
     
     # Database
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data/knowledge_base.db")
+    KB_SNAPSHOT_PATH = os.getenv("KB_SNAPSHOT_PATH", "data/knowledge_base.snapshot")  # empty disables
+    KB_SNAPSHOT_VERIFY = os.getenv("KB_SNAPSHOT_VERIFY", "False").lower() == "true"  # checksum on open
+    SHARD_URLS = [u for u in os.getenv("SHARD_URLS", "").split(",") if u]  # empty: search the local KB
+    SHARD_TIMEOUT_MS = int(os.getenv("SHARD_TIMEOUT_MS", "500"))
+
+    # Near-duplicate merging of collected records at ingestion (MinHash + LSH)
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "True").lower() == "true"
+    DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))  # estimated Jaccard to merge
+    DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "120"))
+    DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "20"))  # must divide DEDUP_NUM_PERM
+    DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "2"))  # words per shingle
+    # Records merge only when these agree after normalization (empty: text similarity alone)
+    DEDUP_KEY_FIELDS = [f for f in os.getenv("DEDUP_KEY_FIELDS", "country,university,program").split(",") if f]
+    DEDUP_MAX_BUCKET = int(os.getenv("DEDUP_MAX_BUCKET", "100"))
+    # field:strategy pairs (first | longest | union | max | min); other fields take the first value
+    DEDUP_FIELD_PRECEDENCE = dict(p.split(":", 1) for p in os.getenv(
+        "DEDUP_FIELD_PRECEDENCE", "requirements:union,subjects:union,features:union,description:longest"
+    ).split(",") if ":" in p)
+    DEDUP_SOURCE_PRECEDENCE = [s for s in os.getenv("DEDUP_SOURCE_PRECEDENCE", "").split(",") if s]  # most trusted first
     
     # AI/ML Settings
     AI_MODEL = os.getenv("AI_MODEL", "gpt-3.5-turbo")
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"
     SIMILARITY_THRESHOLD = 0.7
+    EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "True").lower() == "true"  # dynamic int8 Linear layers
+    EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "4096"))  # padded tokens per batch
+    EMBEDDING_INTRA_OP_THREADS = int(os.getenv("EMBEDDING_INTRA_OP_THREADS", "0")) or None  # default: CPU count
+    EMBEDDING_INTER_OP_THREADS = int(os.getenv("EMBEDDING_INTER_OP_THREADS", "1"))
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.db")  # empty disables
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+    EMBEDDING_PRECISION = os.getenv("EMBEDDING_PRECISION", "int8")  # float32 | int8 | binary
+    EMBEDDING_BINARY_PREFILTER = os.getenv("EMBEDDING_BINARY_PREFILTER", "False").lower() == "true"
+    # Prefilter candidates: at least RERANK_K, and RERANK_FRACTION of the store as it grows
+    EMBEDDING_RERANK_K = int(os.getenv("EMBEDDING_RERANK_K", "50"))
+    EMBEDDING_RERANK_FRACTION = float(os.getenv("EMBEDDING_RERANK_FRACTION", "0.01"))
     
     # WhatsApp
     WHATSAPP_ENABLED = os.getenv("WHATSAPP_ENABLED", "False").lower() == "true"
@@ -29,6 +59,25 @@ class Config:
     # Web
     SECRET_KEY = os.getenv("SECRET_KEY", "elimuhub-secret-key-2024")
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))  # cached search response bodies
+    
+    # Local FX table used to normalize tuition fees (units of USD per 1 unit of currency)
+    FX_RATES_TO_USD = {
+        "USD": 1.0,
+        "GBP": 1.27,
+        "EUR": 1.08,
+        "CAD": 0.73,
+        "AUD": 0.66,
+        "KES": 0.0077
+    }
+    
+    # Tuition bands used as a search facet: (upper bound in USD/year or None, label)
+    TUITION_BANDS_USD = [
+        (20000, "under_20k"),
+        (40000, "20k_40k"),
+        (60000, "40k_60k"),
+        (None, "60k_plus")
+    ]
     
     # Knowledge Base Categories
     CATEGORIES = [
@@ -45,5 +94,41 @@ class Config:
     ESCALATION_THRESHOLD = 3  # Number of unsuccessful attempts before escalation
     SUPPORT_EMAIL = "support@elimuhub.com"
     SUPPORT_PHONE = "+254700000000"
+    ESCALATION_DEDUP_WINDOW_SECONDS = int(os.getenv("ESCALATION_DEDUP_WINDOW_SECONDS", "900"))
+    ESCALATION_COALESCE_SECONDS = float(os.getenv("ESCALATION_COALESCE_SECONDS", "5"))
+    ESCALATION_LOG_PATH = os.getenv("ESCALATION_LOG_PATH", "data/escalations.jsonl")
+    ESCALATION_WEBHOOK_URL = os.getenv("ESCALATION_WEBHOOK_URL")
+    ESCALATION_SMTP_HOST = os.getenv("ESCALATION_SMTP_HOST")
+    ESCALATION_SMTP_PORT = int(os.getenv("ESCALATION_SMTP_PORT", "25"))
+    ESCALATION_SMTP_SENDER = os.getenv("ESCALATION_SMTP_SENDER", "noreply@elimuhub.com")
+
+    # Feedback
+    INTERACTION_LOG_PATH = os.getenv("INTERACTION_LOG_PATH", "data/interactions.jsonl")
+    FEEDBACK_LOG_PATH = os.getenv("FEEDBACK_LOG_PATH", "data/feedback.jsonl")
+
+    # Conversation State
+    CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+    CONVERSATION_TTL_SECONDS = int(os.getenv("CONVERSATION_TTL_SECONDS", "1800"))
+    CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH")  # e.g. data/conversations.db
+    ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2048"))
+    ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+    # Admission Control (chat API load shedding)
+    ADMISSION_GLOBAL_RATE = float(os.getenv("ADMISSION_GLOBAL_RATE", "50"))  # inference requests/s
+    ADMISSION_GLOBAL_BURST = int(os.getenv("ADMISSION_GLOBAL_BURST", "100"))
+    ADMISSION_SESSION_RATE = float(os.getenv("ADMISSION_SESSION_RATE", "1"))  # requests/s per session
+    ADMISSION_SESSION_BURST = int(os.getenv("ADMISSION_SESSION_BURST", "5"))
+    ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(os.cpu_count() or 1)))
+    ADMISSION_QUEUE_TIMEOUT_MS = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "100"))
+    # Reverse proxies in front of the app that append to X-Forwarded-For (0: use the peer address)
+    ADMISSION_TRUSTED_PROXIES = int(os.getenv("ADMISSION_TRUSTED_PROXIES", "0"))
+
+    # Latency budget per chat request; cheaper answer tiers are used as it runs out (0 disables)
+    CHAT_BUDGET_MS = int(os.getenv("CHAT_BUDGET_MS", "800"))
+
+    # Offline batch answering (--batch)
+    BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "0"))  # 0: one per CPU
+    BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "256"))  # questions per worker task
+    BATCH_LOG_INTERVAL_S = float(os.getenv("BATCH_LOG_INTERVAL_S", "5"))
 
 config = Config()
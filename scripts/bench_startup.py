@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Import-time report and startup budget check for each CLI mode of src/main.py.
+
+Usage:
+    python scripts/bench_startup.py                    # report + check against the budget
+    python scripts/bench_startup.py --command web --repeat 5
+    python scripts/bench_startup.py --update-budget    # re-baseline from this machine
+
+Every command in src.main.COMMAND_IMPORTS is imported in a fresh interpreter under
+``python -X importtime``. The report lists the total import time, process wall time
+and the heaviest top-level imports, and is written to benchmarks/startup_report.json.
+The script exits with status 1 when a command goes over its budget in
+benchmarks/startup_budget.json or imports one of the modules listed as forbidden for
+it there (e.g. torch for --init-kb), so it can run as a CI check; tests/test_startup.py
+runs the same check for every command. Commands whose modules aren't part of this
+install (the WhatsApp bot) are skipped.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from statistics import median
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = ROOT / "benchmarks" / "startup_budget.json"
+REPORT_FILE = ROOT / "benchmarks" / "startup_report.json"
+# Slack added over the measured time when re-baselining
+BUDGET_HEADROOM = 1.5
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Rows of ``-X importtime`` output as dicts with self/cumulative microseconds and depth."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                     "depth": depth})
+    return rows
+
+
+def measure(command: str) -> Dict:
+    """Import ``command``'s modules in a fresh interpreter; returns timings and top imports."""
+    code = f"from src.main import import_command; import_command({command!r})"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    rows = parse_importtime(proc.stderr)
+    if proc.returncode != 0:
+        error = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        return {"command": command, "error": "\n".join(error[-3:])}
+    top_depth = min((r["depth"] for r in rows), default=0)
+    top_level = [r for r in rows if r["depth"] == top_depth]
+    return {
+        "command": command,
+        "import_ms": round(sum(r["cumulative_us"] for r in top_level) / 1000, 1),
+        "wall_ms": round(wall_ms, 1),
+        "modules": len(rows),
+        "imported": sorted({r["module"].split(".", 1)[0] for r in rows}),
+        "heaviest": [
+            {"module": r["module"], "cumulative_ms": round(r["cumulative_us"] / 1000, 1)}
+            for r in sorted(top_level, key=lambda r: r["cumulative_us"], reverse=True)[:10]
+        ],
+    }
+
+
+def run(command: str, repeat: int) -> Dict:
+    # Median of several runs; the first also warms the bytecode cache
+    runs = [measure(command) for _ in range(repeat)]
+    if any("error" in r for r in runs):
+        return next(r for r in runs if "error" in r)
+    result = dict(runs[len(runs) // 2])
+    result["import_ms"] = median(r["import_ms"] for r in runs)
+    result["wall_ms"] = median(r["wall_ms"] for r in runs)
+    return result
+
+
+def load_budget() -> Dict:
+    return json.loads(BUDGET_FILE.read_text()) if BUDGET_FILE.exists() else {}
+
+
+def budget_status(result: Dict, budget: Dict) -> str:
+    """"ok", "OVER BUDGET" or the forbidden modules ``result``'s command imported."""
+    limit = budget.get("import_ms", {}).get(result["command"])
+    leaked = sorted(set(budget.get("forbidden", {}).get(result["command"], ())) & set(result["imported"]))
+    if leaked:
+        return "imports " + ", ".join(leaked)
+    return "ok" if limit is None or result["import_ms"] <= limit else "OVER BUDGET"
+
+
+def main():
+    sys.path.insert(0, str(ROOT))
+    from src.main import COMMAND_IMPORTS, command_available
+
+    parser = argparse.ArgumentParser(description="CLI startup import-time benchmark")
+    parser.add_argument("--command", action="append", choices=sorted(COMMAND_IMPORTS),
+                        help="Command(s) to measure (default: all)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--update-budget", action="store_true",
+                        help=f"Write measured import times x{BUDGET_HEADROOM} as the new budget")
+    parser.add_argument("--report", default=str(REPORT_FILE))
+    args = parser.parse_args()
+
+    budget = load_budget()
+    commands = args.command or sorted(COMMAND_IMPORTS)
+    for command in commands:
+        if not command_available(command):
+            print(f"{command:<10} not installed, skipped")
+    results = [run(c, args.repeat) for c in commands if command_available(c)]
+
+    failures = []
+    for r in results:
+        limit = budget.get("import_ms", {}).get(r["command"])
+        if "error" in r:
+            failures.append(r["command"])
+            print(f"{r['command']:<10} import failed: {r['error']}")
+            continue
+        status = budget_status(r, budget)
+        if status != "ok":
+            failures.append(r["command"])
+        print(f"{r['command']:<10} import {r['import_ms']:>8.1f} ms  wall {r['wall_ms']:>8.1f} ms  "
+              f"budget {limit if limit is not None else '-':>8} ms  {status}")
+        for h in r["heaviest"][:3]:
+            print(f"{'':<12}{h['module']:<40}{h['cumulative_ms']:>8.1f} ms")
+
+    Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.report).write_text(json.dumps({"python": sys.version.split()[0], "results": results}, indent=2))
+
+    if args.update_budget:
+        measured = {r["command"]: round(r["import_ms"] * BUDGET_HEADROOM) for r in results if "error" not in r}
+        budget.setdefault("import_ms", {}).update(measured)
+        BUDGET_FILE.write_text(json.dumps(budget, indent=2) + "\n")
+        print(f"Budget updated in {BUDGET_FILE}")
+        return 0
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
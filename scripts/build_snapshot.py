@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Build the knowledge-base snapshot bundle that workers mmap at startup.
+
+Usage:
+    python scripts/build_snapshot.py
+    python scripts/build_snapshot.py --with-embeddings --output data/knowledge_base.snapshot
+
+Reads data/knowledge_base_aggregated.json (running the KB processor first if it is
+missing) and writes one file holding the records, search/program/facet indexes and,
+when available, the trained intent model arrays and FAQ question embeddings. The
+snapshot is re-opened and checksum-verified before the script exits.
+"""
+
+import argparse
+import json
+import logging
+import pickle
+import sys
+import time
+from pathlib import Path
+from src.knowledge_base.snapshot import KnowledgeBaseSnapshot, build_snapshot
+from config.settings import config as settings
+
+
+def load_kb(path: Path):
+    if not path.exists():
+        from src.knowledge_base.processor import KnowledgeBaseProcessor
+        KnowledgeBaseProcessor().process_and_store()
+    return json.loads(path.read_text())
+
+
+def load_intent_model(path: Path):
+    if not path.exists():
+        logging.info("No intent model at %s; snapshot will not include one", path)
+        return None
+    from src.ai_engine.intent_classifier import ArrayIntentModel
+    with open(path, "rb") as f:
+        return ArrayIntentModel.from_pipeline(pickle.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the KB snapshot bundle")
+    parser.add_argument("--kb", default="data/knowledge_base_aggregated.json", help="Aggregated KB JSON")
+    parser.add_argument("--output", default=settings.KB_SNAPSHOT_PATH or "data/knowledge_base.snapshot")
+    parser.add_argument("--model", default="models/intent_classifier.pkl", help="Trained intent classifier")
+    parser.add_argument("--with-embeddings", action="store_true",
+                        help="Embed FAQ questions (loads the sentence-transformer model)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    kb = load_kb(Path(args.kb))
+    intent_model = load_intent_model(Path(args.model))
+
+    embeddings, model_id = None, None
+    if args.with_embeddings:
+        from src.ai_engine.embedding_engine import CPUEmbeddingEngine
+        engine = CPUEmbeddingEngine()
+        questions = [item["question"] for item in kb.get("faqs", []) if "question" in item]
+        embeddings, model_id = engine.encode_many(questions), engine.model_id
+
+    manifest = build_snapshot(kb, args.output, intent_model=intent_model,
+                              question_embeddings=embeddings, embedding_model_id=model_id,
+                              app_version=settings.VERSION)
+
+    start = time.perf_counter()
+    snapshot = KnowledgeBaseSnapshot(args.output)
+    open_ms = (time.perf_counter() - start) * 1000
+    snapshot.verify()
+    snapshot.close()
+    print(json.dumps({
+        "path": args.output,
+        "bytes": Path(args.output).stat().st_size,
+        "kb_version": manifest["kb_version"],
+        "counts": manifest["counts"],
+        "sections": len(manifest["sections"]),
+        "intent_model": intent_model is not None,
+        "question_embeddings": embeddings is not None,
+        "open_ms": round(open_ms, 3),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
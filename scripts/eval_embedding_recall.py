@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Measure recall@k and memory of the quantized question store against exact float32 search.
+
+Usage:
+    python scripts/eval_embedding_recall.py                      # FAQ embeddings from the KB snapshot
+    python scripts/eval_embedding_recall.py --embeddings faq.npy --queries 500
+    python scripts/eval_embedding_recall.py --synthetic 50000 --clusters 500
+
+float32, int8 (with and without the binary prefilter) and binary stores are evaluated,
+using the EMBEDDING_RERANK_K / EMBEDDING_RERANK_FRACTION settings. Queries are a sample of the
+stored vectors plus a little noise. Binary stores keep no float vectors and re-rank
+against the +/-1 sign codes, so their recall is that of the codes alone. Run it after changing the embedding model or the
+quantization settings; index builds don't measure recall themselves.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+# Run as a script from anywhere: the app is imported as ``src.*`` / ``config.*`` from the repository root
+sys.path.insert(0, str(ROOT))
+
+from src.ai_engine.embedding_store import EmbeddingStore, normalize, recall_at_k
+from src.knowledge_base.snapshot import KnowledgeBaseSnapshot
+from config.settings import config as settings
+
+
+def clustered_embeddings(n: int, clusters: int, dim: int = 384, spread: float = 0.35, seed: int = 0) -> np.ndarray:
+    """Synthetic embeddings bunched around ``clusters`` centres, like paraphrased FAQ questions."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    return (centres[rng.integers(0, clusters, n)] + spread * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def load_embeddings(args) -> np.ndarray:
+    if args.synthetic:
+        return clustered_embeddings(args.synthetic, args.clusters)
+    if args.embeddings:
+        return np.load(args.embeddings)
+    snapshot = KnowledgeBaseSnapshot(Path(settings.KB_SNAPSHOT_PATH))
+    if "questions.embeddings" not in snapshot:
+        raise SystemExit("Snapshot has no question embeddings; build it with --with-embeddings")
+    return np.asarray(snapshot.array("questions.embeddings"), dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall of quantized embedding search")
+    parser.add_argument("--embeddings", help=".npy file of embeddings (default: KB snapshot FAQ embeddings)")
+    parser.add_argument("--synthetic", type=int, help="Use this many synthetic clustered embeddings instead")
+    parser.add_argument("--clusters", type=int, default=500, help="Clusters in the synthetic embeddings")
+    parser.add_argument("--queries", type=int, default=200, help="Sampled queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", help="Write the JSON results to this path")
+    args = parser.parse_args()
+
+    # Normalized once; every store below is built from the same unit vectors
+    embeddings = normalize(load_embeddings(args))
+    rng = np.random.default_rng(1)
+    sample = embeddings[rng.choice(len(embeddings), min(args.queries, len(embeddings)), replace=False)]
+    queries = sample + 0.05 * rng.normal(size=sample.shape).astype(np.float32)
+
+    # Binary search always ranks by Hamming distance first, so it has no unfiltered variant
+    configs = [("float32", False), ("int8", False), ("int8", True), ("binary", True)]
+    results = []
+    for precision, prefilter in configs:
+        store = EmbeddingStore(precision, settings.EMBEDDING_RERANK_K, prefilter,
+                               settings.EMBEDDING_RERANK_FRACTION).build(embeddings, normalized=True)
+        report = recall_at_k(store, embeddings, queries, args.k)
+        report["prefilter"] = store.bits is not None
+        report["candidates"] = store.candidate_count if store.bits is not None else store.size
+        results.append(report)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
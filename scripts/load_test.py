@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Replay chat transcripts against a running Elimuhub web server and report latency.
+
+Usage:
+    python scripts/load_test.py --rate 50 --concurrency 16 --duration 30
+    python scripts/load_test.py --transcripts transcripts.jsonl --server-mode sync --output report.json
+
+Requests are scheduled open-loop: arrival times are fixed up front from --rate, so a
+slow server does not slow the load down. Each request is timed twice: from when it was
+actually sent ("service" latency) and from when it was scheduled to be sent
+("corrected" latency, which accounts for coordinated omission). With --rate 0 the
+driver runs closed-loop, each connection sending back-to-back.
+
+Transcript lines are JSON objects, either {"messages": ["...", "..."]} for a
+conversation replayed turn by turn against /api/chat, or {"query": "...", "category": "..."}
+for a /api/knowledge-base/search request.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+logger = logging.getLogger("load_test")
+
+CHAT_PATH = "/api/chat"
+SEARCH_PATH = "/api/knowledge-base/search"
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+SYNTHETIC_CONVERSATIONS = [
+    ["I want to study computer science in USA", "what about the UK?"],
+    ["What are the visa requirements for Canada?", "what about Australia?"],
+    ["How do I apply to universities in the UK?"],
+    ["IGCSE tuition fees", "and A-Levels?"],
+    ["Best universities in Canada for business"],
+    ["SAT preparation courses"],
+]
+SYNTHETIC_QUERIES = [
+    {"query": "visa"},
+    {"query": "computer science"},
+    {"query": "ielts", "category": "study_abroad_programs"},
+    {"query": "igcse", "category": "tuition_programs"},
+]
+
+
+class HTTPConnection:
+    """Minimal keep-alive HTTP/1.1 client on asyncio streams."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b"",
+                      headers: Dict[str, str] = None) -> Tuple[int, Dict[str, str], bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(body)}"]
+        for k, v in (headers or {}).items():
+            lines.append(f"{k}: {v}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        version, status = status_line.decode("latin-1").split(" ", 2)[:2]
+        resp_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = line.decode("latin-1").partition(":")
+            resp_headers[k.strip().lower()] = v.strip()
+
+        if resp_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            resp_body = b"".join(chunks)
+        elif "content-length" in resp_headers:
+            resp_body = await self.reader.readexactly(int(resp_headers["content-length"]))
+        else:
+            resp_body = await self.reader.read()
+
+        if version == "HTTP/1.0" or resp_headers.get("connection", "").lower() == "close" \
+                or "content-length" not in resp_headers and "transfer-encoding" not in resp_headers:
+            await self.close()
+        return int(status), resp_headers, resp_body
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+        self.reader = self.writer = None
+
+
+class Conversation:
+    """A transcript being replayed; keeps the session cookie and conversation id between turns."""
+
+    def __init__(self, messages: List[str]):
+        self.messages = messages
+        self.turn = 0
+        self.cookie = None
+        self.conversation_id = None
+        self._lock = None
+
+    def lock(self) -> asyncio.Lock:
+        # Created on first use so it belongs to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def next_message(self) -> str:
+        message = self.messages[self.turn % len(self.messages)]
+        self.turn += 1
+        return message
+
+    def next_body(self) -> bytes:
+        body = {"message": self.next_message()}
+        if self.conversation_id:
+            body["conversation_id"] = self.conversation_id
+        return json.dumps(body).encode("utf-8")
+
+    def record_reply(self, headers: Dict[str, str], body: bytes):
+        if "set-cookie" in headers:
+            self.cookie = headers["set-cookie"].split(";", 1)[0]
+        try:
+            self.conversation_id = json.loads(body).get("conversation_id") or self.conversation_id
+        except (ValueError, AttributeError):
+            pass
+
+
+def load_workload(path: Optional[str]) -> Tuple[List[List[str]], List[Dict]]:
+    """Return (conversations, search queries) from a transcript file or the synthetic set."""
+    if not path:
+        return SYNTHETIC_CONVERSATIONS, SYNTHETIC_QUERIES
+    conversations, queries = [], []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if "messages" in item:
+                conversations.append(item["messages"])
+            elif "message" in item:
+                conversations.append([item["message"]])
+            elif "query" in item:
+                queries.append(item)
+    return conversations or SYNTHETIC_CONVERSATIONS, queries or SYNTHETIC_QUERIES
+
+
+class LoadDriver:
+    def __init__(self, base_url: str, conversations: List[List[str]], queries: List[Dict],
+                 rate: float, concurrency: int, duration: float, search_ratio: float,
+                 arrival: str = "poisson", seed: int = 0, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 80
+        self.rate = rate
+        self.concurrency = concurrency
+        self.duration = duration
+        self.search_ratio = search_ratio
+        self.arrival = arrival
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        # Open enough conversations that each connection usually has its own
+        copies = max(1, concurrency // len(conversations) + 1)
+        self.conversations = itertools.cycle([Conversation(list(m)) for _ in range(copies) for m in conversations])
+        self.queries = itertools.cycle(queries)
+        self.samples: List[Dict] = []
+
+    def _next_request(self) -> Dict:
+        if self.random.random() < self.search_ratio:
+            q = next(self.queries)
+            params = {"q": q["query"]}
+            if q.get("category"):
+                params["category"] = q["category"]
+            return {"endpoint": SEARCH_PATH, "method": "GET", "path": f"{SEARCH_PATH}?{urlencode(params)}"}
+        # The message is picked when the turn is sent, after the conversation's previous turn
+        return {"endpoint": CHAT_PATH, "method": "POST", "path": CHAT_PATH, "conversation": next(self.conversations)}
+
+    async def _send(self, conn: HTTPConnection, req: Dict, intended: float):
+        conv = req.get("conversation")
+        if conv is None:
+            await self._send_now(conn, req, intended)
+            return
+        # Turns of one conversation go one at a time so each carries the previous turn's cookie
+        # and conversation id; time spent waiting for the previous turn counts as latency
+        async with conv.lock():
+            await self._send_now(conn, dict(req, body=conv.next_body()), intended, conv)
+
+    async def _send_now(self, conn: HTTPConnection, req: Dict, intended: float, conv: Conversation = None):
+        headers = {"Accept-Encoding": "identity"}
+        if req["method"] == "POST":
+            headers["Content-Type"] = "application/json"
+        if conv is not None and conv.cookie:
+            headers["Cookie"] = conv.cookie
+        started = time.perf_counter()
+        status, error = 0, None
+        try:
+            status, resp_headers, resp_body = await asyncio.wait_for(
+                conn.request(req["method"], req["path"], req.get("body", b""), headers), self.timeout
+            )
+            if conv is not None:
+                conv.record_reply(resp_headers, resp_body)
+        except Exception as e:
+            error = type(e).__name__
+            await conn.close()
+        finished = time.perf_counter()
+        self.samples.append({
+            "endpoint": req["endpoint"],
+            "status": status,
+            "error": error or (None if 200 <= status < 400 else f"HTTP {status}"),
+            "service": finished - started,
+            "corrected": finished - intended,
+            "finished": finished,
+        })
+
+    async def _worker(self, queue: "asyncio.Queue"):
+        conn = HTTPConnection(self.host, self.port)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                intended, req = item
+                await self._send(conn, req, intended)
+        finally:
+            await conn.close()
+
+    async def _closed_loop_worker(self, end: float):
+        conn = HTTPConnection(self.host, self.port)
+        try:
+            while time.perf_counter() < end:
+                await self._send(conn, self._next_request(), time.perf_counter())
+        finally:
+            await conn.close()
+
+    async def run(self) -> float:
+        """Generate load for ``duration`` seconds; returns the wall-clock time taken."""
+        start = time.perf_counter()
+        if self.rate <= 0:
+            end = start + self.duration
+            await asyncio.gather(*(self._closed_loop_worker(end) for _ in range(self.concurrency)))
+            return time.perf_counter() - start
+
+        queue: "asyncio.Queue" = asyncio.Queue()
+        workers = [asyncio.ensure_future(self._worker(queue)) for _ in range(self.concurrency)]
+        intended = start
+        while True:
+            gap = self.random.expovariate(self.rate) if self.arrival == "poisson" else 1.0 / self.rate
+            intended += gap
+            if intended - start > self.duration:
+                break
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Queue even when every connection is busy: waiting time counts against latency
+            queue.put_nowait((intended, self._next_request()))
+        for _ in workers:
+            queue.put_nowait(None)
+        await asyncio.gather(*workers)
+        return time.perf_counter() - start
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples: List[Dict], elapsed: float) -> Dict:
+    errors = sum(1 for s in samples if s["error"])
+    summary = {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput_rps": (len(samples) - errors) / elapsed if elapsed else 0.0,
+    }
+    for key in ("service", "corrected"):
+        values = sorted(s[key] * 1000.0 for s in samples)
+        latency = {f"p{p:g}": round(percentile(values, p), 3) for p in PERCENTILES}
+        latency["mean"] = round(sum(values) / len(values), 3) if values else 0.0
+        latency["max"] = round(values[-1], 3) if values else 0.0
+        summary[f"{key}_latency_ms"] = latency
+    return summary
+
+
+def build_report(driver: LoadDriver, elapsed: float, server_mode: str) -> Dict:
+    by_endpoint: Dict[str, List[Dict]] = {}
+    for s in driver.samples:
+        by_endpoint.setdefault(s["endpoint"], []).append(s)
+    return {
+        "server_mode": server_mode,
+        "config": {
+            "target": f"{driver.host}:{driver.port}",
+            "rate": driver.rate,
+            "arrival": driver.arrival if driver.rate > 0 else "closed-loop",
+            "concurrency": driver.concurrency,
+            "duration_s": driver.duration,
+            "search_ratio": driver.search_ratio,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize(driver.samples, elapsed),
+        "endpoints": {ep: summarize(samples, elapsed) for ep, samples in sorted(by_endpoint.items())},
+    }
+
+
+def print_report(report: Dict):
+    print(f"Server mode: {report['server_mode']}  target: {report['config']['target']}  "
+          f"elapsed: {report['elapsed_s']}s")
+    for name, stats in [("overall", report["overall"])] + list(report["endpoints"].items()):
+        svc, cor = stats["service_latency_ms"], stats["corrected_latency_ms"]
+        print(f"{name:32s} n={stats['requests']:<7d} err={stats['error_rate']:.2%} "
+              f"rps={stats['throughput_rps']:.1f}")
+        print(f"{'':32s} service   p50={svc['p50']}ms p99={svc['p99']}ms max={svc['max']}ms")
+        print(f"{'':32s} corrected p50={cor['p50']}ms p99={cor['p99']}ms max={cor['max']}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Elimuhub web API load generator")
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument("--transcripts", help="JSONL file of recorded transcripts (default: synthetic)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Arrival rate in requests/s (0 = closed loop)")
+    parser.add_argument("--arrival", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of client connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load to generate")
+    parser.add_argument("--search-ratio", type=float, default=0.2,
+                        help="Fraction of requests sent to the knowledge-base search endpoint")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server-mode", default="sync", help="Label recorded in the report, e.g. sync/async")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    conversations, queries = load_workload(args.transcripts)
+    driver = LoadDriver(args.base_url, conversations, queries, args.rate, args.concurrency,
+                        args.duration, args.search_ratio, args.arrival, args.seed, args.timeout)
+    elapsed = asyncio.run(driver.run())
+    report = build_report(driver, elapsed, args.server_mode)
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        logger.info("Report written to %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Partition the knowledge base into shards and serve them.
+
+Usage:
+    # Write shard files for deployment on separate nodes
+    python scripts/run_shards.py partition --shards 4 --by country --out-dir data/shards
+    # On each node: serve one shard file
+    python scripts/run_shards.py serve data/shards/shard-0.json --host 0.0.0.0 --port 8101
+    # Everything on this machine, one process per shard (prints SHARD_URLS)
+    python scripts/run_shards.py local --shards 4 --by hash
+
+Point the web app at the shard servers with SHARD_URLS=http://node1:8101,http://node2:8101
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from src.knowledge_base.sharding import (PARTITION_SCHEMES, LocalShardCluster, partition_kb,
+                                         serve_shard, write_shards)
+
+
+def load_kb(path: str):
+    return json.loads(Path(path).read_text())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard the knowledge base")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    part = sub.add_parser("partition", help="Write one file per shard")
+    part.add_argument("--kb", default="data/knowledge_base_aggregated.json")
+    part.add_argument("--shards", type=int, default=4)
+    part.add_argument("--by", choices=PARTITION_SCHEMES, default="country")
+    part.add_argument("--out-dir", default="data/shards")
+
+    serve = sub.add_parser("serve", help="Serve one shard file")
+    serve.add_argument("shard_file")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8101)
+
+    local = sub.add_parser("local", help="Run every shard as a local process")
+    local.add_argument("--kb", default="data/knowledge_base_aggregated.json")
+    local.add_argument("--shards", type=int, default=4)
+    local.add_argument("--by", choices=PARTITION_SCHEMES, default="country")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "partition":
+        shards = partition_kb(load_kb(args.kb), args.shards, args.by)
+        for path, shard in zip(write_shards(shards, Path(args.out_dir)), shards):
+            print(f"{path}: {len(shard['item_seqs'])} items, {len(shard['program_seqs'])} programs")
+    elif args.command == "serve":
+        serve_shard(args.shard_file, args.host, args.port)
+    else:
+        with LocalShardCluster(load_kb(args.kb), args.shards, args.by) as cluster:
+            print("SHARD_URLS=" + ",".join(cluster.urls), flush=True)
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
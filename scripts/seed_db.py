@@ -12,6 +12,9 @@ import sqlite3
 from pathlib import Path
 import logging
 from src.utils.logger import setup_logger
+from src.knowledge_base.normalizers import annotate_program
+from src.knowledge_base.dedup import Deduplicator
+from config.settings import config as settings
 
 def load_json(file_path: Path):
     try:
@@ -48,19 +51,30 @@ def seed_db():
         tuition_fee TEXT,
         requirements TEXT,
         deadline TEXT,
-        scholarship_available INTEGER
+        scholarship_available INTEGER,
+        tuition_fee_amount REAL,
+        tuition_fee_currency TEXT,
+        tuition_fee_usd REAL,
+        deadline_day INTEGER
     )
     """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_programs_fee_usd ON programs (tuition_fee_usd)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_programs_deadline_day ON programs (deadline_day)")
 
     # Load programs
     prog_file = sample_dir / "study_abroad_programs.json"
     programs = load_json(prog_file) or []
+    if settings.DEDUP_ENABLED:
+        # Same near-duplicate merging as KnowledgeBaseProcessor.process_and_store
+        programs = Deduplicator().dedup(programs)
     for p in programs:
         try:
+            annotate_program(p)
             c.execute("""
             INSERT OR REPLACE INTO programs (
-                id, country, university, program, duration, tuition_fee, requirements, deadline, scholarship_available
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                id, country, university, program, duration, tuition_fee, requirements, deadline, scholarship_available,
+                tuition_fee_amount, tuition_fee_currency, tuition_fee_usd, deadline_day
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 p.get("id"),
                 p.get("country"),
@@ -70,11 +84,31 @@ def seed_db():
                 p.get("tuition_fee"),
                 json.dumps(p.get("requirements", [])),
                 p.get("deadline"),
-                int(bool(p.get("scholarship_available")))
+                int(bool(p.get("scholarship_available"))),
+                p.get("tuition_fee_amount"),
+                p.get("tuition_fee_currency"),
+                p.get("tuition_fee_usd"),
+                p.get("deadline_day")
             ))
         except Exception as e:
             logger.exception("Failed to insert program %s: %s", p.get("id"), e)
 
+    # Numeric requirement minimums, one row per (program, test)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS program_requirements (
+        program_id TEXT,
+        test TEXT,
+        minimum REAL,
+        PRIMARY KEY (program_id, test)
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_requirements_test_minimum ON program_requirements (test, minimum)")
+    for p in programs:
+        c.executemany(
+            "INSERT OR REPLACE INTO program_requirements (program_id, test, minimum) VALUES (?, ?, ?)",
+            [(p.get("id"), test, minimum) for test, minimum in p.get("requirement_thresholds", {}).items()]
+        )
+
     # Create a simple visas table
     c.execute("""
     CREATE TABLE IF NOT EXISTS visas (
@@ -0,0 +1,47 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class AnswerCache:
+    """Bounded LRU of answers to context-free questions, keyed by normalized message.
+
+    Only turns that did not depend on earlier conversation state are cached, so a hit
+    can be served without classification, entity extraction or KB lookups.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["stored_at"] > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, **answer):
+        answer["stored_at"] = time.time()
+        with self._lock:
+            self._entries[key] = answer
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
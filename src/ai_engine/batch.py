@@ -0,0 +1,186 @@
+"""
+Offline batch answering: stream questions from JSONL through a process pool.
+
+Each worker process builds one ResponseGenerator (models, KB indexes) in its
+initializer and answers whole chunks: intents are classified with one vectorized
+predict_proba call per chunk and, unless disabled, the chunk's questions are
+embedded in one encode_many call, which also fills the shared on-disk embedding
+cache. Results are written in input order; only ``workers * IN_FLIGHT_PER_WORKER``
+chunks are held in memory at a time, so input size doesn't bound memory.
+"""
+
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+from src.utils.json_codec import dumps, loads
+from config.settings import config as settings
+
+logger = logging.getLogger(__name__)
+
+# Chunks queued per worker; enough to keep workers busy while the parent writes results
+IN_FLIGHT_PER_WORKER = 2
+# Fields accepted as the question text, in order of preference
+MESSAGE_FIELDS = ("message", "question", "text")
+
+# Per-process state, set by _init_worker
+_generator = None
+_embed = False
+
+
+def parse_line(line_no: int, line: str) -> Dict:
+    """Input record for one JSONL line: an object with a message field, or a bare JSON string."""
+    try:
+        value = loads(line)
+    except ValueError as e:
+        return {"line": line_no, "error": f"invalid JSON: {e}"}
+    if isinstance(value, str):
+        return {"line": line_no, "message": value}
+    if isinstance(value, dict):
+        message = next((value[f] for f in MESSAGE_FIELDS if isinstance(value.get(f), str)), None)
+        if message is not None:
+            return {"line": line_no, "id": value.get("id"), "message": message}
+    return {"line": line_no, "id": value.get("id") if isinstance(value, dict) else None,
+            "error": "no message field"}
+
+
+def read_records(lines: Iterable[str]) -> Iterator[Dict]:
+    for line_no, line in enumerate(lines, 1):
+        if line.strip():
+            yield parse_line(line_no, line)
+
+
+def chunked(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    it = iter(records)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _init_worker(embed: bool, intra_op_threads: Optional[int]):
+    """Load models and the KB once per worker process."""
+    global _generator, _embed
+    from src.ai_engine.response_generator import ResponseGenerator
+    # Split the cores between workers instead of every worker's torch using all of them
+    if intra_op_threads:
+        settings.EMBEDDING_INTRA_OP_THREADS = intra_op_threads
+    _generator = ResponseGenerator()
+    _embed = embed
+
+
+def answer_chunk(chunk: List[Dict]) -> List[Dict]:
+    """Answer one chunk in the current process; records that fail carry an ``error``."""
+    from src.ai_engine.deadline import RequestTrace
+    if _generator is None:
+        raise RuntimeError("batch worker not initialized")
+    valid = [r for r in chunk if "error" not in r]
+    messages = [r["message"] for r in valid]
+    try:
+        classifications = _generator.nlp.classify_intents(messages)
+    except Exception as e:
+        # Fall back to per-message classification inside generate_response
+        logger.warning(f"Batched intent classification failed: {e}")
+        classifications = [None] * len(valid)
+    if _embed and messages:
+        _generator.nlp.generate_embeddings(messages)
+    by_line = dict(zip((r["line"] for r in valid), classifications))
+
+    results = []
+    for record in chunk:
+        if "error" in record:
+            results.append(record)
+            continue
+        trace = RequestTrace()
+        try:
+            # Questions are answered independently: no conversation context across records
+            response, intent, confidence = _generator.generate_response(
+                record["message"], trace=trace, classification=by_line[record["line"]]
+            )
+        except Exception as e:
+            results.append({"line": record["line"], "id": record.get("id"), "error": str(e)})
+            continue
+        results.append({"line": record["line"], "id": record.get("id"), "message": record["message"],
+                        "response": response, "intent": intent, "confidence": float(confidence),
+                        "tier": trace.tier, "trace": trace.to_dict()})
+    return results
+
+
+class BatchStats:
+    """Progress and throughput of a batch run."""
+
+    def __init__(self, log_every: float = 5.0):
+        self.started = time.monotonic()
+        self.answered = 0
+        self.errors = 0
+        self.log_every = log_every
+        self._last_log = self.started
+
+    def record(self, results: List[Dict]):
+        self.errors += sum(1 for r in results if "error" in r)
+        self.answered += len(results)
+        now = time.monotonic()
+        if now - self._last_log >= self.log_every:
+            self._last_log = now
+            logger.info(f"Batch: {self.answered} answered, {self.errors} errors, "
+                        f"{self.throughput():.1f} questions/s")
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def throughput(self) -> float:
+        elapsed = self.elapsed()
+        return self.answered / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {"answered": self.answered, "errors": self.errors, "elapsed_s": round(self.elapsed(), 3),
+                "questions_per_s": round(self.throughput(), 2)}
+
+
+def run_batch(input_path: str, output_path: str = "-", workers: int = None, chunk_size: int = None,
+              embed: bool = True) -> Dict:
+    """Answer every question in ``input_path`` (JSONL, "-" for stdin) into ``output_path``.
+
+    Returns the run's stats: answered, errors, elapsed_s and questions_per_s.
+    """
+    workers = workers or settings.BATCH_WORKERS or os.cpu_count() or 1
+    chunk_size = chunk_size or settings.BATCH_CHUNK_SIZE
+    intra_op_threads = settings.EMBEDDING_INTRA_OP_THREADS or max(1, (os.cpu_count() or 1) // workers)
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+    stats = BatchStats(settings.BATCH_LOG_INTERVAL_S)
+
+    source = sys.stdin if input_path == "-" else open(input_path, encoding="utf-8")
+    sink = sys.stdout.buffer if output_path == "-" else open(output_path, "wb")
+    logger.info(f"Batch: {workers} workers, chunks of {chunk_size}, reading {input_path}")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(embed, intra_op_threads)) as pool:
+            pending = deque()
+            for chunk in chunked(read_records(source), chunk_size):
+                pending.append(pool.submit(answer_chunk, chunk))
+                # Write the oldest chunk before reading more, keeping output in input order
+                if len(pending) >= max_in_flight:
+                    _write(sink, pending.popleft().result(), stats)
+            while pending:
+                _write(sink, pending.popleft().result(), stats)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout.buffer:
+            sink.close()
+        else:
+            sink.flush()
+
+    summary = stats.to_dict()
+    logger.info(f"Batch done: {summary}")
+    return summary
+
+
+def _write(sink, results: List[Dict], stats: BatchStats):
+    sink.write(b"".join(dumps(r) + b"\n" for r in results))
+    stats.record(results)
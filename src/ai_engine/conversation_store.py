@@ -0,0 +1,198 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Expired states are swept once per this many updates, so the sqlite table can't grow without bound
+EVICT_EVERY_WRITES = 1000
+
+
+class ConversationState:
+    """Per-conversation context carried between turns."""
+
+    __slots__ = ("conversation_id", "intents", "entities", "candidates", "last_confidence", "updated_at")
+
+    def __init__(self, conversation_id: str, max_intents: int = 5):
+        self.conversation_id = conversation_id
+        self.intents = deque(maxlen=max_intents)
+        self.entities: Dict = {}
+        self.candidates: List[str] = []
+        self.last_confidence = 0.0
+        self.updated_at = time.time()
+
+    @property
+    def last_intent(self) -> Optional[str]:
+        return self.intents[-1] if self.intents else None
+
+    def to_dict(self) -> Dict:
+        return {
+            "conversation_id": self.conversation_id,
+            "intents": list(self.intents),
+            "entities": self.entities,
+            "candidates": self.candidates,
+            "last_confidence": self.last_confidence,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, max_intents: int = 5) -> "ConversationState":
+        state = cls(data["conversation_id"], max_intents=max_intents)
+        state.intents.extend(data.get("intents", []))
+        state.entities = data.get("entities", {})
+        state.candidates = data.get("candidates", [])
+        state.last_confidence = data.get("last_confidence", 0.0)
+        state.updated_at = data.get("updated_at", time.time())
+        return state
+
+
+class ConversationStore:
+    """Bounded in-memory LRU of conversation states with TTL eviction.
+
+    Lookups, updates and evictions are O(1). When ``db_path`` is given, states are
+    also written to a small sqlite table so they survive restarts and LRU eviction.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: int = 1800,
+                 db_path: Optional[str] = None, max_intents: int = 5):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_intents = max_intents
+        self._states: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS conversation_state (
+                    conversation_id TEXT PRIMARY KEY,
+                    state TEXT,
+                    updated_at REAL
+                )
+            """)
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, conversation_id: str) -> Optional[ConversationState]:
+        """Return the live state for a conversation, or None if unknown/expired."""
+        if not conversation_id:
+            return None
+        now = time.time()
+        with self._lock:
+            state = self._states.get(conversation_id)
+            if state is not None:
+                if now - state.updated_at > self.ttl_seconds:
+                    del self._states[conversation_id]
+                    return None
+                self._states.move_to_end(conversation_id)
+                return state
+        state = self._load(conversation_id)
+        if state is not None and now - state.updated_at <= self.ttl_seconds:
+            with self._lock:
+                self._insert(state)
+            return state
+        return None
+
+    def update(self, conversation_id: str, intent: str = None, entities: Dict = None,
+               candidates: List[str] = None, confidence: float = None) -> Optional[ConversationState]:
+        """Record the outcome of a turn; non-empty entities override earlier ones.
+
+        ``candidates`` holds the ids of the programs last shown to the user.
+        """
+        if not conversation_id:
+            return None
+        loaded = self.get(conversation_id)
+        with self._lock:
+            # Re-read under the lock: another thread may have inserted the state meanwhile
+            state = (self._states.get(conversation_id) or loaded
+                     or ConversationState(conversation_id, self.max_intents))
+            if intent:
+                state.intents.append(intent)
+                state.last_confidence = 0.0 if confidence is None else float(confidence)
+            if entities:
+                state.entities.update({k: v for k, v in entities.items() if v})
+            if candidates is not None:
+                state.candidates = candidates
+            state.updated_at = time.time()
+            self._insert(state)
+            payload = json.dumps(state.to_dict())
+            self._writes += 1
+            sweep = self._writes % EVICT_EVERY_WRITES == 0
+        self._persist(state.conversation_id, payload, state.updated_at)
+        if sweep:
+            self.evict_expired()
+        return state
+
+    def discard(self, conversation_id: str):
+        with self._lock:
+            self._states.pop(conversation_id, None)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM conversation_state WHERE conversation_id = ?",
+                                   (conversation_id,))
+                self._conn.commit()
+
+    def evict_expired(self) -> int:
+        """Drop expired states from memory (and the sqlite table); returns how many."""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        with self._lock:
+            # Entries are kept in recency order, so expired ones sit at the front.
+            while self._states:
+                key, state = next(iter(self._states.items()))
+                if state.updated_at >= cutoff:
+                    break
+                del self._states[key]
+                removed += 1
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM conversation_state WHERE updated_at < ?", (cutoff,))
+                self._conn.commit()
+        return removed
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _insert(self, state: ConversationState):
+        self._states[state.conversation_id] = state
+        self._states.move_to_end(state.conversation_id)
+        while len(self._states) > self.max_sessions:
+            self._states.popitem(last=False)
+
+    def _persist(self, conversation_id: str, payload: str, updated_at: float):
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO conversation_state (conversation_id, state, updated_at) VALUES (?, ?, ?)",
+                    (conversation_id, payload, updated_at)
+                )
+                self._conn.commit()
+        except Exception:
+            logger.exception("Failed to persist conversation %s", conversation_id)
+
+    def _load(self, conversation_id: str) -> Optional[ConversationState]:
+        if self._conn is None:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT state FROM conversation_state WHERE conversation_id = ?", (conversation_id,)
+                ).fetchone()
+        except Exception:
+            logger.exception("Failed to load conversation %s", conversation_id)
+            return None
+        if row is None:
+            return None
+        return ConversationState.from_dict(json.loads(row[0]), self.max_intents)
@@ -0,0 +1,126 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Answer tiers, most to least expensive after the cache
+CACHED = "cached"              # answer cache hit
+FULL = "full"                  # spelling correction, intent classifier, KB handlers
+KEYWORD = "keyword"            # keyword intent rules over the exact text, KB handlers
+TOP_PROGRAMS = "top_programs"  # precomputed top-programs answer, no NLP at all
+TIERS = (CACHED, FULL, KEYWORD, TOP_PROGRAMS)
+
+
+class Deadline:
+    """Time budget of one request on the monotonic clock.
+
+    Created when the request arrives, so time spent queued before the pipeline
+    starts (e.g. in admission control) counts against the budget.
+    """
+
+    def __init__(self, budget_ms: float, started_at: float = None):
+        self.budget_ms = budget_ms
+        self.started_at = time.monotonic() if started_at is None else started_at
+        self.expires_at = self.started_at + budget_ms / 1000.0
+
+    def remaining(self) -> float:
+        """Seconds left (negative once expired)."""
+        return self.expires_at - time.monotonic()
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started_at) * 1000.0
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, estimate: float) -> bool:
+        """True when a stage expected to take ``estimate`` seconds fits in the remaining time."""
+        return self.remaining() >= estimate
+
+
+class StageEstimator:
+    """Running latency estimate per pipeline stage.
+
+    Keeps an EWMA of each stage's duration and of its absolute deviation, and plans
+    with mean + ``k`` deviations so stages with a heavy tail are budgeted for it.
+    Stages never observed are estimated at 0, so the first request runs them.
+    """
+
+    def __init__(self, alpha: float = 0.2, k: float = 2.0):
+        self.alpha = alpha
+        self.k = k
+        self._mean: Dict[str, float] = {}
+        self._dev: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            mean = self._mean.get(stage)
+            if mean is None:
+                self._mean[stage], self._dev[stage] = seconds, 0.0
+                return
+            self._dev[stage] += self.alpha * (abs(seconds - mean) - self._dev[stage])
+            self._mean[stage] = mean + self.alpha * (seconds - mean)
+
+    def estimate(self, *stages: str) -> float:
+        """Planned seconds for running ``stages`` one after another."""
+        with self._lock:
+            return sum(self._mean.get(s, 0.0) + self.k * self._dev.get(s, 0.0) for s in stages)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {s: {"mean_ms": round(m * 1000, 3), "dev_ms": round(self._dev[s] * 1000, 3)}
+                    for s, m in self._mean.items()}
+
+
+class RequestTrace:
+    """How one request was answered: the tier used, why, and time spent per stage."""
+
+    def __init__(self, deadline: Optional[Deadline] = None):
+        self.deadline = deadline
+        self.tier: Optional[str] = None
+        self.reason: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+
+    @property
+    def degraded(self) -> bool:
+        return self.tier in (KEYWORD, TOP_PROGRAMS)
+
+    @contextmanager
+    def stage(self, name: str, estimator: StageEstimator = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            if estimator is not None:
+                estimator.observe(name, seconds)
+
+    def to_dict(self) -> Dict:
+        result = {
+            "tier": self.tier,
+            "stages_ms": {name: round(s * 1000, 3) for name, s in self.stages.items()},
+        }
+        if self.reason:
+            result["reason"] = self.reason
+        if self.deadline is not None:
+            result["budget_ms"] = self.deadline.budget_ms
+            result["elapsed_ms"] = round(self.deadline.elapsed_ms(), 3)
+        return result
+
+
+class TierCounter:
+    """Thread-safe count of answers served per tier."""
+
+    def __init__(self):
+        self.counts = {tier: 0 for tier in TIERS}
+        self._lock = threading.Lock()
+
+    def record(self, tier: str):
+        with self._lock:
+            self.counts[tier] = self.counts.get(tier, 0) + 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model_id: str, text: str) -> bytes:
+    """Content address of an embedding: hash of the model id and whitespace-normalized text."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{model_id}\0{normalized}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """On-disk embedding cache shared by every worker process on the host.
+
+    Vectors live in a sqlite table keyed by ``cache_key``. The database runs in WAL
+    mode, so readers in other processes are never blocked by a writer. Each process
+    opens its own connection (re-opened after a fork). When the table grows past
+    ``max_entries``, the least recently used rows are deleted until it is back to 90%.
+    """
+
+    def __init__(self, path: str, model_id: str, max_entries: int = 1000000,
+                 touch_interval: float = 3600.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes_since_check = 0
+        self.hits = 0
+        self.misses = 0
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    dim INTEGER,
+                    vector BLOB,
+                    last_access REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        keys = [cache_key(self.model_id, t) for t in texts]
+        found = {}
+        stale = []
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            # Stay well under sqlite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = list(set(keys[start:start + 500]))
+                rows = conn.execute(
+                    f"SELECT key, dim, vector, last_access FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, dim, vector, last_access in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32, count=dim)
+                    if now - last_access > self.touch_interval:
+                        stale.append(key)
+            if stale:
+                # Recency only needs to be approximate, so reads rarely turn into writes
+                try:
+                    conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, k) for k in stale])
+                    conn.commit()
+                except sqlite3.OperationalError:
+                    logger.debug("Skipped last_access update; cache database busy")
+        results = [found.get(k) for k in keys]
+        hits = sum(1 for r in results if r is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((cache_key(self.model_id, text), int(vector.shape[0]), vector.tobytes(), now))
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connection()
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_access) VALUES (?, ?, ?, ?)", rows
+                )
+                conn.commit()
+            except sqlite3.OperationalError:
+                logger.warning("Embedding cache busy; %d vectors not stored", len(rows))
+                return
+            self._writes_since_check += len(rows)
+            if self._writes_since_check >= max(1, self.max_entries // 100):
+                self._writes_since_check = 0
+                self._evict(conn)
+
+    def put(self, text: str, vector: np.ndarray):
+        self.put_many([text], np.asarray(vector)[None, :])
+
+    def _evict(self, conn: sqlite3.Connection):
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+            (excess,)
+        )
+        conn.commit()
+        logger.info("Evicted %d embeddings from cache %s", excess, self.path)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
@@ -0,0 +1,122 @@
+import logging
+import os
+from typing import List, Optional
+import numpy as np
+from src.ai_engine.embedding_cache import EmbeddingCache
+from config.settings import config as settings
+
+logger = logging.getLogger(__name__)
+
+
+def engine_model_id(model_name: str = None, quantize: bool = None) -> str:
+    """Identity of the vectors an engine produces; quantized and float models differ slightly."""
+    model_name = model_name or settings.EMBEDDING_MODEL
+    quantize = settings.EMBEDDING_QUANTIZE if quantize is None else quantize
+    return f"{model_name}|{'int8' if quantize else 'float32'}"
+
+
+class CPUEmbeddingEngine:
+    """Sentence embeddings tuned for CPU-only inference.
+
+    - Inputs are sorted by token length and cut into batches that each hold about
+      ``batch_tokens`` tokens, so short texts go in wide batches and little time is
+      spent on padding.
+    - The model's ``nn.Linear`` layers are dynamically quantized to int8.
+    - Intra-/inter-op thread counts are set explicitly instead of relying on defaults.
+    - Texts already embedded by any worker are read from the shared on-disk cache.
+
+    torch and sentence_transformers are imported on construction, not with this module.
+    """
+
+    def __init__(self, model_name: str = None, quantize: bool = None, intra_op_threads: int = None,
+                 inter_op_threads: int = None, batch_tokens: int = None, max_batch_size: int = 256,
+                 cache_path: str = None):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.quantize = settings.EMBEDDING_QUANTIZE if quantize is None else quantize
+        self.batch_tokens = batch_tokens or settings.EMBEDDING_BATCH_TOKENS
+        self.max_batch_size = max_batch_size
+        self._configure_threads(intra_op_threads or settings.EMBEDDING_INTRA_OP_THREADS,
+                                inter_op_threads or settings.EMBEDDING_INTER_OP_THREADS)
+
+        self.model = SentenceTransformer(self.model_name, device="cpu")
+        self.model.eval()
+        if self.quantize:
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+        # Quantized and float models give slightly different vectors, so cache them apart
+        self.model_id = engine_model_id(self.model_name, self.quantize)
+        cache_path = settings.EMBEDDING_CACHE_PATH if cache_path is None else cache_path
+        self.cache = EmbeddingCache(cache_path, self.model_id, settings.EMBEDDING_CACHE_MAX_ENTRIES) \
+            if cache_path else None
+
+    @staticmethod
+    def _configure_threads(intra_op: Optional[int], inter_op: Optional[int]):
+        import torch
+        intra_op = intra_op or os.cpu_count() or 1
+        torch.set_num_threads(intra_op)
+        if inter_op:
+            try:
+                torch.set_num_interop_threads(inter_op)
+            except RuntimeError:
+                # Can only be set once, before any inter-op parallel work has started
+                logger.debug("Inter-op thread count already fixed at %d", torch.get_num_interop_threads())
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        encoded = self.model.tokenizer(texts, add_special_tokens=True, truncation=True,
+                                       max_length=self.model.max_seq_length)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def buckets(self, texts: List[str]) -> List[List[int]]:
+        """Group text positions into length-sorted batches of roughly ``batch_tokens`` tokens."""
+        lengths = self.token_lengths(texts)
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        batches, current = [], []
+        for pos in order:
+            # Every text in a batch is padded to the longest, which is the latest one added
+            if current and (len(current) + 1) * lengths[pos] > self.batch_tokens \
+                    or len(current) >= self.max_batch_size:
+                batches.append(current)
+                current = []
+            current.append(pos)
+        if current:
+            batches.append(current)
+        return batches
+
+    def encode_many(self, texts: List[str]) -> np.ndarray:
+        """Embed ``texts`` in length-bucketed batches; rows follow the input order.
+
+        Cached vectors are reused and only unseen texts (each once) reach the model.
+        """
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if not texts:
+            return out
+        missing = list(range(len(texts)))
+        if self.cache is not None:
+            missing = []
+            for i, vector in enumerate(self.cache.get_many(texts)):
+                if vector is None:
+                    missing.append(i)
+                else:
+                    out[i] = vector
+        if not missing:
+            return out
+
+        import torch
+        unique = list(dict.fromkeys(texts[i] for i in missing))
+        computed = np.zeros((len(unique), self.dim), dtype=np.float32)
+        with torch.inference_mode():
+            for batch in self.buckets(unique):
+                computed[batch] = self.model.encode([unique[i] for i in batch], batch_size=len(batch),
+                                                    convert_to_numpy=True, show_progress_bar=False)
+        row = {text: n for n, text in enumerate(unique)}
+        for i in missing:
+            out[i] = computed[row[texts[i]]]
+        if self.cache is not None:
+            self.cache.put_many(unique, computed)
+        return out
+
+    def encode(self, text: str) -> np.ndarray:
+        return self.encode_many([text])[0]
@@ -0,0 +1,148 @@
+import logging
+from typing import Dict, List, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("float32", "int8", "binary")
+
+# Set bits per byte value, for Hamming distance over packed sign codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length (zero rows are left as they are)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` largest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+class EmbeddingStore:
+    """Cosine-similarity index over sentence embeddings with optional quantization.
+
+    - ``float32``: unit-normalized vectors, exact search (4 bytes/dim).
+    - ``int8``: symmetric per-vector scalar quantization (1 byte/dim, ~4x smaller).
+      With ``binary_prefilter`` (opt-in) sign-bit codes are kept as well and Hamming
+      distance picks the candidates for the int8 dot products.
+    - ``binary``: sign bits only (1 bit/dim, ~32x smaller). Hamming distance picks the
+      candidates, which are re-ranked with the float query against their +/-1 codes.
+      The float vectors are not kept, so the final order is still approximate and binary
+      recall is lower than int8 with the prefilter, which re-ranks with int8 dot products.
+
+    Prefiltering keeps ``max(rerank_k, rerank_fraction * size)`` candidates: a fixed
+    count loses recall as the store grows and near neighbours crowd the Hamming ranking.
+    """
+
+    def __init__(self, precision: str = "int8", rerank_k: int = 50, binary_prefilter: bool = False,
+                 rerank_fraction: float = 0.01):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown embedding precision {precision!r}; expected one of {PRECISIONS}")
+        self.precision = precision
+        self.rerank_k = rerank_k
+        self.rerank_fraction = rerank_fraction
+        self.binary_prefilter = binary_prefilter or precision == "binary"
+        self.dim = 0
+        self.size = 0
+        self.vectors = None   # float32 (n, d)
+        self.codes = None     # int8 (n, d)
+        self.scales = None    # float32 (n,)
+        self.bits = None      # uint8 (n, ceil(d/8))
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.vectors, self.codes, self.scales, self.bits) if a is not None)
+
+    @property
+    def candidate_count(self) -> int:
+        """Candidates the binary prefilter passes on to re-ranking."""
+        return max(self.rerank_k, int(np.ceil(self.rerank_fraction * self.size)))
+
+    def build(self, embeddings: np.ndarray, normalized: bool = False) -> "EmbeddingStore":
+        """Index ``embeddings``; pass ``normalized=True`` when rows are already unit length."""
+        matrix = np.atleast_2d(embeddings)
+        matrix = np.asarray(matrix, dtype=np.float32) if normalized else normalize(matrix)
+        self.size, self.dim = matrix.shape
+        self.vectors = self.codes = self.scales = self.bits = None
+        if self.precision == "float32":
+            self.vectors = matrix
+        if self.precision == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.codes = np.round(matrix / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+        if self.binary_prefilter and self.precision != "float32":
+            self.bits = np.packbits(matrix > 0, axis=1)
+        return self
+
+    def search(self, query: np.ndarray, top_k: int = 3) -> List[Tuple[int, float]]:
+        """Return [(position, cosine score), ...] for the ``top_k`` most similar items."""
+        if self.size == 0:
+            return []
+        q = normalize(np.asarray(query).reshape(-1))
+        if self.precision == "float32":
+            scores = self.vectors @ q
+            return [(int(i), float(scores[i])) for i in _top_k(scores, top_k)]
+
+        candidates = None
+        count = max(top_k, self.candidate_count)
+        if self.bits is not None and self.size > count:
+            q_bits = np.packbits(q > 0)
+            hamming = _POPCOUNT[np.bitwise_xor(self.bits, q_bits)].sum(axis=1, dtype=np.int32)
+            candidates = _top_k(-hamming.astype(np.float32), count)
+
+        if self.precision == "int8":
+            codes = self.codes if candidates is None else self.codes[candidates]
+            scales = self.scales if candidates is None else self.scales[candidates]
+            scores = (codes.astype(np.float32) @ q) * scales
+        else:
+            bits = self.bits if candidates is None else self.bits[candidates]
+            signs = np.unpackbits(bits, axis=1, count=self.dim).astype(np.float32) * 2.0 - 1.0
+            # +/-1 codes have norm sqrt(d); scale so scores stay comparable to cosines
+            scores = (signs @ q) / np.sqrt(self.dim)
+
+        order = _top_k(scores, top_k)
+        positions = order if candidates is None else candidates[order]
+        return [(int(p), float(scores[o])) for p, o in zip(positions, order)]
+
+
+def exact_search(embeddings: np.ndarray, query: np.ndarray, top_k: int) -> List[int]:
+    scores = normalize(embeddings) @ normalize(np.asarray(query).reshape(-1))
+    return [int(i) for i in _top_k(scores, top_k)]
+
+
+def recall_at_k(store: EmbeddingStore, embeddings: np.ndarray, queries: np.ndarray, k: int = 10) -> Dict:
+    """Compare ``store`` against exact float32 search; returns recall@k and memory figures.
+
+    An offline measurement (scripts/eval_embedding_recall.py, tests): embeddings and
+    queries are normalized once and the exact top-k comes from one matrix product.
+    """
+    queries = normalize(np.atleast_2d(queries))
+    exact_scores = normalize(embeddings) @ queries.T
+    hits = 0
+    for column, q in enumerate(queries):
+        exact = set(_top_k(exact_scores[:, column], k).tolist())
+        found = {p for p, _ in store.search(q, k)}
+        hits += len(exact & found)
+    float_bytes = int(np.asarray(embeddings, dtype=np.float32).nbytes)
+    return {
+        "precision": store.precision,
+        "k": k,
+        "queries": len(queries),
+        f"recall@{k}": hits / float(len(queries) * min(k, store.size)) if len(queries) and store.size else 1.0,
+        "bytes": store.nbytes,
+        "float32_bytes": float_bytes,
+        "compression": round(float_bytes / store.nbytes, 2) if store.nbytes else 0.0,
+    }
@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.utils.text import normalize_text
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance, or ``max_distance + 1`` once it is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = cur[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+            row_min = min(row_min, cur[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class FuzzyIndex:
+    """SymSpell-style deletion dictionary over the knowledge-base vocabulary.
+
+    Every term is indexed under all strings reachable by deleting up to
+    ``max_edit_distance`` characters from its first ``prefix_length`` characters.
+    A lookup generates the same deletions for the query word and verifies only the
+    terms found under them, so its cost does not grow with the vocabulary size.
+    """
+
+    def __init__(self, max_edit_distance: int = 2, prefix_length: int = 7, min_length: int = 4):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.min_length = min_length
+        self.terms: Dict[str, int] = {}
+        self.deletes: Dict[str, Set[str]] = {}
+        self._corrections: Dict[str, Optional[str]] = {}
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.terms
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def add_text(self, text: str):
+        """Index every word of ``text`` long enough to be worth correcting."""
+        for word in normalize_text(text).split():
+            if len(word) >= self.min_length and word.isalpha():
+                self.add(word)
+
+    def add(self, term: str, count: int = 1):
+        if term in self.terms:
+            self.terms[term] += count
+            return
+        self.terms[term] = count
+        self._corrections.clear()
+        for key in self._deletes(term[:self.prefix_length], self.max_edit_distance):
+            self.deletes.setdefault(key, set()).add(term)
+
+    def build(self, texts: Iterable[str]):
+        for text in texts:
+            if text:
+                self.add_text(text)
+
+    def lookup(self, word: str, max_distance: int = None) -> Optional[Tuple[str, int]]:
+        """Closest indexed term within ``max_distance`` edits (ties go to the more frequent term)."""
+        if max_distance is None:
+            max_distance = self.max_distance_for(word)
+        if word in self.terms:
+            return word, 0
+        if max_distance <= 0:
+            return None
+        max_distance = min(max_distance, self.max_edit_distance)
+        candidates: Set[str] = set()
+        for key in self._deletes(word[:self.prefix_length], max_distance):
+            candidates.update(self.deletes.get(key, ()))
+        best = None
+        for term in candidates:
+            d = edit_distance(word, term, max_distance)
+            if d > max_distance:
+                continue
+            if best is None or (d, -self.terms[term]) < (best[1], -self.terms[best[0]]):
+                best = (term, d)
+        return best
+
+    def max_distance_for(self, word: str) -> int:
+        """Allow fewer edits on short words so common words aren't "corrected" into KB terms."""
+        if len(word) < self.min_length:
+            return 0
+        if len(word) < 6:
+            return 1
+        return self.max_edit_distance
+
+    def correct(self, word: str) -> str:
+        if word not in self._corrections:
+            hit = self.lookup(word)
+            self._corrections[word] = hit[0] if hit else None
+            if len(self._corrections) > 50000:
+                self._corrections.clear()
+        return self._corrections[word] or word
+
+    def correct_text(self, text: str) -> str:
+        """Normalize ``text`` and replace misspelled words with their closest KB term."""
+        return " ".join(self.correct(w) if w.isalpha() else w for w in normalize_text(text).split())
+
+    @staticmethod
+    def _deletes(word: str, max_distance: int) -> List[str]:
+        results = {word}
+        frontier = {word}
+        for _ in range(max_distance):
+            nxt = set()
+            for w in frontier:
+                for i in range(len(w)):
+                    nxt.add(w[:i] + w[i + 1:])
+            nxt -= results
+            results |= nxt
+            frontier = nxt
+        return list(results)
@@ -1,7 +1,10 @@
 # Lightweight wrapper for loading/saving intent classifier (optional)
 import logging
+import re
 from pathlib import Path
+from typing import Dict, List
 import pickle
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -24,3 +27,73 @@ class IntentClassifier:
                 self.model = pickle.load(f)
             logger.info("Intent classifier loaded from %s", path)
         return self.model
+
+
+# TfidfVectorizer's default token pattern
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+class ArrayIntentModel:
+    """TF-IDF + multinomial naive Bayes intent model evaluated with numpy alone.
+
+    Holds the fitted arrays of the sklearn pipeline trained by NLPProcessor, so a KB
+    snapshot can carry the model and workers predict without unpickling or importing
+    sklearn. Only the vectorizer defaults that pipeline uses are supported.
+    """
+
+    def __init__(self, vocabulary: List[str], idf: np.ndarray, feature_log_prob: np.ndarray,
+                 class_log_prior: np.ndarray, classes: List[str]):
+        self.vocabulary = list(vocabulary)
+        self.columns = {term: i for i, term in enumerate(self.vocabulary)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.feature_log_prob = np.asarray(feature_log_prob, dtype=np.float64)
+        self.class_log_prior = np.asarray(class_log_prior, dtype=np.float64)
+        self.classes = list(classes)
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> "ArrayIntentModel":
+        tfidf, clf = pipeline.named_steps["tfidf"], pipeline.named_steps["clf"]
+        defaults = dict(lowercase=True, analyzer="word", ngram_range=(1, 1), stop_words=None,
+                        norm="l2", use_idf=True, sublinear_tf=False, binary=False)
+        params = tfidf.get_params()
+        changed = [k for k, v in defaults.items() if params.get(k) != v]
+        if changed or params.get("token_pattern") != TOKEN_PATTERN.pattern:
+            raise ValueError(f"Unsupported TfidfVectorizer settings: {changed or ['token_pattern']}")
+        vocabulary = sorted(tfidf.vocabulary_, key=tfidf.vocabulary_.get)
+        return cls(vocabulary, tfidf.idf_, clf.feature_log_prob_, clf.class_log_prior_,
+                   [str(c) for c in clf.classes_])
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "ArrayIntentModel":
+        return cls(snapshot.strings("intent.vocabulary"), snapshot.array("intent.idf"),
+                   snapshot.array("intent.feature_log_prob"), snapshot.array("intent.class_log_prior"),
+                   snapshot.strings("intent.classes"))
+
+    @property
+    def classes_(self) -> List[str]:
+        # Same attribute name as the sklearn pipeline, so callers can use either model
+        return self.classes
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {"idf": self.idf, "feature_log_prob": self.feature_log_prob, "class_log_prior": self.class_log_prior}
+
+    def _features(self, texts: List[str]) -> np.ndarray:
+        x = np.zeros((len(texts), len(self.vocabulary)))
+        for row, text in enumerate(texts):
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                col = self.columns.get(token)
+                if col is not None:
+                    x[row, col] += 1
+        x *= self.idf
+        norms = np.linalg.norm(x, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return x / norms
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        jll = self._features(texts) @ self.feature_log_prob.T + self.class_log_prior
+        jll -= jll.max(axis=1, keepdims=True)
+        proba = np.exp(jll)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, texts: List[str]) -> List[str]:
+        return [self.classes[i] for i in self.predict_proba(texts).argmax(axis=1)]
@@ -1,33 +1,50 @@
 import logging
 from typing import List, Dict
+from src.knowledge_base.indexes import EligibilityIndex
+from src.knowledge_base.normalizers import parse_requirements
 
 logger = logging.getLogger(__name__)
 
+# Dummy static list (in production load from KB)
+STATIC_PROGRAMS = [
+    {"id": "usa-001", "university": "Harvard University", "program": "Computer Science", "country": "USA",
+     "requirements": ["SAT: 1500+", "GPA: 3.8+", "TOEFL: 100+"]},
+    {"id": "uk-001", "university": "University of Oxford", "program": "Engineering", "country": "UK",
+     "requirements": ["A-levels: A*AA", "IELTS: 7.0+"]},
+    {"id": "canada-001", "university": "University of Toronto", "program": "Business Administration", "country": "Canada",
+     "requirements": ["High School Diploma", "IELTS: 6.5+"]}
+]
+
 class MLRecommender:
     """Simple placeholder for a recommendation model."""
 
-    def __init__(self):
+    def __init__(self, programs: List[Dict] = None):
         self.logger = logging.getLogger(__name__)
         # In a production system, load trained model here
+        self.programs = programs if programs is not None else STATIC_PROGRAMS
+        self.eligibility = EligibilityIndex([
+            p.get("requirement_thresholds") or parse_requirements(p.get("requirements")) for p in self.programs
+        ])
 
     def recommend_programs(self, user_profile: Dict, top_k: int = 5) -> List[Dict]:
         """
         Produce simple recommendations based on user's preferred country/program.
-        user_profile example: {"country": "USA", "interests": ["computer science"], "gpa": 3.5}
+        user_profile example: {"country": "USA", "interests": ["computer science"], "gpa": 3.5,
+                               "test_scores": {"IELTS": 7.0}}
+        Programs whose GPA/test minimums the user does not meet are left out.
         """
         recommendations = []
         # Placeholder rules-based recommendation. Replace with ML model in future.
         preferred_country = user_profile.get("country", "").lower()
         interests = [i.lower() for i in user_profile.get("interests", [])]
 
-        # Dummy static list (in production load from KB)
-        static_programs = [
-            {"id": "usa-001", "university": "Harvard University", "program": "Computer Science", "country": "USA"},
-            {"id": "uk-001", "university": "University of Oxford", "program": "Engineering", "country": "UK"},
-            {"id": "canada-001", "university": "University of Toronto", "program": "Business Administration", "country": "Canada"}
-        ]
+        scores = dict(user_profile.get("test_scores") or {})
+        if user_profile.get("gpa") is not None:
+            scores["GPA"] = user_profile["gpa"]
+        eligible = set(self.eligibility.eligible(scores))
+        candidates = [p for i, p in enumerate(self.programs) if i in eligible]
 
-        for p in static_programs:
+        for p in candidates:
             if preferred_country and preferred_country in p.get("country","").lower():
                 recommendations.append(p)
             elif any(i in p.get("program","").lower() for i in interests):
@@ -35,6 +52,6 @@ class MLRecommender:
 
         # Fallback: return top K
         if not recommendations:
-            recommendations = static_programs[:top_k]
+            recommendations = candidates[:top_k]
 
         return recommendations[:top_k]
@@ -1,14 +1,33 @@
-import nltk
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import Pipeline
-from sentence_transformers import SentenceTransformer
 import json
 from typing import Dict, List, Tuple
 import logging
 import pickle
+import threading
 from pathlib import Path
+from src.ai_engine.fuzzy_index import FuzzyIndex
+from src.ai_engine.embedding_store import EmbeddingStore
+from src.ai_engine.embedding_engine import CPUEmbeddingEngine
+from src.utils.text import normalize_text
+from config.settings import config as settings
+
+# Simple entity keywords (can be enhanced with NER)
+COUNTRY_KEYWORDS = {
+    "usa": ["usa", "united states", "america"],
+    "uk": ["uk", "united kingdom", "britain"],
+    "canada": ["canada"],
+    "australia": ["australia"]
+}
+PROGRAM_KEYWORDS = ["computer science", "engineering", "business", "medicine", "law"]
+# Keyword rules used instead of the classifier when a request is short on time; first match wins
+INTENT_KEYWORDS = [
+    ("visa_information", ["visa", "permit", "embassy"]),
+    ("tuition_program", ["igcse", "a levels", "tuition", "coaching", "sat", "tutor"]),
+    ("application_guide", ["apply", "application", "ucas", "admission"]),
+    ("scholarship_inquiry", ["scholarship", "scholarships", "funding"]),
+    ("study_abroad_inquiry", ["study", "university", "universities", "masters", "degree", "program", "course"]),
+]
+KEYWORD_INTENT_CONFIDENCE = 0.6
 
 class NLPProcessor:
     """Handles Natural Language Processing for the AI agent"""
@@ -18,18 +37,15 @@ class NLPProcessor:
         self.model_path = Path("models")
         self.model_path.mkdir(exist_ok=True)
         
-        # Download NLTK data
-        try:
-            nltk.data.find('tokenizers/punkt')
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('punkt')
-            nltk.download('stopwords')
-        
-        # Initialize models
+        # Initialize models; the sentence-embedding engine loads on first use
         self.intent_classifier = None
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.vectorizer = TfidfVectorizer(max_features=1000)
+        self._embedding_engine = None
+        self._embedding_lock = threading.Lock()
+        
+        # Quantized index over KB question embeddings (built on first similarity search)
+        self.question_store = None
+        self.question_items: List[Dict] = []
+        self._question_kb_key = None
         
         # Intent categories
         self.intent_categories = [
@@ -42,10 +58,51 @@ class NLPProcessor:
             "general_question",
             "escalation_request"
         ]
+
+        # Typo-tolerant vocabulary; ResponseGenerator adds KB terms once the KB is loaded
+        self.fuzzy_index = FuzzyIndex()
+        self.fuzzy_index.build(k for keywords in COUNTRY_KEYWORDS.values() for k in keywords)
+        self.fuzzy_index.build(PROGRAM_KEYWORDS)
+        self.fuzzy_index.build(item["text"] for item in self._create_sample_training_data())
+
+    @property
+    def embedding_engine(self) -> CPUEmbeddingEngine:
+        # Intent classification and entity extraction don't need torch; load it only when embedding
+        if self._embedding_engine is None:
+            with self._embedding_lock:
+                if self._embedding_engine is None:
+                    self._embedding_engine = CPUEmbeddingEngine()
+        return self._embedding_engine
+
+    @property
+    def embedding_model(self):
+        return self.embedding_engine.model
+
+    def _ensure_nltk_data(self):
+        """Download NLTK data"""
+        import nltk
+        try:
+            nltk.data.find('tokenizers/punkt')
+            nltk.data.find('corpora/stopwords')
+        except LookupError:
+            nltk.download('punkt')
+            nltk.download('stopwords')
+
+    def build_vocabulary(self, terms: List[str]):
+        """Add knowledge-base terms (program names, universities, subjects) to the fuzzy index."""
+        self.fuzzy_index.build(terms)
+
+    def normalize_query(self, text: str) -> str:
+        """Normalize text and correct misspelled words against the KB vocabulary."""
+        return self.fuzzy_index.correct_text(text)
     
     def train_models(self, training_data=None):
         """Train intent classification model"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.naive_bayes import MultinomialNB
+        from sklearn.pipeline import Pipeline
         self.logger.info("Training NLP models...")
+        self._ensure_nltk_data()
         
         # Sample training data if not provided
         if training_data is None:
@@ -82,8 +139,28 @@ class NLPProcessor:
         
         return intent, confidence
     
-    def extract_entities(self, text: str) -> Dict:
-        """Extract key entities from text"""
+    def classify_intents(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Classify many texts with one vectorized predict_proba call"""
+        if self.intent_classifier is None:
+            self._load_models()
+        if not texts:
+            return []
+        processed = [self._preprocess_text(t) for t in texts]
+        proba = np.asarray(self.intent_classifier.predict_proba(processed))
+        classes = self.intent_classifier.classes_
+        best = proba.argmax(axis=1)
+        return [(str(classes[i]), float(proba[row, i])) for row, i in enumerate(best)]
+
+    def classify_intent_keywords(self, text: str) -> Tuple[str, float]:
+        """Cheap intent guess from keyword rules; returns (None, 0.0) when nothing matches."""
+        padded = f" {normalize_text(text)} "
+        for intent, keywords in INTENT_KEYWORDS:
+            if any(f" {keyword} " in padded for keyword in keywords):
+                return intent, KEYWORD_INTENT_CONFIDENCE
+        return None, 0.0
+
+    def extract_entities(self, text: str, correct: bool = True) -> Dict:
+        """Extract key entities from text (``correct=False`` skips spelling correction)"""
         entities = {
             "country": None,
             "university": None,
@@ -92,23 +169,17 @@ class NLPProcessor:
             "deadline": None
         }
         
-        # Simple entity extraction (can be enhanced with NER)
-        country_keywords = {
-            "usa": ["usa", "united states", "america"],
-            "uk": ["uk", "united kingdom", "britain"],
-            "canada": ["canada"],
-            "australia": ["australia"]
-        }
-        
-        for country, keywords in country_keywords.items():
-            if any(keyword in text.lower() for keyword in keywords):
+        # Match on normalized, spelling-corrected text ("compter sciense" -> "computer science")
+        text = self.normalize_query(text) if correct else normalize_text(text)
+
+        for country, keywords in COUNTRY_KEYWORDS.items():
+            if any(keyword in text for keyword in keywords):
                 entities["country"] = country.upper()
                 break
         
         # Extract program mentions
-        program_keywords = ["computer science", "engineering", "business", "medicine", "law"]
-        for program in program_keywords:
-            if program in text.lower():
+        for program in PROGRAM_KEYWORDS:
+            if program in text:
                 entities["program"] = program
                 break
         
@@ -116,35 +187,52 @@ class NLPProcessor:
     
     def generate_embedding(self, text: str) -> np.ndarray:
         """Generate semantic embedding for text"""
-        return self.embedding_model.encode(text)
+        return self.embedding_engine.encode(text)
+    
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for many texts in length-bucketed batches"""
+        return self.embedding_engine.encode_many(texts)
+    
+    def index_questions(self, knowledge_base: List[Dict]):
+        """Embed KB questions once into a (quantized) EmbeddingStore.
+
+        Recall of the quantized store is measured offline with scripts/eval_embedding_recall.py.
+        """
+        questions = [item['question'] for item in knowledge_base if 'question' in item]
+        embeddings = self.generate_embeddings(questions) if questions else None
+        self.load_question_index(knowledge_base, embeddings)
+
+    def load_question_index(self, knowledge_base: List[Dict], embeddings: np.ndarray = None):
+        """Build the question store from precomputed embeddings (one row per KB item with a question)."""
+        self.question_items = [item for item in knowledge_base if 'question' in item]
+        self._question_kb_key = (id(knowledge_base), len(knowledge_base))
+        self.question_store = EmbeddingStore(
+            precision=settings.EMBEDDING_PRECISION,
+            rerank_k=settings.EMBEDDING_RERANK_K,
+            binary_prefilter=settings.EMBEDDING_BINARY_PREFILTER,
+            rerank_fraction=settings.EMBEDDING_RERANK_FRACTION
+        )
+        if not self.question_items:
+            return
+        if len(embeddings) != len(self.question_items):
+            raise ValueError(f"{len(embeddings)} embeddings for {len(self.question_items)} questions")
+        self.question_store.build(embeddings)
+        self.logger.info("Indexed %d KB questions (%s, %d bytes)", len(self.question_items),
+                         self.question_store.precision, self.question_store.nbytes)
     
     def find_similar_questions(self, query: str, knowledge_base: List[Dict], top_k: int = 3) -> List[Dict]:
         """Find similar questions in knowledge base"""
+        if self.question_store is None or self._question_kb_key != (id(knowledge_base), len(knowledge_base)):
+            self.index_questions(knowledge_base)
+        if not self.question_items:
+            return []
         query_embedding = self.generate_embedding(query)
-        similarities = []
-        
-        for item in knowledge_base:
-            if 'question' in item:
-                item_embedding = self.generate_embedding(item['question'])
-                similarity = np.dot(query_embedding, item_embedding) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(item_embedding)
-                )
-                similarities.append((similarity, item))
-        
-        # Sort by similarity and return top k
-        similarities.sort(reverse=True, key=lambda x: x[0])
-        return [item for _, item in similarities[:top_k]]
+        return [self.question_items[pos] for pos, _ in self.question_store.search(query_embedding, top_k)]
     
     def _preprocess_text(self, text: str) -> str:
         """Preprocess text for NLP tasks"""
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove punctuation (basic)
-        import string
-        text = text.translate(str.maketrans('', '', string.punctuation))
-        
-        return text
+        # Lowercase and replace punctuation with spaces, so "A-Levels" reads as "a levels"
+        return normalize_text(text)
     
     def _create_sample_training_data(self) -> List[Dict]:
         """Create sample training data for intent classification"""
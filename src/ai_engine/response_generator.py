@@ -1,117 +1,363 @@
 import json
 import logging
+from datetime import date
 from pathlib import Path
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional
 from src.ai_engine.nlp_processor import NLPProcessor
-from config import prompts, settings
+from src.ai_engine.conversation_store import ConversationStore
+from src.ai_engine.answer_cache import AnswerCache
+from src.ai_engine.deadline import (CACHED, FULL, KEYWORD, TOP_PROGRAMS, Deadline, RequestTrace,
+                                    StageEstimator, TierCounter)
+from src.knowledge_base.renderer import RenderedFragments, join_program_lines, join_tuition_lines
+from src.knowledge_base.search_index import SearchIndex
+from src.knowledge_base.indexes import ProgramIndex, program_matches
+from src.knowledge_base.facets import FacetIndex
+from src.knowledge_base.snapshot import (KnowledgeBaseSnapshot, SnapshotError, restore_facet_index,
+                                         restore_program_index, restore_search_index)
+from src.knowledge_base.sharding import ShardCoordinator
+from src.ai_engine.intent_classifier import ArrayIntentModel
+from src.ai_engine.embedding_engine import engine_model_id
+from src.utils.json_codec import dumps
+from src.utils.text import normalize_text
+from src.knowledge_base.normalizers import day_of_year
+from config import prompts
+from config.settings import config as settings
 
 logger = logging.getLogger(__name__)
 
+# Openers that mark a message as a follow-up on the previous turn ("what about the UK?")
+FOLLOW_UP_PREFIXES = ("what about", "how about", "and ", "what of", "same for")
+
+AGGREGATED_KB_FILE = Path("data/knowledge_base_aggregated.json")
+
+# Under a deadline, run the full pipeline at least once per this many degraded answers
+FULL_PROBE_INTERVAL = 50
+
 class ResponseGenerator:
     """Generates responses using simple rule-based + NLP + knowledge base lookup."""
 
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.nlp = NLPProcessor()
-        # Ensure models are available (may trigger training if not present)
+        self.snapshot = self._open_snapshot()
+        if self._snapshot_has_current_model():
+            self.nlp.intent_classifier = ArrayIntentModel.from_snapshot(self.snapshot)
+        else:
+            # Ensure models are available (may trigger training if not present)
+            try:
+                self.nlp._load_models()
+            except Exception:
+                logger.debug("Intent model not available on init.")
+        # With shard servers configured, every KB query is scattered to them and only the
+        # small reference tables (visa, guides, tuition) are held here
+        self.shards = ShardCoordinator(settings.SHARD_URLS) if settings.SHARD_URLS else None
+        if self.shards is not None:
+            self._load_from_shards()
+        elif self.snapshot is not None:
+            self._load_from_snapshot(self.snapshot)
+        else:
+            self._load_from_json()
+        self.nlp.build_vocabulary(self._vocabulary_terms())
+        self.conversations = ConversationStore(
+            max_sessions=settings.CONVERSATION_MAX_SESSIONS,
+            ttl_seconds=settings.CONVERSATION_TTL_SECONDS,
+            db_path=settings.CONVERSATION_DB_PATH
+        )
+        self.answer_cache = AnswerCache(settings.ANSWER_CACHE_SIZE, settings.ANSWER_CACHE_TTL_SECONDS)
+        # Latency estimates per stage drive the choice of tier under a deadline
+        self.stage_estimates = StageEstimator()
+        self.tier_counts = TierCounter()
+        self._full_skips = 0
+
+    def _open_snapshot(self):
+        """The KB snapshot bundle, unless missing or older than the aggregated JSON."""
+        path = Path(settings.KB_SNAPSHOT_PATH) if settings.KB_SNAPSHOT_PATH else None
+        if path is None or not path.exists():
+            return None
+        if AGGREGATED_KB_FILE.exists() and AGGREGATED_KB_FILE.stat().st_mtime > path.stat().st_mtime:
+            logger.warning("KB snapshot %s is older than %s; loading the JSON instead", path, AGGREGATED_KB_FILE)
+            return None
         try:
-            self.nlp._load_models()
-        except Exception:
-            logger.debug("Intent model not available on init.")
-        # Load knowledge base aggregated file
-        agg_file = Path("data/knowledge_base_aggregated.json")
+            snapshot = KnowledgeBaseSnapshot(path, verify=settings.KB_SNAPSHOT_VERIFY)
+        except SnapshotError:
+            logger.exception("Failed to open KB snapshot; loading the JSON instead")
+            return None
+        logger.info("Opened KB snapshot %s (version %s)", path, snapshot.manifest.get("kb_version"))
+        return snapshot
+
+    def _snapshot_has_current_model(self) -> bool:
+        if self.snapshot is None or "intent.classes" not in self.snapshot:
+            return False
+        # A model retrained after the snapshot was built takes precedence
+        model_file = self.nlp.model_path / "intent_classifier.pkl"
+        return not (model_file.exists() and model_file.stat().st_mtime > self.snapshot.path.stat().st_mtime)
+
+    def _load_from_snapshot(self, snapshot: KnowledgeBaseSnapshot):
+        # Records (which handlers and fragments work on) and search texts are decoded once;
+        # sorted indexes, facet codes, encoded items and embeddings stay views over the mapping
+        self.kb = snapshot.json("records")
+        self.fragments = RenderedFragments(self.kb)
+        self.program_index = restore_program_index(snapshot, self.kb.get("study_abroad_programs", []))
+        self.search_index = restore_search_index(snapshot, self.kb)
+        self.facet_index = restore_facet_index(snapshot, self.search_index, settings.TUITION_BANDS_USD)
+        if "questions.embeddings" in snapshot:
+            if snapshot.manifest.get("embedding_model_id") == engine_model_id():
+                self.nlp.load_question_index(self.kb.get("faqs", []), snapshot.array("questions.embeddings"))
+            else:
+                logger.info("Snapshot question embeddings are from another model; they will be recomputed")
+
+    def _load_from_shards(self):
+        reference = self.shards.reference_kb()
+        if reference["partial"]:
+            logger.warning("Shards %s did not answer at startup; their reference records are missing",
+                           reference["failed_shards"])
+        self.kb = reference["kb"]
+        self.fragments = RenderedFragments(self.kb)
+        top = self.shards.find_programs(limit=3)["results"]
+        if top:
+            self.fragments.programs_default = join_program_lines([self.fragments.program_line(p) for p in top])
+        self.program_index = self.search_index = self.facet_index = None
+
+    def _load_from_json(self):
         self.kb = {}
-        if agg_file.exists():
+        if AGGREGATED_KB_FILE.exists():
             try:
-                with open(agg_file, "r") as f:
+                with open(AGGREGATED_KB_FILE, "r") as f:
                     self.kb = json.load(f)
             except Exception:
                 logger.exception("Failed to load aggregated knowledge base")
         else:
             logger.info("Aggregated knowledge base not found; please run --init-kb")
+        # Render per-record answer text once; handlers only look fragments up
+        self.fragments = RenderedFragments(self.kb)
+        # Program index first: it adds the typed fee fields the tuition_band facet uses
+        self.program_index = ProgramIndex(self.kb.get("study_abroad_programs", []))
+        self.search_index = SearchIndex(self.kb)
+        self.facet_index = FacetIndex(self.search_index, settings.TUITION_BANDS_USD)
 
-    def generate_response(self, user_message: str, conversation_id: str = None) -> Tuple[str, str, float]:
-        """Produce a response, returning (text, intent, confidence)."""
-        try:
-            intent, confidence = self.nlp.classify_intent(user_message)
-        except Exception:
-            intent, confidence = "general_question", 0.0
+    def generate_response(self, user_message: str, conversation_id: str = None, deadline: Deadline = None,
+                          trace: RequestTrace = None, classification: Tuple[str, float] = None) -> Tuple[str, str, float]:
+        """Produce a response, returning (text, intent, confidence).
+
+        With a ``deadline``, stages whose estimated cost no longer fits in the remaining
+        time are skipped for cheaper tiers: cached answer, full pipeline, keyword rules,
+        then the precomputed top-programs answer. ``trace`` records the tier and stage timings.
+        ``classification`` is a precomputed (intent, confidence), e.g. from classify_intents.
+        """
+        trace = trace if trace is not None else RequestTrace(deadline)
+        state = self.conversations.get(conversation_id)
+        follow_up = self._is_follow_up(state, user_message)
 
-        entities = self.nlp.extract_entities(user_message)
+        # Context-free questions are answered from the cache when possible
+        cache_key = None if follow_up else normalize_text(user_message)
+        cached = self.answer_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            self._record_tier(trace, CACHED)
+            self.conversations.update(conversation_id, cached["intent"], cached["entities"], cached["candidates"],
+                                      confidence=cached["confidence"])
+            return cached["response"], cached["intent"], cached["confidence"]
+
+        tier = self._choose_tier(deadline, trace)
+        if tier == FULL:
+            with trace.stage("understand", self.stage_estimates):
+                entities = self.nlp.extract_entities(user_message)
+                if follow_up:
+                    # Follow-up turn: keep the previous intent (and its confidence) and fill gaps
+                    # from earlier entities
+                    intent, confidence = state.last_intent, state.last_confidence
+                    entities = self._merge_entities(state.entities, entities)
+                elif classification is not None:
+                    intent, confidence = classification
+                else:
+                    try:
+                        intent, confidence = self.nlp.classify_intent(user_message)
+                    except Exception:
+                        intent, confidence = "general_question", 0.0
+        elif tier == KEYWORD:
+            # No spelling correction and no classifier, just exact keyword rules
+            with trace.stage("keyword", self.stage_estimates):
+                entities = self.nlp.extract_entities(user_message, correct=False)
+                if follow_up:
+                    intent, confidence = state.last_intent, state.last_confidence
+                    entities = self._merge_entities(state.entities, entities)
+                else:
+                    intent, confidence = self.nlp.classify_intent_keywords(user_message)
+            if intent is None:
+                tier, trace.reason = TOP_PROGRAMS, "no keyword match"
+        if tier != TOP_PROGRAMS and not self._route_fits(deadline, trace):
+            # Understanding took longer than planned; the budget left can't cover the KB lookup
+            tier, trace.reason = TOP_PROGRAMS, "deadline before route"
+        if tier == TOP_PROGRAMS:
+            self._record_tier(trace, TOP_PROGRAMS)
+            return self.fragments.programs_default or self._fallback_response(user_message), "general_question", 0.0
 
         # Simple routing based on intent
-        if intent in ("study_abroad_inquiry", "university_search"):
-            response = self._handle_program_search(user_message, entities)
-        elif intent == "visa_information":
-            response = self._handle_visa_info(entities)
-        elif intent == "tuition_program":
-            response = self._handle_tuition_info(user_message)
-        elif intent == "application_guide":
-            response = self._handle_application_guide(entities)
-        else:
-            response = self._fallback_response(user_message)
+        candidates = None
+        with trace.stage("route", self.stage_estimates):
+            if intent in ("study_abroad_inquiry", "university_search"):
+                candidates = self._find_program_candidates(entities)
+                response = self._handle_program_search(user_message, entities, candidates)
+            elif intent == "visa_information":
+                response = self._handle_visa_info(entities)
+            elif intent == "tuition_program":
+                response = self._handle_tuition_info(user_message, correct=tier == FULL)
+            elif intent == "application_guide":
+                response = self._handle_application_guide(entities)
+            else:
+                response = self._fallback_response(user_message)
+        self._record_tier(trace, tier)
 
+        candidate_ids = [c.get("id") for c in candidates] if candidates is not None else None
+        self.conversations.update(conversation_id, intent, entities, candidate_ids, confidence=confidence)
+        # Degraded answers are not cached; the next unhurried request gets the full answer
+        if cache_key and tier == FULL:
+            self.answer_cache.put(cache_key, response=response, intent=intent, confidence=float(confidence),
+                                  entities=entities, candidates=candidate_ids)
         return response, intent, float(confidence)
 
+    def _choose_tier(self, deadline: Optional[Deadline], trace: RequestTrace) -> str:
+        if deadline is None or deadline.allows(self.stage_estimates.estimate("understand", "route")):
+            self._full_skips = 0
+            return FULL
+        self._full_skips += 1
+        if self._full_skips >= FULL_PROBE_INTERVAL and not deadline.expired():
+            # Re-measure now and then, or one slow run would keep the estimate high for good
+            self._full_skips = 0
+            trace.reason = "probe"
+            return FULL
+        trace.reason = "deadline"
+        if deadline.allows(self.stage_estimates.estimate("keyword", "route")):
+            return KEYWORD
+        return TOP_PROGRAMS
+
+    def _route_fits(self, deadline: Optional[Deadline], trace: RequestTrace) -> bool:
+        # A probe runs every stage regardless, so its timings refresh the estimates
+        if deadline is None or trace.reason == "probe":
+            return True
+        return deadline.allows(self.stage_estimates.estimate("route"))
+
+    def _record_tier(self, trace: RequestTrace, tier: str):
+        trace.tier = tier
+        self.tier_counts.record(tier)
+
+    @staticmethod
+    def _merge_entities(previous: Dict, entities: Dict) -> Dict:
+        merged = dict(previous)
+        merged.update({k: v for k, v in entities.items() if v})
+        return merged
+
+    def answer_stats(self) -> Dict:
+        """Answers served per tier and the current per-stage latency estimates."""
+        return {"tiers": self.tier_counts.snapshot(), "stages": self.stage_estimates.snapshot()}
+
+    def has_cached_response(self, user_message: str, conversation_id: str = None) -> bool:
+        """True when generate_response would answer from the cache (no model inference)."""
+        if self._is_follow_up(self.conversations.get(conversation_id), user_message):
+            return False
+        return normalize_text(user_message) in self.answer_cache
+
+    @staticmethod
+    def _is_follow_up(state, message: str) -> bool:
+        """A short "what about ..." turn that reuses the previous turn's intent, bypassing the cache."""
+        # A fallback turn gives a follow-up nothing to build on, so that message is classified afresh
+        if state is None or state.last_intent in (None, "general_question"):
+            return False
+        text = message.strip().lower()
+        return text.startswith(FOLLOW_UP_PREFIXES) and len(text.split()) <= 6
+
+    @staticmethod
+    def _client_reply(result: Dict) -> Dict:
+        """A coordinator reply fit for API clients: ``partial`` stays, the shard URLs go (the coordinator logs them)."""
+        result.pop("failed_shards", None)
+        return result
+
     def search_knowledge_base(self, query: str, category: str = "") -> List[Dict]:
         """Simple search in aggregated JSON: exact-match + keyword filtering."""
-        results = []
-        query_lower = query.lower()
-        if not self.kb:
-            return results
+        if self.shards is not None:
+            return self.shards.search(query, category)["results"]
+        positions = self.search_index.search(query, category)
+        return [self.search_index.items[i] for i in positions]
 
-        if category and category in self.kb:
-            items = self.kb.get(category, [])
-        else:
-            # search across categories
-            items = []
-            for cat, data in self.kb.items():
-                if isinstance(data, dict):
-                    # dict entries (visa, guides)
-                    for k, v in data.items():
-                        items.append({"category": cat, "key": k, "value": v})
-                elif isinstance(data, list):
-                    for it in data:
-                        items.append({"category": cat, "value": it})
-
-        for item in items:
-            text = ""
-            if isinstance(item.get("value"), dict):
-                text = json.dumps(item["value"]).lower()
-            else:
-                text = str(item.get("value")).lower()
-            if query_lower in text:
-                results.append(item)
+    def search_knowledge_base_encoded(self, query: str, category: str = "") -> bytes:
+        """Same as search_knowledge_base but returns the JSON response body as bytes."""
+        if self.shards is not None:
+            return dumps(self._client_reply(self.shards.search(query, category)))
+        return self.search_index.encode_results(self.search_index.search(query, category))
 
-        return results[:10]
+    def faceted_search(self, query: str = "", filters: Dict[str, List[str]] = None, limit: int = 10) -> Dict:
+        """Search with facet filters, e.g. filters={"country": ["USA", "UK"], "scholarship_available": ["true"]}.
 
-    def _handle_program_search(self, message: str, entities: Dict) -> str:
-        programs = self.kb.get("study_abroad_programs", [])
-        if not programs:
-            return "I don't have program data loaded. Please run the knowledge base initialization."
+        Values within a facet are OR-ed and facets are AND-ed. Returns the first ``limit``
+        results, the total match count and per-facet value counts for the matches.
+        """
+        if self.shards is not None:
+            return self._client_reply(self.shards.faceted_search(query, filters, limit))
+        positions, total, counts = self.facet_index.search(query, filters, limit)
+        return {"results": [self.search_index.items[i] for i in positions], "total": total, "facets": counts}
+
+    def faceted_search_encoded(self, query: str = "", filters: Dict[str, List[str]] = None, limit: int = 10) -> bytes:
+        """Same as faceted_search but returns the JSON response body as bytes."""
+        if self.shards is not None:
+            return dumps(self._client_reply(self.shards.faceted_search(query, filters, limit)))
+        positions, total, counts = self.facet_index.search(query, filters, limit)
+        encoded = self.search_index.encoded
+        return (b'{"results":[' + b",".join(encoded[i] for i in positions)
+                + b'],"total":' + str(total).encode() + b',"facets":' + dumps(counts) + b"}")
+
+    def find_programs(self, min_fee_usd: float = None, max_fee_usd: float = None,
+                      deadline_within_days: int = None, today: date = None) -> List[Dict]:
+        """Programs by normalized yearly fee (USD) and/or deadline in the next N days.
+
+        e.g. find_programs(max_fee_usd=30000, deadline_within_days=60)
+        """
+        if self.shards is not None:
+            return self.shards.find_programs(min_fee_usd, max_fee_usd, deadline_within_days, today)["results"]
+        start_day = None
+        if deadline_within_days is not None:
+            start_day = day_of_year(today or date.today())
+        positions = self.program_index.query(min_fee_usd, max_fee_usd, start_day, deadline_within_days)
+        return self.program_index.get(positions)
 
-        # Filter by country/program/university if available
-        candidates = []
+    def find_eligible_programs(self, scores: Dict[str, float], strict: bool = False) -> List[Dict]:
+        """Programs whose test minimums are met, e.g. find_eligible_programs({"GPA": 3.5, "IELTS": 6.5})."""
+        if self.shards is not None:
+            return self.shards.find_eligible_programs(scores, strict)["results"]
+        return self.program_index.get(self.program_index.eligibility.eligible(scores, strict))
+
+    def _vocabulary_terms(self) -> List[str]:
+        """Names in the KB worth recognising when misspelled."""
+        terms = []
+        for p in self.kb.get("study_abroad_programs", []):
+            terms.extend([p.get("program"), p.get("university"), p.get("country")])
+        for t in self.kb.get("tuition_programs", []):
+            terms.append(t.get("program"))
+            terms.extend(t.get("subjects", []))
+        terms.extend(self.kb.get("visa_requirements", {}).keys())
+        if self.shards is not None:
+            terms.extend(self.shards.terms())
+        return [t for t in terms if isinstance(t, str)]
+
+    def _find_program_candidates(self, entities: Dict) -> List[Dict]:
+        # Filter by country/program if available
         country = entities.get("country")
         program = entities.get("program")
+        if self.shards is not None:
+            return self.shards.program_candidates(country, program)["results"]
+        return [p for p in self.kb.get("study_abroad_programs", []) if program_matches(p, country, program)]
 
-        for p in programs:
-            if country and country.lower() not in p.get("country","").lower() and country.lower() not in p.get("country","").lower():
-                # no country match -> skip
-                continue
-            if program and program.lower() not in p.get("program","").lower():
-                continue
-            candidates.append(p)
+    def _handle_program_search(self, message: str, entities: Dict, candidates: List[Dict] = None) -> str:
+        programs = self.kb.get("study_abroad_programs", [])
+        if not programs and self.shards is None:
+            return "I don't have program data loaded. Please run the knowledge base initialization."
 
+        if candidates is None:
+            candidates = self._find_program_candidates(entities)
         if not candidates:
             # fallback: show top 3
-            candidates = programs[:3]
+            return self.fragments.programs_default
 
         # Build response
-        lines = []
-        for c in candidates[:3]:
-            lines.append(f"{c.get('university')} — {c.get('program')} ({c.get('country')}) — Tuition: {c.get('tuition_fee')} — Deadline: {c.get('deadline')}")
-        return "Here are some programs I found:\n" + "\n".join(lines)
+        return join_program_lines([self.fragments.program_line(c) for c in candidates[:3]])
 
     def _handle_visa_info(self, entities: Dict) -> str:
         visa = self.kb.get("visa_requirements", {})
@@ -121,30 +367,23 @@ class ResponseGenerator:
 
         # Attempt to map common country keywords
         if country:
-            ckey = country.capitalize()
-            info = visa.get(ckey) or visa.get(country.upper()) or visa.get(country.lower())
-            if info:
-                reqs = "\n".join([f"- {r}" for r in info.get("requirements", [])])
-                return f"Visa: {info.get('visa_type')}\nProcessing time: {info.get('processing_time')}\nFee: {info.get('fee')}\nRequirements:\n{reqs}"
+            fragment = self.fragments.visa.get(country.lower())
+            if fragment:
+                return fragment
         # fallback listing
-        keys = list(visa.keys())[:5]
-        return f"I have visa information for: {', '.join(keys)}. Please specify a country for detailed info."
+        return self.fragments.visa_listing
 
-    def _handle_tuition_info(self, message: str) -> str:
+    def _handle_tuition_info(self, message: str, correct: bool = True) -> str:
         tuition = self.kb.get("tuition_programs", [])
         if not tuition:
             return "Tuition program information is not yet available."
 
-        hits = []
-        for t in tuition:
-            if any(tok in message.lower() for tok in (t.get("program","").lower(),)):
-                hits.append(t)
+        # Pad with spaces so names only match whole words of the corrected message
+        message_norm = f" {self.nlp.normalize_query(message) if correct else normalize_text(message)} "
+        hits = [line for name, line in self.fragments.tuition if f" {name} " in message_norm]
         if not hits:
-            hits = tuition[:2]
-        lines = []
-        for h in hits:
-            lines.append(f"{h.get('program')} — duration: {h.get('duration')} — fees: {h.get('fee_structure')}")
-        return "Tuition programs:\n" + "\n".join(lines)
+            return self.fragments.tuition_default
+        return join_tuition_lines(hits)
 
     def _handle_application_guide(self, entities: Dict) -> str:
         guides = self.kb.get("application_guides", {})
@@ -160,10 +399,8 @@ class ResponseGenerator:
             keys = list(guides.keys())
             key = keys[0] if keys else None
 
-        if key and key in guides:
-            g = guides[key]
-            steps = "\n".join([f"{i+1}. {s}" for i, s in enumerate(g.get("steps", []))])
-            return f"Application Guide ({key}):\n{steps}\nTimeline: {g.get('timeline')}"
+        if key and key in self.fragments.guides:
+            return self.fragments.guides[key]
         return "Application guides are available for USA and UK. Please specify which one you need."
     
     def _fallback_response(self, message: str) -> str:
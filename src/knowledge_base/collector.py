@@ -1,11 +1,7 @@
 import json
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 from pathlib import Path
 import logging
 from typing import Dict, List
-from config import settings
 
 class KnowledgeBaseCollector:
     """Collects data from various sources for the knowledge base"""
@@ -0,0 +1,319 @@
+"""
+Near-duplicate detection for collected knowledge-base records.
+
+Scraping several sources yields the same program many times over, differing only in
+formatting ("KES 15,000" vs "kes 15000", reordered fields, punctuation). Records are
+reduced to normalized text, shingled into word k-grams and summarized by a MinHash
+signature; LSH banding puts records that agree on a whole band of the signature in
+the same bucket, so only bucket mates are ever compared and the work stays near-linear
+in the number of records. Candidates whose estimated Jaccard similarity reaches the
+threshold, and whose identity fields (country, university, program) agree, are
+clustered with union-find; each cluster is merged into one record using per-field
+precedence rules. Buckets are capped, and a new record is compared with the candidate
+of each existing cluster that shares the most bands first, so a corpus with hundreds
+of copies of a record costs about one comparison per copy rather than one per bucket mate.
+"""
+
+import logging
+import re
+import zlib
+from itertools import islice
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from src.utils.text import normalize_text
+from config.settings import config as settings
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping fields that differ between copies of the same record
+IGNORED_FIELDS = ("id", "source", "url", "collected_at")
+# Merge strategies for DEDUP_FIELD_PRECEDENCE; fields without a rule use "first"
+MERGE_STRATEGIES = ("first", "longest", "union", "max", "min")
+
+# Records signed per vectorized batch
+SIGNATURE_CHUNK = 1024
+
+_MASK64 = (1 << 64) - 1
+_THOUSANDS = re.compile(r"(?<=\d)[,\s](?=\d{3}\b)")
+
+
+def record_text(record, ignored: Sequence[str] = IGNORED_FIELDS) -> str:
+    """Normalized text of a record's values, independent of field and list order and number formatting."""
+    parts: List[str] = []
+
+    def walk(value):
+        if isinstance(value, dict):
+            for key in sorted(value):
+                if key not in ignored:
+                    walk(value[key])
+        elif isinstance(value, (list, tuple)):
+            # Sources list the same requirements in different orders
+            scalars = sorted(normalize_text(str(v)) for v in value if isinstance(v, (str, int, float)))
+            parts.extend(scalars)
+            for v in value:
+                if not isinstance(v, (str, int, float)):
+                    walk(v)
+        elif isinstance(value, bool):
+            parts.append("yes" if value else "no")
+        elif value is not None:
+            parts.append(str(value))
+
+    walk(record)
+    return normalize_text(_THOUSANDS.sub("", " ".join(parts)))
+
+
+def record_key(record, fields: Sequence[str]) -> Tuple[str, ...]:
+    """Normalized identity fields; only records with equal keys are merged.
+
+    Text similarity can't tell "Law LLB at Leeds" from "Law LLB at York" (one word
+    apart), so fields like university and program must agree exactly.
+    """
+    if not isinstance(record, dict):
+        return ()
+    return tuple(normalize_text(str(record.get(f) or "")) for f in fields)
+
+
+class MinHasher:
+    """MinHash signatures over word k-shingles.
+
+    Each permutation is a multiply-shift hash of the 32-bit shingle hash x:
+    the top 32 bits of (a*x + b) mod 2^64, which numpy computes without division.
+    """
+
+    def __init__(self, num_perm: int = 120, shingle_size: int = 2, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # a must be odd; the shift keeps its top bits random too
+        self.a = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64) * np.uint64(4) | np.uint64(1)
+        self.b = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct hashed word k-shingles; texts shorter than k are one shingle."""
+        words = text.split()
+        k = self.shingle_size
+        grams = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64,
+                           count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.signatures([text])[0]
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), num_perm) uint32 signatures, hashing all of the texts' shingles at once."""
+        shingles = [self.shingles(t) for t in texts]
+        starts = np.cumsum([0] + [len(s) for s in shingles[:-1]])
+        hashes = (np.concatenate(shingles)[:, None] * self.a + self.b) >> np.uint64(32)
+        return np.minimum.reduceat(hashes, starts, axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimated Jaccard similarity: the fraction of permutations whose minima agree."""
+        return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures.
+
+    Signatures are cut into ``bands`` bands of ``rows`` values; records sharing any
+    whole band land in the same bucket. Pairs with Jaccard similarity s become
+    candidates with probability 1 - (1 - s^rows)^bands, an S-curve whose midpoint is
+    about (1/bands)^(1/rows). A ``salt`` (e.g. the hash of a record's identity fields)
+    keeps records with different salts out of each other's buckets. ``max_bucket`` caps
+    the members kept per bucket so a degenerate bucket can't make insertion quadratic.
+    """
+
+    def __init__(self, bands: int, rows: int, max_bucket: int = 100):
+        self.bands = bands
+        self.rows = rows
+        self.max_bucket = max_bucket
+        self.buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        # Random odd multipliers that fold each band's rows into one 64-bit bucket key
+        self._mix = np.random.RandomState(bands).randint(1, 1 << 62, size=rows, dtype=np.int64).astype(np.uint64) \
+            | np.uint64(1)
+
+    def add(self, key: int, signature: np.ndarray, salt: int = 0) -> List[int]:
+        """Insert ``key`` and return the keys already sharing a bucket with it, most shared bands first."""
+        candidates = []
+        keys = (signature.reshape(self.bands, self.rows).astype(np.uint64) * self._mix).sum(axis=1)
+        for buckets, band_key in zip(self.buckets, keys.tolist()):
+            members = buckets.setdefault(band_key ^ salt, [])
+            candidates.extend(members)
+            if len(members) < self.max_bucket:
+                members.append(key)
+        if not candidates:
+            return []
+        unique, shared = np.unique(candidates, return_counts=True)
+        # Stable: among equally close candidates the earlier record comes first
+        return unique[np.argsort(-shared, kind="stable")].tolist()
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent: List[int] = []
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # The earlier record stays the root, so clusters keep input order
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def merge_records(records: List[Dict], precedence: Dict[str, str] = None) -> Dict:
+    """Merge duplicate records, highest-precedence first, into one.
+
+    ``precedence`` maps a field to a strategy: "first" (first non-empty value),
+    "longest", "union" (list items in order, without repeats up to formatting), "max" or "min".
+    """
+    precedence = precedence or {}
+    merged: Dict = {}
+    for field in dict.fromkeys(f for r in records for f in r):
+        values = [r[field] for r in records if field in r and not _is_empty(r[field])]
+        if not values:
+            merged[field] = next(r[field] for r in records if field in r)
+            continue
+        strategy = precedence.get(field, "first")
+        if strategy == "union" and all(isinstance(v, list) for v in values):
+            seen, items = set(), []
+            for v in values:
+                for item in v:
+                    marker = normalize_text(item) if isinstance(item, str) else repr(item)
+                    if marker not in seen:
+                        seen.add(marker)
+                        items.append(item)
+            merged[field] = items
+        elif strategy == "longest":
+            merged[field] = max(values, key=lambda v: len(v) if hasattr(v, "__len__") else 0)
+        elif strategy in ("max", "min") and all(isinstance(v, (int, float)) for v in values):
+            merged[field] = max(values) if strategy == "max" else min(values)
+        else:
+            merged[field] = values[0]
+    return merged
+
+
+class Deduplicator:
+    """Finds and merges near-duplicate records; settings-driven defaults."""
+
+    def __init__(self, threshold: float = None, num_perm: int = None, bands: int = None,
+                 shingle_size: int = None, precedence: Dict[str, str] = None,
+                 source_precedence: List[str] = None, key_fields: List[str] = None, max_bucket: int = None):
+        self.logger = logging.getLogger(__name__)
+        self.threshold = settings.DEDUP_THRESHOLD if threshold is None else threshold
+        num_perm = num_perm or settings.DEDUP_NUM_PERM
+        bands = bands or settings.DEDUP_BANDS
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.bands, self.rows = bands, num_perm // bands
+        self.max_bucket = max_bucket or settings.DEDUP_MAX_BUCKET
+        self.hasher = MinHasher(num_perm, shingle_size or settings.DEDUP_SHINGLE_SIZE)
+        self.precedence = settings.DEDUP_FIELD_PRECEDENCE if precedence is None else precedence
+        unknown = set(self.precedence.values()) - set(MERGE_STRATEGIES)
+        if unknown:
+            raise ValueError(f"Unknown merge strategies: {sorted(unknown)}")
+        self.source_precedence = (settings.DEDUP_SOURCE_PRECEDENCE if source_precedence is None
+                                  else source_precedence)
+        self.key_fields = settings.DEDUP_KEY_FIELDS if key_fields is None else key_fields
+        self.stats = {"records": 0, "candidates": 0, "comparisons": 0}
+
+    def clusters(self, texts: Iterable[str], keys: Sequence[Hashable] = None) -> List[List[int]]:
+        """Groups of positions (in input order) whose texts are near duplicates, singletons included.
+
+        With ``keys`` (one per text), only texts with equal keys are grouped.
+        """
+        lsh = LSHIndex(self.bands, self.rows, self.max_bucket)
+        # Signatures in one growing uint32 matrix so candidates are checked in a single comparison
+        signatures = np.empty((SIGNATURE_CHUNK, self.hasher.num_perm), dtype=np.uint32)
+        parents = UnionFind()
+        texts = iter(texts)
+        while True:
+            chunk = list(islice(texts, SIGNATURE_CHUNK))
+            if not chunk:
+                break
+            start = len(parents.parent)
+            while start + len(chunk) > len(signatures):
+                signatures = np.concatenate([signatures, np.empty_like(signatures)])
+            signatures[start:start + len(chunk)] = self.hasher.signatures(chunk)
+            for i in range(start, start + len(chunk)):
+                parents.add()
+                signature = signatures[i]
+                root = parents.find(i)
+                key = keys[i] if keys is not None else None
+                # Candidates per existing cluster, best LSH match first
+                by_cluster: Dict[int, List[int]] = {}
+                for j in lsh.add(i, signature, hash(key) & _MASK64):
+                    cluster = parents.find(j)
+                    if cluster != root and (keys is None or keys[j] == key):
+                        by_cluster.setdefault(cluster, []).append(j)
+                self.stats["records"] += 1
+                for members in by_cluster.values():
+                    self.stats["candidates"] += len(members)
+                    # One match joins the whole cluster, so the other members are only
+                    # compared when the closest one falls short
+                    closest, rest = members[:1], members[1:]
+                    if self._matches(signatures, signature, closest) or self._matches(signatures, signature, rest):
+                        parents.union(i, members[0])
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(parents.parent)):
+            groups.setdefault(parents.find(i), []).append(i)
+        return list(groups.values())
+
+    def _matches(self, signatures: np.ndarray, signature: np.ndarray, members: List[int]) -> bool:
+        """True when any of ``members`` is estimated at least ``threshold`` similar to ``signature``."""
+        if not members:
+            return False
+        self.stats["comparisons"] += len(members)
+        agreement = np.count_nonzero(signatures[members] == signature, axis=1)
+        return bool(agreement.max() / self.hasher.num_perm >= self.threshold)
+
+    def _rank(self, record) -> int:
+        source = record.get("source") if isinstance(record, dict) else None
+        try:
+            return self.source_precedence.index(source)
+        except ValueError:
+            return len(self.source_precedence)
+
+    def dedup(self, records: List) -> List:
+        """Records with near duplicates merged, in order of each cluster's first record."""
+        result = []
+        merged = 0
+        keys = [record_key(r, self.key_fields) for r in records] if self.key_fields else None
+        for group in self.clusters((record_text(r) for r in records), keys):
+            if len(group) == 1:
+                result.append(records[group[0]])
+                continue
+            members = [records[i] for i in group]
+            if not all(isinstance(m, dict) for m in members):
+                result.append(members[0])
+            else:
+                # Stable sort: equally trusted sources keep input order
+                result.append(merge_records(sorted(members, key=self._rank), self.precedence))
+            merged += len(group) - 1
+            self.logger.debug(f"Merged {len(group)} near-duplicate records: {group}")
+        if merged:
+            self.logger.info(f"Merged {merged} near-duplicate records ({len(records)} -> {len(result)})")
+        return result
+
+    def dedup_kb(self, kb: Dict, categories: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """Deduplicate each list category of ``kb`` in place; returns records removed per category."""
+        removed = {}
+        for cat, data in kb.items():
+            if not isinstance(data, list) or (categories is not None and cat not in categories):
+                continue
+            kb[cat] = self.dedup(data)
+            removed[cat] = len(data) - len(kb[cat])
+        return removed
@@ -0,0 +1,115 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from src.knowledge_base.search_index import SearchIndex
+
+FACETS = ("category", "country", "program", "scholarship_available", "tuition_band")
+
+
+def tuition_band(fee_usd: Optional[float], bands: List[Tuple[Optional[float], str]]) -> Optional[str]:
+    """Label of the first band whose upper bound exceeds ``fee_usd`` (None bound = open-ended)."""
+    if fee_usd is None:
+        return None
+    for upper, label in bands:
+        if upper is None or fee_usd < upper:
+            return label
+    return None
+
+
+class FacetIndex:
+    """Facet values of the items of a SearchIndex as numpy code columns.
+
+    Each facet is an int32 array with one code per search-index item (-1 = no value)
+    and a list of labels indexed by code. The bitmap of a value is ``codes == code``;
+    values of one facet are OR-ed with ``np.isin``, facets are AND-ed, and counts for
+    the current result set are one ``np.bincount`` per facet. A code column costs
+    4 bytes per item however many distinct values the facet has.
+    """
+
+    def __init__(self, search_index: SearchIndex, tuition_bands: List[Tuple[Optional[float], str]],
+                 codes: Dict[str, np.ndarray] = None, labels: Dict[str, List[str]] = None):
+        self.search_index = search_index
+        self.tuition_bands = tuition_bands
+        self.size = len(search_index)
+        if codes is not None and labels is not None:
+            # Restored from a KB snapshot built over the same search index
+            self.codes = {facet: codes[facet] for facet in FACETS}
+            self.labels = {facet: list(labels[facet]) for facet in FACETS}
+        else:
+            self._build()
+        self._code_of = {facet: {v: c for c, v in enumerate(self.labels[facet])} for facet in FACETS}
+
+    def _build(self):
+        # One pass over the items; codes are assigned in order of first appearance
+        columns = {facet: [] for facet in FACETS}
+        code_of: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        for item in self.search_index.items:
+            values = self._facet_values(item)
+            for facet in FACETS:
+                value = values.get(facet)
+                if value is None:
+                    columns[facet].append(-1)
+                else:
+                    columns[facet].append(code_of[facet].setdefault(value, len(code_of[facet])))
+        self.codes = {facet: np.asarray(column, dtype=np.int32) for facet, column in columns.items()}
+        self.labels = {facet: list(values) for facet, values in code_of.items()}
+
+    def _facet_values(self, item: Dict) -> Dict[str, Optional[str]]:
+        category = item.get("category")
+        value = item.get("value")
+        values = {"category": category}
+        if category in ("visa_requirements",):
+            values["country"] = item.get("key")
+        elif category == "application_guides":
+            values["country"] = str(item.get("key", "")).split("_", 1)[0] or None
+        if isinstance(value, dict):
+            if value.get("country"):
+                values["country"] = value["country"]
+            if value.get("program"):
+                values["program"] = value["program"]
+            if "scholarship_available" in value:
+                values["scholarship_available"] = "true" if value["scholarship_available"] else "false"
+            values["tuition_band"] = tuition_band(value.get("tuition_fee_usd"), self.tuition_bands)
+        return values
+
+    def bitmap(self, facet: str, value: str) -> np.ndarray:
+        """Boolean mask of the items with ``value`` for ``facet``."""
+        code = self._code_of.get(facet, {}).get(value)
+        if code is None:
+            return np.zeros(self.size, dtype=bool)
+        return self.codes[facet] == code
+
+    def filter_mask(self, filters: Dict[str, List[str]]) -> np.ndarray:
+        """AND across facets of the OR of each facet's selected values."""
+        mask = np.ones(self.size, dtype=bool)
+        for facet, values in filters.items():
+            if facet not in self.codes or not values:
+                continue
+            selected = [self._code_of[facet][v] for v in values if v in self._code_of[facet]]
+            mask &= np.isin(self.codes[facet], selected)
+        return mask
+
+    def counts(self, mask: np.ndarray) -> Dict[str, Dict[str, int]]:
+        """Count of items in ``mask`` for every facet value (zero counts omitted)."""
+        counts = {}
+        for facet, codes in self.codes.items():
+            selected = codes[mask]
+            tally = np.bincount(selected[selected >= 0], minlength=len(self.labels[facet]))
+            labels = self.labels[facet]
+            counts[facet] = {labels[c]: int(tally[c]) for c in np.flatnonzero(tally)}
+        return counts
+
+    def search(self, query: str = "", filters: Dict[str, List[str]] = None,
+               limit: int = 10) -> Tuple[List[int], int, Dict[str, Dict[str, int]]]:
+        """Returns (first ``limit`` positions, total matches, facet counts for the matches)."""
+        mask = self.filter_mask(filters or {})
+        if query:
+            # Text matching only looks at items that survived the facet filters
+            query_lower = query.lower()
+            texts = self.search_index.texts
+            candidates = np.flatnonzero(mask)
+            matched = np.fromiter((query_lower in texts[pos] for pos in candidates.tolist()),
+                                  dtype=bool, count=len(candidates))
+            mask = np.zeros(self.size, dtype=bool)
+            mask[candidates[matched]] = True
+        positions = np.flatnonzero(mask)
+        return positions[:limit].tolist(), int(len(positions)), self.counts(mask)
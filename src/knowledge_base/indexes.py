@@ -0,0 +1,146 @@
+from typing import Dict, Iterable, List, Sequence, Tuple
+import numpy as np
+from src.knowledge_base.normalizers import annotate_program, normalize_test_name
+
+
+def program_matches(program: Dict, country: str = None, name: str = None) -> bool:
+    """Case-insensitive substring match of a program on country and program name."""
+    if country and country.lower() not in program.get("country", "").lower():
+        return False
+    if name and name.lower() not in program.get("program", "").lower():
+        return False
+    return True
+
+
+class SortedIndex:
+    """Sorted (value, position) arrays answering range queries with binary search.
+
+    Keys are float64 and positions int64 numpy arrays, so an index restored from a KB
+    snapshot works directly on the mapped arrays without copying them.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[float, int]]):
+        pairs = sorted(p for p in pairs if p[0] is not None)
+        self.keys = np.array([k for k, _ in pairs], dtype=np.float64)
+        self.positions = np.array([pos for _, pos in pairs], dtype=np.int64)
+
+    @classmethod
+    def from_sorted(cls, keys: Sequence[float], positions: Sequence[int]) -> "SortedIndex":
+        """Index over already sorted keys (e.g. arrays read from a KB snapshot, used as is)."""
+        index = cls(())
+        index.keys = np.asarray(keys)
+        index.positions = np.asarray(positions)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def range(self, low: float = None, high: float = None) -> List[int]:
+        """Positions whose value lies in [low, high], in ascending value order. O(log n + k)."""
+        lo = 0 if low is None else int(np.searchsorted(self.keys, low, side="left"))
+        hi = len(self.keys) if high is None else int(np.searchsorted(self.keys, high, side="right"))
+        return self.positions[lo:hi].tolist()
+
+    def above(self, value: float) -> np.ndarray:
+        """Positions whose value is greater than ``value``, as a view of the positions array."""
+        return self.positions[int(np.searchsorted(self.keys, value, side="right")):]
+
+
+class EligibilityIndex:
+    """Per-test threshold indexes over program requirements.
+
+    Each test (GPA, SAT, IELTS, ...) gets a SortedIndex of minimum scores, so the programs
+    a student fails on one test are a suffix of its positions. Programs that don't list
+    a test accept any score on it.
+    """
+
+    def __init__(self, thresholds: List[Dict[str, float]]):
+        self.size = len(thresholds)
+        pairs: Dict[str, List[Tuple[float, int]]] = {}
+        for pos, tests in enumerate(thresholds):
+            for test, minimum in (tests or {}).items():
+                pairs.setdefault(test, []).append((minimum, pos))
+        self.tests = {test: SortedIndex(p) for test, p in pairs.items()}
+
+    @classmethod
+    def from_indexes(cls, size: int, tests: Dict[str, SortedIndex]) -> "EligibilityIndex":
+        index = cls([])
+        index.size = size
+        index.tests = tests
+        return index
+
+    def eligible(self, scores: Dict[str, float], strict: bool = False) -> List[int]:
+        """Positions of programs whose minimums are all met by ``scores``.
+
+        With ``strict``, programs requiring a test the student has no score for are excluded.
+        """
+        scores = {normalize_test_name(t): float(v) for t, v in scores.items() if v is not None}
+        eligible = np.ones(self.size, dtype=bool)
+        for test, score in scores.items():
+            index = self.tests.get(test)
+            if index is not None:
+                # Programs listing the test with a minimum above the score
+                eligible[index.above(score)] = False
+        if strict:
+            for test, index in self.tests.items():
+                if test not in scores:
+                    eligible[index.positions] = False
+        return np.flatnonzero(eligible).tolist()
+
+
+class ProgramIndex:
+    """Typed fee/deadline columns over study-abroad programs with sorted indexes."""
+
+    def __init__(self, programs: List[Dict], fee_usd: SortedIndex = None, deadline_day: SortedIndex = None,
+                 eligibility: EligibilityIndex = None):
+        self.programs = programs
+        for p in programs:
+            # Aggregated files written before ingestion added typed fields
+            if "deadline_day" not in p or "requirement_thresholds" not in p:
+                annotate_program(p)
+        # Prebuilt indexes come from a KB snapshot of the same programs
+        if fee_usd is None:
+            fee_usd = SortedIndex((p.get("tuition_fee_usd"), i) for i, p in enumerate(programs))
+        if deadline_day is None:
+            deadline_day = SortedIndex((p.get("deadline_day"), i) for i, p in enumerate(programs))
+        if eligibility is None:
+            eligibility = EligibilityIndex([p.get("requirement_thresholds") for p in programs])
+        self.fee_usd = fee_usd
+        self.deadline_day = deadline_day
+        self.eligibility = eligibility
+
+    def fee_range(self, min_usd: float = None, max_usd: float = None) -> List[int]:
+        return self.fee_usd.range(min_usd, max_usd)
+
+    def deadline_window(self, start_day: int, days: int) -> List[int]:
+        """Programs whose deadline falls within ``days`` days from ``start_day``, wrapping at year end."""
+        if days >= 365:
+            return self.deadline_day.range()
+        end_day = start_day + days
+        if end_day <= 365:
+            return self.deadline_day.range(start_day, end_day)
+        return self.deadline_day.range(start_day, 365) + self.deadline_day.range(1, end_day - 365)
+
+    def query(self, min_fee_usd: float = None, max_fee_usd: float = None,
+              deadline_start_day: int = None, deadline_days: int = None) -> List[int]:
+        """Positions matching every given filter.
+
+        The fee range drives the ordering (cheapest first) when given; otherwise results
+        are ordered by deadline day. Each filter is a bisect over its sorted index, so the
+        cost is O(log n + k) in the sizes of the matching ranges.
+        """
+        ranges: List[List[int]] = []
+        if min_fee_usd is not None or max_fee_usd is not None:
+            ranges.append(self.fee_range(min_fee_usd, max_fee_usd))
+        if deadline_start_day is not None and deadline_days is not None:
+            ranges.append(self.deadline_window(deadline_start_day, deadline_days))
+        if not ranges:
+            return list(range(len(self.programs)))
+        result = ranges[0]
+        for other in ranges[1:]:
+            keep = set(other)
+            result = [pos for pos in result if pos in keep]
+        return result
+
+    def get(self, positions: Iterable[int]) -> List[Dict]:
+        return [self.programs[i] for i in positions]
@@ -0,0 +1,144 @@
+import re
+from datetime import date
+from typing import Dict, Optional, Tuple
+from config.settings import config as settings
+
+# Longest first so "AU$" wins over "$"; a bare "$" is taken as USD
+CURRENCY_SYMBOLS = {
+    "US$": "USD", "AU$": "AUD", "A$": "AUD", "CA$": "CAD", "C$": "CAD", "NZ$": "NZD",
+    "KShs": "KES", "KSh": "KES", "$": "USD", "£": "GBP", "€": "EUR"
+}
+CURRENCY_CODES = ("USD", "GBP", "EUR", "CAD", "AUD", "NZD", "KES", "CHF", "INR", "ZAR", "JPY", "CNY")
+# Fees quoted per period are annualized with these; "per term" assumes a three-term year
+PERIODS_PER_YEAR = {
+    "year": 1, "yr": 1, "annum": 1, "annually": 1, "yearly": 1,
+    "semester": 2, "sem": 2, "term": 3, "trimester": 3, "termly": 3,
+    "quarter": 4, "quarterly": 4, "month": 12, "mo": 12, "monthly": 12
+}
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12
+}
+# Non-leap reference year so "March 1" is always day 60
+REFERENCE_YEAR = 2001
+
+_SYMBOL = "|".join(re.escape(sym) for sym in sorted(CURRENCY_SYMBOLS, key=len, reverse=True))
+_CODE = "|".join(CURRENCY_CODES)
+# Amounts with grouped thousands ("45,000", "15.000", "1,250.50") or plain ("45000", "12.5")
+_AMOUNT = r"\d{1,3}(?:[.,]\d{3})+(?:[.,]\d{1,2})?(?!\d)|\d+(?:[.,]\d{1,2})?(?!\d)"
+_FEE_RE = re.compile(
+    rf"(?:(?<![A-Za-z])(?P<code>{_CODE})\b|(?P<symbol>{_SYMBOL}))?\s*(?P<amount>{_AMOUNT})"
+    rf"(?P<k>[kK]\b)?(?:\s*(?P<post_code>{_CODE})\b)?",
+    re.IGNORECASE
+)
+_PERIOD_RE = re.compile(
+    r"(?:/|\bper\b|\ba\b|\beach\b)\s*(?P<unit>year|yr|annum|semester|sem|trimester|term|quarter|month|mo)\b"
+    r"|\b(?P<adverb>annually|yearly|termly|quarterly|monthly)\b",
+    re.IGNORECASE
+)
+_MONTH = (r"(?P<{}>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+          r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b\.?")
+# Day 1-31, never part of a longer number ("March 2025" has no day), optional ordinal suffix
+_DAY = r"(?<!\d)(?P<{}>[12]\d|3[01]|0?[1-9])(?:st|nd|rd|th)?(?![\d])"
+_DATE_RE = re.compile(
+    _MONTH.format("month1") + r"\s*" + _DAY.format("day1")
+    + "|" + _DAY.format("day2") + r"\s+(?:of\s+)?" + _MONTH.format("month2"),
+    re.IGNORECASE
+)
+_REQUIREMENT_RE = re.compile(rf"^\s*([A-Za-z][A-Za-z\s\-]*?)\s*:\s*({_AMOUNT})\s*\+?")
+
+
+def _parse_amount(text: str) -> float:
+    """Number from "45,000", "15.000" (grouping dot), "1,250.50" or "12,5" (decimal comma)."""
+    grouped = re.fullmatch(r"(\d{1,3}(?:([.,])\d{3})+)(?:[.,](\d{1,2}))?", text)
+    if grouped:
+        whole = grouped.group(1).replace(grouped.group(2), "")
+        return float(f"{whole}.{grouped.group(3)}" if grouped.group(3) else whole)
+    return float(text.replace(",", "."))
+
+
+def parse_fee(text: str) -> Optional[Tuple[float, str]]:
+    """Parse "$54,000/year", "45,000 CAD/year" or "KES 15,000/term" into (yearly amount, currency).
+
+    The amount is the first number with a currency code or symbol next to it, so counts
+    like "2 x $10,000" are skipped. Per-semester/term/month fees are annualized using
+    PERIODS_PER_YEAR. Returns None when no amount has a recognizable currency.
+    """
+    if not text or not isinstance(text, str):
+        return None
+    for m in _FEE_RE.finditer(text):
+        if m.group("symbol"):
+            currency = CURRENCY_SYMBOLS[next(sym for sym in CURRENCY_SYMBOLS
+                                             if sym.lower() == m.group("symbol").lower())]
+        elif m.group("code") or m.group("post_code"):
+            currency = (m.group("code") or m.group("post_code")).upper()
+        else:
+            continue
+        amount = _parse_amount(m.group("amount"))
+        if m.group("k"):
+            amount *= 1000
+        period = _PERIOD_RE.search(text, m.end())
+        if period:
+            amount *= PERIODS_PER_YEAR[(period.group("unit") or period.group("adverb")).lower()]
+        return amount, currency
+    return None
+
+
+def to_usd(amount: float, currency: str, rates: Dict[str, float] = None) -> Optional[float]:
+    """Convert with the local FX table; None when the currency is unknown."""
+    rate = (rates or settings.FX_RATES_TO_USD).get(currency.upper())
+    return round(amount * rate, 2) if rate is not None else None
+
+
+def parse_deadline_day(text: str) -> Optional[int]:
+    """Day of year (1-365) for "January 1", "Jan 13th" or "15th October"; None if not a date."""
+    if not text or not isinstance(text, str):
+        return None
+    for m in _DATE_RE.finditer(text):
+        month_name, day = (m.group("month1"), m.group("day1")) if m.group("month1") else (m.group("month2"),
+                                                                                           m.group("day2"))
+        try:
+            return date(REFERENCE_YEAR, MONTHS[month_name[:3].lower()], int(day)).timetuple().tm_yday
+        except ValueError:
+            continue
+    return None
+
+
+def day_of_year(d: date) -> int:
+    """Day of ``d`` on the non-leap reference calendar (Feb 29 maps to Mar 1)."""
+    if d.month == 2 and d.day == 29:
+        return date(REFERENCE_YEAR, 3, 1).timetuple().tm_yday
+    return date(REFERENCE_YEAR, d.month, d.day).timetuple().tm_yday
+
+
+def parse_requirements(requirements) -> Dict[str, float]:
+    """Numeric minimums from strings like "SAT: 1,500+" or "IELTS: 7.0+", keyed by test name.
+
+    Non-numeric requirements ("A-levels: A*AA", "High School Diploma") are skipped.
+    """
+    thresholds = {}
+    for req in requirements or []:
+        if not isinstance(req, str):
+            continue
+        m = _REQUIREMENT_RE.match(req)
+        if m:
+            thresholds[normalize_test_name(m.group(1))] = _parse_amount(m.group(2))
+    return thresholds
+
+
+def normalize_test_name(name: str) -> str:
+    return re.sub(r"[\s\-]+", "_", name.strip()).upper()
+
+
+def annotate_program(program: Dict) -> Dict:
+    """Add typed ``tuition_fee_amount``/``_currency``/``_usd``, ``deadline_day`` and
+    ``requirement_thresholds`` fields."""
+    fee = parse_fee(program.get("tuition_fee"))
+    if fee:
+        program["tuition_fee_amount"], program["tuition_fee_currency"] = fee
+        program["tuition_fee_usd"] = to_usd(*fee)
+    else:
+        program["tuition_fee_amount"] = program["tuition_fee_currency"] = program["tuition_fee_usd"] = None
+    program["deadline_day"] = parse_deadline_day(program.get("deadline"))
+    program["requirement_thresholds"] = parse_requirements(program.get("requirements"))
+    return program
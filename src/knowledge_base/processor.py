@@ -3,7 +3,18 @@ from pathlib import Path
 import logging
 import sqlite3
 from typing import Dict, Any
-from config import settings
+from config.settings import config as settings
+from src.knowledge_base.normalizers import annotate_program
+from src.knowledge_base.dedup import Deduplicator
+from src.knowledge_base.snapshot import build_snapshot
+
+# Typed columns added after the original schema; older DBs get them via ALTER TABLE
+TYPED_PROGRAM_COLUMNS = {
+    "tuition_fee_amount": "REAL",
+    "tuition_fee_currency": "TEXT",
+    "tuition_fee_usd": "REAL",
+    "deadline_day": "INTEGER"
+}
 
 class KnowledgeBaseProcessor:
     """Processes raw knowledge base JSON files and stores them in a simple sqlite DB and aggregated JSON."""
@@ -27,11 +38,31 @@ class KnowledgeBaseProcessor:
             except Exception as e:
                 self.logger.error(f"Failed to load {file}: {e}")
 
+        # Merge near-duplicate records scraped from several sources before anything is indexed
+        if settings.DEDUP_ENABLED:
+            try:
+                removed = Deduplicator().dedup_kb(aggregated)
+                self.logger.info(f"Near-duplicate records removed: {removed}")
+            except Exception:
+                self.logger.exception("Near-duplicate merging failed; storing records as collected")
+
+        # Parse free-text fees/deadlines into typed fields once, at ingestion
+        for p in aggregated.get("study_abroad_programs", []):
+            annotate_program(p)
+
         # Save aggregated JSON for quick loading
         agg_file = self.output_dir / "knowledge_base_aggregated.json"
         with open(agg_file, "w") as f:
             json.dump(aggregated, f, indent=2)
 
+        # Snapshot bundle workers open with mmap instead of parsing the indented JSON above.
+        # scripts/build_snapshot.py adds the intent model and question embeddings.
+        if settings.KB_SNAPSHOT_PATH:
+            try:
+                build_snapshot(aggregated, settings.KB_SNAPSHOT_PATH)
+            except Exception:
+                self.logger.exception("Failed to write knowledge base snapshot")
+
         # Create a very small sqlite DB with simple tables for demonstration
         try:
             conn = sqlite3.connect(str(self.db_path))
@@ -47,17 +78,28 @@ class KnowledgeBaseProcessor:
                     tuition_fee TEXT,
                     requirements TEXT,
                     deadline TEXT,
-                    scholarship_available INTEGER
+                    scholarship_available INTEGER,
+                    tuition_fee_amount REAL,
+                    tuition_fee_currency TEXT,
+                    tuition_fee_usd REAL,
+                    deadline_day INTEGER
                 )
             """)
+            existing = {row[1] for row in c.execute("PRAGMA table_info(programs)")}
+            for column, col_type in TYPED_PROGRAM_COLUMNS.items():
+                if column not in existing:
+                    c.execute(f"ALTER TABLE programs ADD COLUMN {column} {col_type}")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_programs_fee_usd ON programs (tuition_fee_usd)")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_programs_deadline_day ON programs (deadline_day)")
             # Insert programs if any
             programs = aggregated.get("study_abroad_programs", [])
             for p in programs:
                 try:
                     c.execute("""
                         INSERT OR REPLACE INTO programs (
-                            id, country, university, program, duration, tuition_fee, requirements, deadline, scholarship_available
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            id, country, university, program, duration, tuition_fee, requirements, deadline, scholarship_available,
+                            tuition_fee_amount, tuition_fee_currency, tuition_fee_usd, deadline_day
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, (
                         p.get("id"),
                         p.get("country"),
@@ -67,10 +109,31 @@ class KnowledgeBaseProcessor:
                         p.get("tuition_fee"),
                         json.dumps(p.get("requirements", [])),
                         p.get("deadline"),
-                        int(bool(p.get("scholarship_available")))
+                        int(bool(p.get("scholarship_available"))),
+                        p.get("tuition_fee_amount"),
+                        p.get("tuition_fee_currency"),
+                        p.get("tuition_fee_usd"),
+                        p.get("deadline_day")
                     ))
                 except Exception:
                     self.logger.exception("Failed to insert program %s", p.get("id"))
+
+            # Numeric requirement minimums, one row per (program, test)
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS program_requirements (
+                    program_id TEXT,
+                    test TEXT,
+                    minimum REAL,
+                    PRIMARY KEY (program_id, test)
+                )
+            """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_requirements_test_minimum ON program_requirements (test, minimum)")
+            for p in programs:
+                c.execute("DELETE FROM program_requirements WHERE program_id = ?", (p.get("id"),))
+                c.executemany(
+                    "INSERT INTO program_requirements (program_id, test, minimum) VALUES (?, ?, ?)",
+                    [(p.get("id"), test, minimum) for test, minimum in p.get("requirement_thresholds", {}).items()]
+                )
             conn.commit()
             conn.close()
         except Exception:
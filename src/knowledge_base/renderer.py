@@ -0,0 +1,83 @@
+import sys
+from typing import Dict, List
+from src.utils.text import normalize_text
+
+
+class RenderedFragments:
+    """Pre-formatted answer fragments for the aggregated knowledge base.
+
+    The knowledge base only changes on ``--init-kb``, so the text handlers send back
+    for a visa country, application guide, tuition program or study-abroad program is
+    rendered once here. Strings are interned so repeated answers share one object.
+    """
+
+    def __init__(self, kb: Dict):
+        self.visa: Dict[str, str] = {}
+        self.visa_listing = ""
+        self.guides: Dict[str, str] = {}
+        self.tuition: List[tuple] = []
+        self.tuition_default = ""
+        self.programs: Dict[str, str] = {}
+        self.programs_default = ""
+        self.render(kb)
+
+    def render(self, kb: Dict):
+        visa = kb.get("visa_requirements", {}) or {}
+        for country, info in visa.items():
+            # Keyed by lowercase country so lookups don't depend on entity casing
+            self.visa[country.lower()] = sys.intern(render_visa(info))
+        if visa:
+            self.visa_listing = sys.intern(
+                f"I have visa information for: {', '.join(list(visa.keys())[:5])}. "
+                f"Please specify a country for detailed info."
+            )
+
+        guides = kb.get("application_guides", {}) or {}
+        for key, guide in guides.items():
+            self.guides[key] = sys.intern(render_guide(key, guide))
+
+        tuition = kb.get("tuition_programs", []) or []
+        # (normalized program name, rendered line) in KB order
+        self.tuition = [(normalize_text(t.get("program", "")), sys.intern(render_tuition_line(t))) for t in tuition]
+        if self.tuition:
+            self.tuition_default = sys.intern(join_tuition_lines([line for _, line in self.tuition[:2]]))
+
+        programs = kb.get("study_abroad_programs", []) or []
+        for p in programs:
+            # Records without an id can't be told apart by key; program_line renders them on demand
+            if p.get("id") is not None:
+                self.programs[p["id"]] = sys.intern(render_program_line(p))
+        if programs:
+            self.programs_default = sys.intern(join_program_lines([self.program_line(p) for p in programs[:3]]))
+
+    def program_line(self, program: Dict) -> str:
+        program_id = program.get("id")
+        line = self.programs.get(program_id) if program_id is not None else None
+        return line if line is not None else render_program_line(program)
+
+
+def render_visa(info: Dict) -> str:
+    reqs = "\n".join([f"- {r}" for r in info.get("requirements", [])])
+    return f"Visa: {info.get('visa_type')}\nProcessing time: {info.get('processing_time')}\nFee: {info.get('fee')}\nRequirements:\n{reqs}"
+
+
+def render_guide(key: str, guide: Dict) -> str:
+    steps = "\n".join([f"{i+1}. {s}" for i, s in enumerate(guide.get("steps", []))])
+    return f"Application Guide ({key}):\n{steps}\nTimeline: {guide.get('timeline')}"
+
+
+def render_tuition_line(program: Dict) -> str:
+    return f"{program.get('program')} — duration: {program.get('duration')} — fees: {program.get('fee_structure')}"
+
+
+def join_tuition_lines(lines: List[str]) -> str:
+    return "Tuition programs:\n" + "\n".join(lines)
+
+
+def render_program_line(program: Dict) -> str:
+    return (f"{program.get('university')} — {program.get('program')} ({program.get('country')}) — "
+            f"Tuition: {program.get('tuition_fee')} — Deadline: {program.get('deadline')}")
+
+
+def join_program_lines(lines: List[str]) -> str:
+    return "Here are some programs I found:\n" + "\n".join(lines)
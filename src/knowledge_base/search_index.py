@@ -0,0 +1,78 @@
+import json
+from typing import Dict, List, Sequence
+from src.utils.json_codec import dumps
+
+
+class SearchIndex:
+    """Flattened view of the aggregated knowledge base used by keyword search.
+
+    Built once per KB load: every record is wrapped as ``{"category", "key"?, "value"}``,
+    its lowercase search text is computed, and its JSON encoding is stored so API
+    responses can splice the bytes in without re-serializing the record.
+
+    ``texts``/``encoded`` taken from a KB snapshot skip that work; they must come from
+    an index built over the same KB.
+    """
+
+    def __init__(self, kb: Dict, texts: List[str] = None, encoded: Sequence[bytes] = None):
+        self.items: List[Dict] = []
+        self.texts: List[str] = []
+        self.encoded: List[bytes] = []
+        self.by_category: Dict[str, List[int]] = {}
+        if texts is not None and encoded is not None:
+            self.restore(kb, texts, encoded)
+        else:
+            self.build(kb)
+
+    @staticmethod
+    def _entries(kb: Dict):
+        for cat, data in kb.items():
+            if isinstance(data, dict):
+                # dict entries (visa, guides)
+                entries = [{"category": cat, "key": k, "value": v} for k, v in data.items()]
+            elif isinstance(data, list):
+                entries = [{"category": cat, "value": it} for it in data]
+            else:
+                continue
+            for item in entries:
+                yield cat, item
+
+    def build(self, kb: Dict):
+        for cat, item in self._entries(kb):
+            self.by_category.setdefault(cat, []).append(len(self.items))
+            self.items.append(item)
+            value = item["value"]
+            self.texts.append(json.dumps(value).lower() if isinstance(value, dict) else str(value).lower())
+            self.encoded.append(dumps(item))
+
+    def restore(self, kb: Dict, texts: List[str], encoded: Sequence[bytes]):
+        for cat, item in self._entries(kb):
+            self.by_category.setdefault(cat, []).append(len(self.items))
+            self.items.append(item)
+        if not len(self.items) == len(texts) == len(encoded):
+            raise ValueError(f"Search index has {len(self.items)} items but {len(texts)} texts "
+                             f"and {len(encoded)} encodings")
+        self.texts = texts
+        self.encoded = encoded
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def search(self, query: str, category: str = "", limit: int = 10) -> List[int]:
+        """Return positions of items whose text contains ``query``, in KB order."""
+        query_lower = query.lower()
+        if category and category in self.by_category:
+            candidates = self.by_category[category]
+        else:
+            candidates = range(len(self.items))
+        hits = []
+        for i in candidates:
+            if query_lower in self.texts[i]:
+                hits.append(i)
+                if len(hits) >= limit:
+                    break
+        return hits
+
+    def encode_results(self, positions: List[int]) -> bytes:
+        """JSON body ``{"results": [...]}`` assembled from the pre-encoded records."""
+        return b'{"results":[' + b",".join(self.encoded[i] for i in positions) + b"]}"
@@ -0,0 +1,408 @@
+import heapq
+import logging
+import multiprocessing
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from src.knowledge_base.facets import FacetIndex
+from src.knowledge_base.indexes import ProgramIndex, program_matches
+from src.knowledge_base.normalizers import day_of_year
+from src.knowledge_base.search_index import SearchIndex
+from src.utils.json_codec import dumps, loads
+from config.settings import config as settings
+
+logger = logging.getLogger(__name__)
+
+PARTITION_SCHEMES = ("country", "hash")
+
+
+def item_country(category: str, item: Dict) -> Optional[str]:
+    """Country a search item belongs to, if any (same rules as the country facet)."""
+    value = item.get("value")
+    if isinstance(value, dict) and value.get("country"):
+        return str(value["country"])
+    if category == "visa_requirements":
+        return item.get("key")
+    if category == "application_guides":
+        return str(item.get("key", "")).split("_", 1)[0] or None
+    return None
+
+
+def _bucket(text: str, num_shards: int) -> int:
+    # crc32 rather than hash(): stable across processes and Python runs
+    return zlib.crc32(text.lower().encode("utf-8")) % num_shards
+
+
+def partition_kb(kb: Dict, num_shards: int, by: str = "country") -> List[Dict]:
+    """Split an aggregated KB into ``num_shards`` shard KBs.
+
+    ``by="country"`` keeps all items of one country on the same shard (items without a
+    country are hashed); ``by="hash"`` spreads items evenly by content. Each shard is
+    ``{"shard", "num_shards", "categories", "kb", "item_seqs", "program_seqs"}``, where the seqs are
+    the items' positions in the unsharded SearchIndex and program list, so merged
+    results come out in the same order a single node would return.
+    """
+    if by not in PARTITION_SCHEMES:
+        raise ValueError(f"Unknown partition scheme {by!r}; expected one of {PARTITION_SCHEMES}")
+    categories = [cat for cat, data in kb.items() if isinstance(data, (dict, list))]
+    shards = [{"shard": i, "num_shards": num_shards, "categories": categories, "kb": {},
+               "item_seqs": [], "program_seqs": []} for i in range(num_shards)]
+    program_seq = 0
+    for seq, (category, item) in enumerate(SearchIndex._entries(kb)):
+        country = item_country(category, item) if by == "country" else None
+        shard = shards[_bucket(country or dumps(item).decode("utf-8"), num_shards)]
+        shard["item_seqs"].append(seq)
+        if "key" in item:
+            shard["kb"].setdefault(category, {})[item["key"]] = item["value"]
+        else:
+            shard["kb"].setdefault(category, []).append(item["value"])
+        if category == "study_abroad_programs":
+            shard["program_seqs"].append(program_seq)
+            program_seq += 1
+    return shards
+
+
+def program_sort_key(program: Dict, seq: int, min_fee_usd: float = None, max_fee_usd: float = None,
+                     deadline_start_day: int = None, deadline_days: int = None) -> List:
+    """Merge key reproducing ProgramIndex.query ordering across shards."""
+    if min_fee_usd is not None or max_fee_usd is not None:
+        return [program.get("tuition_fee_usd"), seq]
+    if deadline_start_day is not None and deadline_days is not None:
+        day = program.get("deadline_day")
+        if deadline_days >= 365:
+            return [day, seq]
+        # Window wraps at year end: days from the start day onwards come first
+        return [(day - deadline_start_day) % 365, seq]
+    return [seq]
+
+
+class ShardNode:
+    """The part of the knowledge base held by one shard, with its local indexes."""
+
+    def __init__(self, shard: Dict):
+        self.shard_id = shard["shard"]
+        self.kb = shard["kb"]
+        self.categories = set(shard.get("categories", ()))
+        self.item_seqs = shard["item_seqs"]
+        self.program_seqs = shard["program_seqs"]
+        # Program index first: it adds the typed fee fields the tuition_band facet uses
+        self.program_index = ProgramIndex(self.kb.get("study_abroad_programs", []))
+        self.search_index = SearchIndex(self.kb)
+        self.facet_index = FacetIndex(self.search_index, settings.TUITION_BANDS_USD)
+
+    @classmethod
+    def load(cls, path: str) -> "ShardNode":
+        with open(path, "rb") as f:
+            return cls(loads(f.read()))
+
+    def search(self, query: str, category: str = "", limit: int = 10) -> List[Dict]:
+        if category in self.categories and category not in self.search_index.by_category:
+            # Known category with no items here; an unknown one searches everything, as on one node
+            return []
+        positions = self.search_index.search(query, category, limit)
+        return [{"key": [self.item_seqs[i]], "item": self.search_index.items[i]} for i in positions]
+
+    def programs(self, min_fee_usd: float = None, max_fee_usd: float = None, deadline_start_day: int = None,
+                 deadline_days: int = None, limit: int = None) -> List[Dict]:
+        positions = self.program_index.query(min_fee_usd, max_fee_usd, deadline_start_day, deadline_days)
+        hits = []
+        for i in positions[:limit]:
+            program = self.program_index.programs[i]
+            key = program_sort_key(program, self.program_seqs[i], min_fee_usd, max_fee_usd,
+                                   deadline_start_day, deadline_days)
+            hits.append({"key": key, "item": program})
+        return hits
+
+    def eligible(self, scores: Dict[str, float], strict: bool = False, limit: int = None) -> List[Dict]:
+        positions = self.program_index.eligibility.eligible(scores, strict)[:limit]
+        return [{"key": [self.program_seqs[i]], "item": self.program_index.programs[i]} for i in positions]
+
+    def candidates(self, country: str = None, program: str = None, limit: int = None) -> List[Dict]:
+        programs = self.program_index.programs
+        return [{"key": [self.program_seqs[i]], "item": p} for i, p in enumerate(programs)
+                if program_matches(p, country, program)][:limit]
+
+    def facets(self, query: str = "", filters: Dict[str, List[str]] = None, limit: int = 10) -> Dict:
+        # Shards hold disjoint items, so totals and facet counts add up across shards
+        positions, total, counts = self.facet_index.search(query, filters, limit)
+        hits = [{"key": [self.item_seqs[i]], "item": self.search_index.items[i]} for i in positions]
+        return {"hits": hits, "total": total, "facets": counts}
+
+    def records(self, exclude: List[str] = ()) -> List[Dict]:
+        """Every item outside the ``exclude`` categories, keyed by its global sequence."""
+        exclude = set(exclude)
+        return [{"key": [self.item_seqs[i]], "item": item} for i, item in enumerate(self.search_index.items)
+                if item["category"] not in exclude]
+
+    def terms(self) -> List[str]:
+        """Program, university and country names held by this shard."""
+        names = set()
+        for p in self.program_index.programs:
+            names.update((p.get("program"), p.get("university"), p.get("country")))
+        return sorted(t for t in names if isinstance(t, str))
+
+    def stats(self) -> Dict:
+        return {"shard": self.shard_id, "items": len(self.search_index), "programs": len(self.program_seqs)}
+
+
+class _ShardRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, payload: Dict):
+        body = dumps(payload)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, self.server.node.stats())
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        node = self.server.node
+        try:
+            params = loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            payload = {"shard": node.shard_id}
+            if self.path == "/search":
+                payload["hits"] = node.search(params.get("query", ""), params.get("category", ""),
+                                              params.get("limit", 10))
+            elif self.path == "/programs":
+                payload["hits"] = node.programs(**params)
+            elif self.path == "/eligible":
+                payload["hits"] = node.eligible(params.get("scores", {}), params.get("strict", False),
+                                                params.get("limit"))
+            elif self.path == "/candidates":
+                payload["hits"] = node.candidates(params.get("country"), params.get("program"), params.get("limit"))
+            elif self.path == "/facets":
+                payload.update(node.facets(params.get("query", ""), params.get("filters"), params.get("limit", 10)))
+            elif self.path == "/records":
+                payload["hits"] = node.records(params.get("exclude", ()))
+            elif self.path == "/terms":
+                payload["terms"] = node.terms()
+            else:
+                self._reply(404, {"error": "not found"})
+                return
+        except (ValueError, TypeError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+        self._reply(200, payload)
+
+    def log_message(self, format, *args):
+        logger.debug("shard %s: " + format, self.server.node.shard_id, *args)
+
+
+class ShardServer(ThreadingHTTPServer):
+    """HTTP server answering KB queries for one ShardNode."""
+
+    daemon_threads = True
+
+    def __init__(self, node: ShardNode, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _ShardRequestHandler)
+        self.node = node
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def serve_shard(path: str, host: str = "127.0.0.1", port: int = 0, ready=None):
+    """Process entry point: load a shard file and serve it until terminated."""
+    server = ShardServer(ShardNode.load(path), host, port)
+    logger.info("Shard %s serving %s on %s", server.node.shard_id, path, server.url)
+    if ready is not None:
+        ready.put(server.url)
+    server.serve_forever()
+
+
+class ShardCoordinator:
+    """Fans queries out to shard servers in parallel and merges their top-k hits.
+
+    Every shard returns at most ``limit`` hits sorted by a merge key (global sequence,
+    or normalized fee/deadline for program queries), so a k-way merge of the replies
+    gives exactly the first ``limit`` results a single node would. Shards that fail or
+    don't answer within ``timeout`` seconds are left out and the reply is marked partial.
+    """
+
+    def __init__(self, urls: List[str], timeout: float = None, max_workers: int = None):
+        if not urls:
+            raise ValueError("ShardCoordinator needs at least one shard URL")
+        self.urls = [u.rstrip("/") for u in urls]
+        self.timeout = settings.SHARD_TIMEOUT_MS / 1000.0 if timeout is None else timeout
+        # Headroom so a hung shard holding a worker doesn't delay fan-out to the others
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or 4 * len(self.urls),
+                                            thread_name_prefix="shard-fanout")
+        # Request threads of the web app scatter concurrently, so counters are updated under a lock
+        self._stats_lock = threading.Lock()
+        self.stats = {"queries": 0, "partial": 0, "shard_failures": 0, "shard_timeouts": 0}
+
+    def _count(self, **increments: int):
+        with self._stats_lock:
+            for name, n in increments.items():
+                self.stats[name] += n
+
+    def _call(self, url: str, path: str, params: Dict) -> Dict:
+        req = urllib.request.Request(url + path, data=dumps(params), method="POST",
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return loads(resp.read())
+
+    def gather(self, path: str, params: Dict) -> Tuple[List[Dict], List[str]]:
+        """Query every shard; returns (replies of the shards that answered, URLs of those that didn't)."""
+        started = time.monotonic()
+        futures = {self._executor.submit(self._call, url, path, params): url for url in self.urls}
+        done, not_done = wait(futures, timeout=self.timeout)
+        replies, failed = [], []
+        for future in done:
+            try:
+                replies.append(future.result())
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                failed.append(futures[future])
+                logger.warning("Shard %s failed on %s: %s", futures[future], path, e)
+        timed_out = 0
+        for future in not_done:
+            # The request keeps running until its socket timeout; its answer is dropped
+            future.cancel()
+            timed_out += 1
+            failed.append(futures[future])
+            logger.warning("Shard %s timed out on %s after %.0f ms", futures[future], path,
+                           (time.monotonic() - started) * 1000)
+        self._count(queries=1, partial=int(bool(failed)), shard_failures=len(failed) - timed_out,
+                    shard_timeouts=timed_out)
+        return replies, sorted(failed)
+
+    @staticmethod
+    def _merge(replies: List[Dict], limit: int = None) -> List[Dict]:
+        merged = heapq.merge(*(reply["hits"] for reply in replies), key=lambda hit: hit["key"])
+        return [hit["item"] for hit in islice(merged, limit)]
+
+    def scatter(self, path: str, params: Dict, limit: int = None) -> Dict:
+        """Query every shard and merge their hits; returns {"results", "partial", "failed_shards"}."""
+        replies, failed = self.gather(path, params)
+        return {"results": self._merge(replies, limit), "partial": bool(failed), "failed_shards": failed}
+
+    def search(self, query: str, category: str = "", limit: int = 10) -> Dict:
+        return self.scatter("/search", {"query": query, "category": category, "limit": limit}, limit)
+
+    def find_programs(self, min_fee_usd: float = None, max_fee_usd: float = None,
+                      deadline_within_days: int = None, today: date = None, limit: int = None) -> Dict:
+        start_day = None
+        if deadline_within_days is not None:
+            # Resolved here so every shard uses the same window
+            start_day = day_of_year(today or date.today())
+        params = {"min_fee_usd": min_fee_usd, "max_fee_usd": max_fee_usd,
+                  "deadline_start_day": start_day, "deadline_days": deadline_within_days, "limit": limit}
+        return self.scatter("/programs", params, limit)
+
+    def find_eligible_programs(self, scores: Dict[str, float], strict: bool = False, limit: int = None) -> Dict:
+        return self.scatter("/eligible", {"scores": scores, "strict": strict, "limit": limit}, limit)
+
+    def program_candidates(self, country: str = None, program: str = None, limit: int = None) -> Dict:
+        """Programs matching a country and/or program name, in KB order."""
+        return self.scatter("/candidates", {"country": country, "program": program, "limit": limit}, limit)
+
+    def faceted_search(self, query: str = "", filters: Dict[str, List[str]] = None, limit: int = 10) -> Dict:
+        """Faceted search over all shards; totals and facet counts are summed over the shards that answered."""
+        replies, failed = self.gather("/facets", {"query": query, "filters": filters, "limit": limit})
+        counts: Dict[str, Dict[str, int]] = {}
+        for reply in replies:
+            for facet, values in reply["facets"].items():
+                merged = counts.setdefault(facet, {})
+                for value, n in values.items():
+                    merged[value] = merged.get(value, 0) + n
+        return {"results": self._merge(replies, limit), "total": sum(reply["total"] for reply in replies),
+                "facets": counts, "partial": bool(failed), "failed_shards": failed}
+
+    def reference_kb(self, exclude: Tuple[str, ...] = ("study_abroad_programs",)) -> Dict:
+        """The KB categories outside ``exclude`` (visa, guides, tuition, ...), reassembled in KB order.
+
+        Returns {"kb", "partial", "failed_shards"}; a coordinator loads these small tables
+        at startup instead of the whole KB.
+        """
+        result = self.scatter("/records", {"exclude": list(exclude)})
+        kb: Dict = {}
+        for item in result.pop("results"):
+            if "key" in item:
+                kb.setdefault(item["category"], {})[item["key"]] = item["value"]
+            else:
+                kb.setdefault(item["category"], []).append(item["value"])
+        result["kb"] = kb
+        return result
+
+    def terms(self) -> List[str]:
+        """Program, university and country names across the shards that answered."""
+        replies, _ = self.gather("/terms", {})
+        return sorted(set().union(*(reply["terms"] for reply in replies)))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class LocalShardCluster:
+    """Runs each shard of a KB in its own local process, standing in for separate nodes.
+
+    with LocalShardCluster(kb, num_shards=4, by="country") as cluster:
+        coordinator = ShardCoordinator(cluster.urls)
+    """
+
+    def __init__(self, kb: Dict, num_shards: int, by: str = "country", host: str = "127.0.0.1",
+                 shard_dir: str = None, start_timeout: float = 30.0):
+        self.kb = kb
+        self.num_shards = num_shards
+        self.by = by
+        self.host = host
+        self.start_timeout = start_timeout
+        self._tmp = None if shard_dir else tempfile.TemporaryDirectory(prefix="kb-shards-")
+        self.shard_dir = Path(shard_dir or self._tmp.name)
+        self.processes: List[multiprocessing.Process] = []
+        self.urls: List[str] = []
+
+    def start(self) -> "LocalShardCluster":
+        paths = write_shards(partition_kb(self.kb, self.num_shards, self.by), self.shard_dir)
+        ctx = multiprocessing.get_context("spawn")
+        for path in paths:
+            ready = ctx.Queue()
+            process = ctx.Process(target=serve_shard, args=(str(path), self.host, 0, ready), daemon=True)
+            process.start()
+            self.processes.append(process)
+            self.urls.append(ready.get(timeout=self.start_timeout))
+        return self
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(5)
+        self.processes, self.urls = [], []
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+    def __enter__(self) -> "LocalShardCluster":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def write_shards(shards: List[Dict], out_dir: Path) -> List[Path]:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for shard in shards:
+        path = out_dir / f"shard-{shard['shard']}.json"
+        path.write_bytes(dumps(shard))
+        paths.append(path)
+    return paths
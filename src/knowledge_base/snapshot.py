@@ -0,0 +1,293 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from src.knowledge_base.search_index import SearchIndex
+from src.knowledge_base.indexes import EligibilityIndex, ProgramIndex, SortedIndex
+from src.knowledge_base.facets import FacetIndex
+from src.utils.json_codec import dumps, loads
+from config.settings import config as settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ELMKBSNP"
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+# magic, format version, manifest length
+_HEADER = struct.Struct("<8sII")
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, truncated, of another format or corrupt."""
+
+
+class SnapshotWriter:
+    """Collects named sections and writes them as one snapshot file.
+
+    Layout: a fixed header, a JSON manifest, then every section starting on a 64-byte
+    boundary. The manifest records each section's offset, length and kind (raw bytes,
+    JSON, or a numpy array with its dtype and shape), a SHA-256 over all section data,
+    and any build metadata passed to ``write``.
+    """
+
+    def __init__(self):
+        self.sections: Dict[str, Dict] = {}
+        self._payloads: Dict[str, bytes] = {}
+
+    def add_bytes(self, name: str, data: bytes, kind: str = "bytes", **meta):
+        if name in self.sections:
+            raise ValueError(f"Duplicate snapshot section {name!r}")
+        self.sections[name] = dict(kind=kind, **meta)
+        self._payloads[name] = bytes(data)
+
+    def add_json(self, name: str, obj):
+        self.add_bytes(name, dumps(obj), kind="json")
+
+    def add_array(self, name: str, array: np.ndarray):
+        array = np.ascontiguousarray(array)
+        self.add_bytes(name, array.tobytes(), kind="array", dtype=array.dtype.str, shape=list(array.shape))
+
+    def add_blobs(self, name: str, blobs: List[bytes]):
+        """Concatenate ``blobs`` into section ``name`` with their boundaries in ``name.offsets``."""
+        offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+        offsets[1:] = np.cumsum([len(b) for b in blobs], dtype=np.uint64)
+        self.add_bytes(name, b"".join(blobs))
+        self.add_array(f"{name}.offsets", offsets)
+
+    def add_strings(self, name: str, strings: List[str]):
+        self.add_blobs(name, [s.encode("utf-8") for s in strings])
+
+    def write(self, path: str, **meta) -> Dict:
+        """Write the snapshot atomically (temp file + rename); returns the manifest."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        checksum = hashlib.sha256()
+        for name in self.sections:
+            checksum.update(self._payloads[name])
+
+        # Section offsets depend on the manifest size, which depends on the offsets
+        manifest = {}
+        created_at = time.time()
+        base = 0
+        while True:
+            offset = base
+            for name, section in self.sections.items():
+                offset = _align(offset)
+                section["offset"] = offset
+                section["length"] = len(self._payloads[name])
+                offset += section["length"]
+            manifest = dict(meta, format=FORMAT_VERSION, created_at=created_at,
+                            checksum=checksum.hexdigest(), sections=self.sections)
+            encoded = json.dumps(manifest, sort_keys=True).encode("utf-8")
+            data_start = _align(_HEADER.size + len(encoded))
+            if data_start == base:
+                break
+            base = data_start
+
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+            f.write(encoded)
+            for name, section in self.sections.items():
+                f.write(b"\0" * (section["offset"] - f.tell()))
+                f.write(self._payloads[name])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        logger.info("Wrote snapshot %s (%d sections, %d bytes)", path, len(self.sections), path.stat().st_size)
+        return manifest
+
+
+class KnowledgeBaseSnapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Opening reads only the header and manifest. Arrays are ``np.frombuffer`` views and
+    byte sections are memoryviews straight into the mapping, so nothing is copied or
+    parsed until a caller asks for it, and the page cache is shared by every worker
+    that maps the same file.
+    """
+
+    def __init__(self, path: str, verify: bool = False):
+        self.path = Path(path)
+        try:
+            self._file = open(self.path, "rb")
+        except OSError as e:
+            raise SnapshotError(f"Cannot open snapshot {self.path}: {e}") from e
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:  # empty file
+            self._file.close()
+            raise SnapshotError(f"Snapshot {self.path} is empty") from e
+        self._view = memoryview(self._mmap)
+        try:
+            self.manifest = self._read_manifest()
+            if verify:
+                self.verify()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_manifest(self) -> Dict:
+        if len(self._mmap) < _HEADER.size:
+            raise SnapshotError(f"Snapshot {self.path} is truncated")
+        magic, version, manifest_len = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.path} is not a knowledge-base snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"Snapshot format {version} not supported (expected {FORMAT_VERSION})")
+        try:
+            manifest = json.loads(bytes(self._view[_HEADER.size:_HEADER.size + manifest_len]))
+        except ValueError as e:
+            raise SnapshotError(f"Snapshot {self.path} has a corrupt manifest") from e
+        for name, section in manifest["sections"].items():
+            if section["offset"] + section["length"] > len(self._mmap):
+                raise SnapshotError(f"Snapshot {self.path} is truncated (section {name!r})")
+        return manifest
+
+    @property
+    def sections(self) -> Dict[str, Dict]:
+        return self.manifest["sections"]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sections
+
+    def _section(self, name: str) -> Dict:
+        try:
+            return self.sections[name]
+        except KeyError:
+            raise SnapshotError(f"Snapshot {self.path} has no section {name!r}") from None
+
+    def buffer(self, name: str) -> memoryview:
+        section = self._section(name)
+        return self._view[section["offset"]:section["offset"] + section["length"]]
+
+    def array(self, name: str) -> np.ndarray:
+        section = self._section(name)
+        dtype = np.dtype(section["dtype"])
+        count = section["length"] // dtype.itemsize
+        array = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=section["offset"])
+        return array.reshape(section["shape"])
+
+    def json(self, name: str):
+        return loads(self.buffer(name).tobytes())
+
+    def blobs(self, name: str) -> List[memoryview]:
+        """Zero-copy slices of a section written with ``add_blobs``."""
+        data = self.buffer(name)
+        offsets = self.array(f"{name}.offsets").tolist()
+        return [data[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+    def strings(self, name: str) -> List[str]:
+        return [str(blob, "utf-8") for blob in self.blobs(name)]
+
+    def verify(self):
+        """Recompute the checksum over all sections; raises SnapshotError on mismatch."""
+        checksum = hashlib.sha256()
+        # Sections in file order, which is the order the writer hashed them in
+        for name in sorted(self.sections, key=lambda n: self.sections[n]["offset"]):
+            checksum.update(self.buffer(name))
+        if checksum.hexdigest() != self.manifest["checksum"]:
+            raise SnapshotError(f"Snapshot {self.path} failed checksum verification")
+
+    def close(self):
+        # Views handed out by buffer()/array() keep the mapping alive until released
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+
+def build_snapshot(kb: Dict, path: str, tuition_bands=None, intent_model=None,
+                   question_embeddings: Optional[np.ndarray] = None, embedding_model_id: str = None,
+                   **meta) -> Dict:
+    """Write the aggregated KB and everything derived from it at startup into one snapshot.
+
+    Sections:
+      - ``records``: the aggregated KB as compact JSON
+      - ``search.texts`` / ``search.encoded``: SearchIndex search text and per-item JSON
+      - ``programs.fee_usd.*`` / ``programs.deadline_day.*`` / ``programs.eligibility.*``:
+        sorted key/position arrays of the ProgramIndex
+      - ``facets.*``: FacetIndex code columns and their labels
+      - ``questions.embeddings``: FAQ question embeddings (optional)
+      - ``intent.*``: intent classifier arrays (optional)
+    """
+    writer = SnapshotWriter()
+    programs = kb.get("study_abroad_programs", [])
+    program_index = ProgramIndex(programs)  # annotates typed fields before the records are written
+    records = dumps(kb)
+    writer.add_bytes("records", records, kind="json")
+
+    search_index = SearchIndex(kb)
+    writer.add_strings("search.texts", search_index.texts)
+    writer.add_blobs("search.encoded", search_index.encoded)
+
+    for name, index in (("fee_usd", program_index.fee_usd), ("deadline_day", program_index.deadline_day)):
+        writer.add_array(f"programs.{name}.keys", np.asarray(index.keys, dtype="<f8"))
+        writer.add_array(f"programs.{name}.positions", np.asarray(index.positions, dtype="<i8"))
+    tests = sorted(program_index.eligibility.tests)
+    writer.add_json("programs.eligibility.tests", tests)
+    for test in tests:
+        index = program_index.eligibility.tests[test]
+        writer.add_array(f"programs.eligibility.{test}.keys", np.asarray(index.keys, dtype="<f8"))
+        writer.add_array(f"programs.eligibility.{test}.positions", np.asarray(index.positions, dtype="<i8"))
+
+    tuition_bands = settings.TUITION_BANDS_USD if tuition_bands is None else tuition_bands
+    facet_index = FacetIndex(search_index, tuition_bands)
+    writer.add_json("facets.labels", {"labels": facet_index.labels, "tuition_bands": tuition_bands})
+    for facet, codes in facet_index.codes.items():
+        writer.add_array(f"facets.{facet}.codes", codes.astype("<i4"))
+
+    if question_embeddings is not None:
+        writer.add_array("questions.embeddings", np.asarray(question_embeddings, dtype="<f4"))
+        meta["embedding_model_id"] = embedding_model_id
+    if intent_model is not None:
+        for name, array in intent_model.to_arrays().items():
+            writer.add_array(f"intent.{name}", array)
+        writer.add_strings("intent.vocabulary", intent_model.vocabulary)
+        writer.add_strings("intent.classes", intent_model.classes)
+
+    meta.setdefault("kb_version", hashlib.sha256(records).hexdigest()[:16])
+    meta.setdefault("counts", {"items": len(search_index), "programs": len(programs)})
+    return writer.write(path, **meta)
+
+
+def _sorted_index(snapshot: KnowledgeBaseSnapshot, prefix: str) -> SortedIndex:
+    # Key and position arrays stay views into the mapping
+    return SortedIndex.from_sorted(snapshot.array(f"{prefix}.keys"), snapshot.array(f"{prefix}.positions"))
+
+
+def restore_program_index(snapshot: KnowledgeBaseSnapshot, programs: List[Dict]) -> ProgramIndex:
+    tests = {test: _sorted_index(snapshot, f"programs.eligibility.{test}")
+             for test in snapshot.json("programs.eligibility.tests")}
+    return ProgramIndex(programs,
+                        fee_usd=_sorted_index(snapshot, "programs.fee_usd"),
+                        deadline_day=_sorted_index(snapshot, "programs.deadline_day"),
+                        eligibility=EligibilityIndex.from_indexes(len(programs), tests))
+
+
+def restore_search_index(snapshot: KnowledgeBaseSnapshot, kb: Dict) -> SearchIndex:
+    return SearchIndex(kb, texts=snapshot.strings("search.texts"), encoded=snapshot.blobs("search.encoded"))
+
+
+def restore_facet_index(snapshot: KnowledgeBaseSnapshot, search_index: SearchIndex,
+                        tuition_bands) -> FacetIndex:
+    meta = snapshot.json("facets.labels")
+    if meta["tuition_bands"] != [list(band) for band in tuition_bands]:
+        # Bands changed since the snapshot was built; the stored tuition_band codes no longer apply
+        logger.info("Tuition bands differ from snapshot %s; rebuilding facet codes", snapshot.path)
+        return FacetIndex(search_index, tuition_bands)
+    # Code columns stay views into the mapping
+    codes = {facet: snapshot.array(f"facets.{facet}.codes") for facet in meta["labels"]}
+    return FacetIndex(search_index, tuition_bands, codes=codes, labels=meta["labels"])
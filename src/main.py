@@ -1,59 +1,106 @@
 import argparse
+import importlib
+import importlib.util
 import logging
-from src.knowledge_base.collector import KnowledgeBaseCollector
-from src.knowledge_base.processor import KnowledgeBaseProcessor
-from src.ai_engine.nlp_processor import NLPProcessor
-from src.web.app import create_app
-from src.utils.logger import setup_logger
+from typing import List, Optional
+
+# Modules each CLI mode imports. They are loaded only when that mode runs, so e.g.
+# --init-kb doesn't pay for torch/transformers and --web doesn't load the scraping
+# stack. Every mode below gets its modules from import_command, so
+# scripts/bench_startup.py measures exactly what the mode imports.
+COMMAND_IMPORTS = {
+    "init-kb": ["src.knowledge_base.collector", "src.knowledge_base.processor"],
+    "train": ["src.ai_engine.nlp_processor"],
+    "web": ["src.web.app"],
+    "batch": ["src.ai_engine.batch"],
+    "whatsapp": ["src.whatsapp.whatsapp_bot"],
+}
+
+# Modes whose modules ship separately and may be absent from this install
+OPTIONAL_COMMANDS = {"whatsapp"}
+
+def import_command(command: str) -> List:
+    """Import the modules ``command`` needs and return them."""
+    return [importlib.import_module(name) for name in COMMAND_IMPORTS[command]]
+
+def command_available(command: str) -> bool:
+    """True when every module ``command`` imports is present (its own dependencies aside)."""
+    try:
+        return all(importlib.util.find_spec(name) is not None for name in COMMAND_IMPORTS[command])
+    except ModuleNotFoundError:
+        # A parent package is missing
+        return False
 
 def initialize_knowledge_base():
     """Initialize and populate the knowledge base"""
+    collector_module, processor_module = import_command("init-kb")
     print("Initializing Elimuhub Knowledge Base...")
-    
+
     # Collect data
-    collector = KnowledgeBaseCollector()
+    collector = collector_module.KnowledgeBaseCollector()
     collector.collect_all_data()
-    
+
     # Process and structure data
-    processor = KnowledgeBaseProcessor()
+    processor = processor_module.KnowledgeBaseProcessor()
     processor.process_and_store()
-    
+
     print("Knowledge base initialized successfully!")
 
 def train_ai_models():
     """Train AI models for intent classification and recommendations"""
+    nlp_module, = import_command("train")
     print("Training AI models...")
-    
-    nlp = NLPProcessor()
+
+    nlp = nlp_module.NLPProcessor()
     nlp.train_models()
-    
+
     print("AI models trained successfully!")
 
-def main():
+def answer_batch(args):
+    """Answer a JSONL file of questions offline over a process pool"""
+    batch_module, = import_command("batch")
+    summary = batch_module.run_batch(args.batch, args.output, workers=args.workers, chunk_size=args.chunk_size,
+                        embed=not args.no_embed)
+    print(f"Answered {summary['answered']} questions ({summary['errors']} errors) "
+          f"in {summary['elapsed_s']}s, {summary['questions_per_s']} questions/s")
+
+def main(argv: Optional[List[str]] = None):
     parser = argparse.ArgumentParser(description="Elimuhub AI Agent")
     parser.add_argument('--init-kb', action='store_true', help='Initialize knowledge base')
     parser.add_argument('--train', action='store_true', help='Train AI models')
     parser.add_argument('--web', action='store_true', help='Start web server')
     parser.add_argument('--whatsapp', action='store_true', help='Start WhatsApp bot')
-    
-    args = parser.parse_args()
-    
+    parser.add_argument('--batch', metavar='INPUT', help='Answer questions from a JSONL file ("-" for stdin)')
+    parser.add_argument('--output', default='-', help='Batch output JSONL file (default: stdout)')
+    parser.add_argument('--workers', type=int, help='Batch worker processes (default: BATCH_WORKERS or CPU count)')
+    parser.add_argument('--chunk-size', type=int, help='Questions per batch task (default: BATCH_CHUNK_SIZE)')
+    parser.add_argument('--no-embed', action='store_true', help='Skip embedding questions in batch mode')
+
+    args = parser.parse_args(argv)
+
     # Setup logging
-    setup_logger()
-    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
     if args.init_kb:
         initialize_knowledge_base()
-    
+
     if args.train:
         train_ai_models()
-    
+
+    if args.batch:
+        answer_batch(args)
+
     if args.web:
-        app = create_app()
+        web_module, = import_command("web")
+        app = web_module.create_app()
         app.run(host='0.0.0.0', port=5000, debug=True)
-    
+
     if args.whatsapp:
-        from src.whatsapp.whatsapp_bot import WhatsAppBot
-        bot = WhatsAppBot()
+        if not command_available("whatsapp"):
+            parser.error("--whatsapp needs the WhatsApp bot module (src.whatsapp.whatsapp_bot), "
+                         "which is not part of this install")
+        bot_module, = import_command("whatsapp")
+        bot = bot_module.WhatsAppBot()
         bot.run()
 
 if __name__ == "__main__":
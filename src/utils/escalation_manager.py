@@ -0,0 +1,268 @@
+import http.client
+import json
+import logging
+import queue
+import smtplib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import urlsplit
+from src.utils.text import normalize_text
+from config.settings import config as settings
+
+logger = logging.getLogger(__name__)
+
+
+class FileSink:
+    """Appends each digest as one JSON line."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def deliver(self, digest: Dict):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(digest) + "\n")
+
+    def close(self):
+        pass
+
+
+class HTTPSink:
+    """POSTs digests as JSON to a webhook over a reused keep-alive connection."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        self.https = parts.scheme == "https"
+        self.timeout = timeout
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._conn = cls(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def deliver(self, digest: Dict):
+        body = json.dumps(digest).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        # One retry on a fresh connection in case the server dropped the idle one
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("POST", self.path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status >= 400:
+                    raise RuntimeError(f"escalation webhook returned HTTP {resp.status}")
+                return
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class SMTPSink:
+    """Emails digests to support, keeping the SMTP session open between deliveries."""
+
+    def __init__(self, host: str, port: int, sender: str, recipient: str, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipient = recipient
+        self.timeout = timeout
+        self._smtp = None
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            self.close()
+        self._smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        return self._smtp
+
+    def deliver(self, digest: Dict):
+        msg = EmailMessage()
+        msg["Subject"] = f"[Elimuhub] {digest['count']} escalation(s) need attention"
+        msg["From"] = self.sender
+        msg["To"] = self.recipient
+        msg.set_content(format_digest(digest))
+        self._connection().send_message(msg)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+def format_digest(digest: Dict) -> str:
+    lines = [f"{digest['count']} conversation(s) need human assistance:", ""]
+    for e in digest["escalations"]:
+        lines.append(f"Ticket {e['ticket']} (conversation {e['conversation_id']})")
+        lines.append(f"  Last user message: {e['user_message']}")
+        if e.get("user_contact"):
+            lines.append(f"  Contact: {e['user_contact']}")
+        lines.append(f"  Detected intent: {e.get('intent')}  confidence: {e.get('confidence')}")
+        if e.get("repeats"):
+            lines.append(f"  Repeated {e['repeats']} more time(s) within the dedup window")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def default_sinks() -> List:
+    sinks = [FileSink(settings.ESCALATION_LOG_PATH)]
+    if settings.ESCALATION_WEBHOOK_URL:
+        sinks.append(HTTPSink(settings.ESCALATION_WEBHOOK_URL))
+    if settings.ESCALATION_SMTP_HOST:
+        sinks.append(SMTPSink(settings.ESCALATION_SMTP_HOST, settings.ESCALATION_SMTP_PORT,
+                              settings.ESCALATION_SMTP_SENDER, settings.SUPPORT_EMAIL))
+    return sinks
+
+
+class EscalationManager:
+    """Hands low-confidence conversations to human support without blocking the chat.
+
+    ``escalate`` only records the event and returns a ticket reference. Escalations for
+    the same conversation within ``dedup_window`` seconds share one ticket; without a
+    conversation id they are matched on user contact and intent, or on the message. A background
+    worker collects events for ``coalesce_seconds`` after the first one arrives and
+    delivers them as a single digest to every sink.
+    """
+
+    def __init__(self, sinks: List = None, dedup_window: float = None, coalesce_seconds: float = None,
+                 max_queue: int = 1000, max_tracked: int = 10000):
+        self.sinks = sinks if sinks is not None else default_sinks()
+        self.dedup_window = settings.ESCALATION_DEDUP_WINDOW_SECONDS if dedup_window is None else dedup_window
+        self.coalesce_seconds = settings.ESCALATION_COALESCE_SECONDS if coalesce_seconds is None else coalesce_seconds
+        self.max_tracked = max_tracked
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._recent: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.stats = {"escalated": 0, "deduplicated": 0, "dropped": 0, "digests": 0, "delivery_failures": 0}
+        self._worker = threading.Thread(target=self._run, name="escalation-dispatcher", daemon=True)
+        self._worker.start()
+
+    def escalate(self, user_message: str, conversation_id: str = None, intent: str = None,
+                 confidence: float = None, user_contact: str = None) -> str:
+        """Queue an escalation and return the text to show the user."""
+        now = time.time()
+        key = self._dedup_key(user_message, conversation_id, intent, user_contact)
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is not None and now - recent["created_at"] < self.dedup_window:
+                recent["repeats"] += 1
+                recent["user_message"] = user_message
+                self.stats["deduplicated"] += 1
+                return self._user_message(recent["ticket"])
+            event = {
+                "ticket": f"ESC-{uuid.uuid4().hex[:8].upper()}",
+                "conversation_id": conversation_id,
+                "user_contact": user_contact,
+                "user_message": user_message,
+                "intent": intent,
+                "confidence": confidence,
+                "created_at": now,
+                "repeats": 0,
+            }
+            self._recent[key] = event
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.max_tracked:
+                self._recent.popitem(last=False)
+        try:
+            self._queue.put_nowait(event)
+            with self._lock:
+                self.stats["escalated"] += 1
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+            logger.error("Escalation queue full; ticket %s not delivered", event["ticket"])
+        return self._user_message(event["ticket"])
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until every queued escalation has been delivered (or ``timeout`` passes)."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def close(self, timeout: float = 10.0):
+        """Deliver what is queued, stop the worker and close the sinks. Safe to call twice."""
+        if self._stopping.is_set():
+            return
+        self.flush(timeout)
+        self._stopping.set()
+        self._worker.join(timeout)
+        for sink in self.sinks:
+            sink.close()
+
+    @staticmethod
+    def _dedup_key(user_message: str, conversation_id: str = None, intent: str = None,
+                   user_contact: str = None) -> str:
+        if conversation_id:
+            return f"conversation:{conversation_id}"
+        if user_contact:
+            return f"contact:{user_contact}:{intent}"
+        # Nothing identifies the user; the same question with the same intent is one ticket
+        return f"message:{intent}:{normalize_text(user_message)}"
+
+    def _user_message(self, ticket: str) -> str:
+        return (f"I've passed your question to our support team (ticket {ticket}). "
+                f"You can also reach us at {settings.SUPPORT_EMAIL} or {settings.SUPPORT_PHONE}.")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = [first]
+            # Coalesce whatever else arrives within the window into the same digest
+            window_end = time.time() + self.coalesce_seconds
+            while True:
+                remaining = window_end - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._deliver(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _deliver(self, batch: List[Dict]):
+        with self._lock:
+            escalations = [dict(e) for e in batch]
+        digest = {"generated_at": time.time(), "count": len(escalations), "escalations": escalations}
+        for sink in self.sinks:
+            try:
+                sink.deliver(digest)
+            except Exception:
+                with self._lock:
+                    self.stats["delivery_failures"] += 1
+                logger.exception("Failed to deliver escalation digest via %s", type(sink).__name__)
+        with self._lock:
+            self.stats["digests"] += 1
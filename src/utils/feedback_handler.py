@@ -0,0 +1,42 @@
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from config.settings import config as settings
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackHandler:
+    """Appends chat interactions and user ratings as JSON lines for later review."""
+
+    def __init__(self, interaction_path: str = None, feedback_path: str = None):
+        self.logger = logging.getLogger(__name__)
+        self.interaction_path = Path(interaction_path or settings.INTERACTION_LOG_PATH)
+        self.feedback_path = Path(feedback_path or settings.FEEDBACK_LOG_PATH)
+        self._lock = threading.Lock()
+
+    def log_interaction(self, conversation_id: str, user_message: str, ai_response: str, intent: str,
+                        confidence: float):
+        self._append(self.interaction_path, {
+            "conversation_id": conversation_id,
+            "user_message": user_message,
+            "ai_response": ai_response,
+            "intent": intent,
+            "confidence": float(confidence),
+        })
+
+    def save_feedback(self, conversation_id: str, rating, comments: str = ""):
+        self._append(self.feedback_path, {"conversation_id": conversation_id, "rating": rating, "comments": comments})
+
+    def _append(self, path: Path, record: dict):
+        record["timestamp"] = time.time()
+        try:
+            with self._lock:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+        except OSError:
+            # Feedback is best effort; never fail the chat request over it
+            self.logger.exception("Could not write %s", path)
@@ -0,0 +1,13 @@
+import re
+import string
+
+_PUNCTUATION = str.maketrans({c: " " for c in string.punctuation})
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, turn punctuation into spaces and collapse whitespace.
+
+    "A-Levels" and "A levels" both become "a levels".
+    """
+    return _WHITESPACE.sub(" ", text.lower().translate(_PUNCTUATION)).strip()
@@ -0,0 +1,164 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Request priorities, cheapest first
+CHEAP = "cheap"          # health checks, cached answers, KB search
+STANDARD = "standard"    # lightweight writes such as feedback
+INFERENCE = "inference"  # full chat pipeline
+
+
+def client_address(remote_addr: Optional[str], forwarded_for: Optional[str] = None,
+                   trusted_proxies: int = 0) -> Optional[str]:
+    """Client IP: the peer address, or behind ``trusted_proxies`` proxies the address the
+    outermost of them saw, read from the right of X-Forwarded-For. Entries further left
+    are set by the client and can't be trusted."""
+    if trusted_proxies > 0 and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        if len(hops) >= trusted_proxies:
+            return hops[-trusted_proxies]
+    return remote_addr
+
+
+def admission_key(client_id: Optional[str], remote_addr: Optional[str], forwarded_for: Optional[str] = None,
+                  trusted_proxies: int = 0) -> Optional[str]:
+    """Rate-limit key: the server-issued client id once the client sends it back, else its address."""
+    if client_id:
+        return f"client:{client_id}"
+    address = client_address(remote_addr, forwarded_for, trusted_proxies)
+    return f"addr:{address}" if address else None
+
+
+def chat_message(body) -> Optional[str]:
+    """The message of a parsed chat request body; None unless it is a JSON object with a string message."""
+    if not isinstance(body, dict):
+        return None
+    message = body.get("message", "")
+    return message if isinstance(message, str) else None
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens/s refill up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens``; returns 0 on success, else seconds until enough are available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            if self.rate <= 0:
+                return float("inf")
+            return (tokens - self.tokens) / self.rate
+
+
+class AdmissionDecision:
+    __slots__ = ("admitted", "status", "retry_after", "reason", "priority", "holds_slot")
+
+    def __init__(self, admitted: bool, priority: str, status: int = 200, retry_after: int = 0,
+                 reason: str = "", holds_slot: bool = False):
+        self.admitted = admitted
+        self.priority = priority
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+        self.holds_slot = holds_slot
+
+
+class AdmissionController:
+    """Admission control for the web API.
+
+    Cheap requests are always admitted. Everything else must pass a per-session token
+    bucket (429 when empty). Inference requests must also pass a global token bucket and
+    get one of ``max_concurrency`` execution slots, waiting at most ``queue_timeout``
+    seconds for one (503 otherwise), so a burst is shed quickly instead of queueing
+    behind model inference.
+    """
+
+    def __init__(self, global_rate: float, global_burst: int, session_rate: float, session_burst: int,
+                 max_concurrency: int, queue_timeout: float = 0.1, max_sessions: int = 10000):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.max_sessions = max_sessions
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._sessions: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted: Dict[str, int] = {CHEAP: 0, STANDARD: 0, INFERENCE: 0}
+        self.shed: Dict[str, int] = {}
+
+    def admit(self, priority: str, session_key: Optional[str] = None) -> AdmissionDecision:
+        if priority == CHEAP:
+            return self._admitted(AdmissionDecision(True, priority))
+
+        if session_key:
+            wait = self._session_bucket(session_key).try_acquire()
+            if wait:
+                return self._shed(priority, 429, wait, "session_rate_limited")
+
+        if priority != INFERENCE:
+            return self._admitted(AdmissionDecision(True, priority))
+
+        wait = self.global_bucket.try_acquire()
+        if wait:
+            return self._shed(priority, 503, wait, "global_rate_limited")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            return self._shed(priority, 503, 1, "concurrency_limited")
+        with self._lock:
+            self.in_flight += 1
+        return self._admitted(AdmissionDecision(True, priority, holds_slot=True))
+
+    def release(self, decision: AdmissionDecision):
+        if decision.holds_slot:
+            decision.holds_slot = False
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "tracked_sessions": len(self._sessions),
+                "admitted": dict(self.admitted),
+                "shed": dict(self.shed),
+            }
+
+    def _session_bucket(self, session_key: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._sessions.get(session_key)
+            if bucket is None:
+                bucket = TokenBucket(self.session_rate, self.session_burst)
+                self._sessions[session_key] = bucket
+                # Bounded: forget the least recently seen sessions
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_key)
+            return bucket
+
+    def _admitted(self, decision: AdmissionDecision) -> AdmissionDecision:
+        with self._lock:
+            self.admitted[decision.priority] = self.admitted.get(decision.priority, 0) + 1
+        return decision
+
+    def _shed(self, priority: str, status: int, wait: float, reason: str) -> AdmissionDecision:
+        with self._lock:
+            self.shed[reason] = self.shed.get(reason, 0) + 1
+        retry_after = max(1, math.ceil(min(wait, 3600)))
+        return AdmissionDecision(False, priority, status, retry_after, reason)
@@ -1,11 +1,16 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, g
 from flask_cors import CORS
+import atexit
 import logging
-from datetime import datetime
+import uuid
 from src.ai_engine.response_generator import ResponseGenerator
 from src.utils.escalation_manager import EscalationManager
 from src.utils.feedback_handler import FeedbackHandler
-from config import settings
+from src.web.serialization import CompressedResponseCache, json_response
+from src.knowledge_base.facets import FACETS
+from src.web.admission import AdmissionController, admission_key, chat_message, CHEAP, STANDARD, INFERENCE
+from src.ai_engine.deadline import Deadline, RequestTrace
+from config.settings import config as settings
 
 def create_app():
     """Create and configure Flask application"""
@@ -16,7 +21,84 @@ def create_app():
     # Initialize components
     response_generator = ResponseGenerator()
     escalation_manager = EscalationManager()
+    # Deliver queued escalations and close sink connections when the process exits
+    atexit.register(escalation_manager.close)
     feedback_handler = FeedbackHandler()
+    # Search results depend only on (query, category) and the KB, so cache encoded bodies
+    search_cache = CompressedResponseCache(settings.RESPONSE_CACHE_SIZE)
+    admission = AdmissionController(
+        global_rate=settings.ADMISSION_GLOBAL_RATE,
+        global_burst=settings.ADMISSION_GLOBAL_BURST,
+        session_rate=settings.ADMISSION_SESSION_RATE,
+        session_burst=settings.ADMISSION_SESSION_BURST,
+        max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000.0
+    )
+    cheap_endpoints = {'index', 'health', 'search_knowledge_base', 'admission_stats', 'chat_stats', 'static'}
+    
+    def request_conversation_id(data) -> str:
+        """Conversation id sent back by the client, else the session's, else a new server-issued one"""
+        conversation_id = data.get('conversation_id') or session.get('conversation_id')
+        if not isinstance(conversation_id, str) or not conversation_id:
+            conversation_id = uuid.uuid4().hex
+        return conversation_id
+    
+    def request_priority():
+        if request.endpoint in cheap_endpoints:
+            return CHEAP
+        if request.endpoint == 'chat_api':
+            data = request.get_json(silent=True)
+            message = chat_message(data)
+            # Malformed bodies are admitted as inference; chat_api answers them with its JSON error
+            if message is not None and response_generator.has_cached_response(message, request_conversation_id(data)):
+                return CHEAP
+            return INFERENCE
+        return STANDARD
+    
+    def request_deadline():
+        """Chat budget, started on arrival so admission queueing counts against it"""
+        budget_ms = settings.CHAT_BUDGET_MS
+        try:
+            # Callers may ask for a tighter budget, never a looser one
+            requested = float(request.headers.get('X-Request-Budget-Ms', 0))
+            if requested > 0:
+                budget_ms = min(budget_ms, requested) if budget_ms else requested
+        except ValueError:
+            pass
+        return Deadline(budget_ms) if budget_ms else None
+    
+    @app.before_request
+    def admit_request():
+        """Shed load before it reaches model inference"""
+        if request.endpoint == 'chat_api':
+            g.deadline = request_deadline()
+        priority = request_priority()
+        # Cheap requests skip the session bucket and don't read the session, so cacheable
+        # responses such as search results carry no Vary: Cookie
+        client_id = session_key = None
+        if priority != CHEAP:
+            # Signed session cookie, so clients can't pick their own id; clients without one
+            # (first request, cookies dropped) share the bucket of their address
+            client_id = session.get('client_id')
+            session_key = admission_key(client_id, request.remote_addr, request.headers.get('X-Forwarded-For'),
+                                        settings.ADMISSION_TRUSTED_PROXIES)
+        decision = admission.admit(priority, session_key)
+        if not decision.admitted:
+            response = jsonify({'success': False, 'error': 'Server busy, please retry', 'reason': decision.reason})
+            response.status_code = decision.status
+            response.headers['Retry-After'] = str(decision.retry_after)
+            return response
+        if priority != CHEAP and not client_id:
+            # Only once this request has been charged to the address bucket, so dropping the
+            # cookie to get a fresh id (and a fresh bucket) still costs an address token
+            session['client_id'] = uuid.uuid4().hex
+        g.admission = decision
+    
+    @app.teardown_request
+    def release_admission(exc=None):
+        decision = g.pop('admission', None)
+        if decision is not None:
+            admission.release(decision)
     
     @app.route('/')
     def index():
@@ -26,7 +108,7 @@ def create_app():
     @app.route('/chat')
     def chat():
         """Chat interface"""
-        session['conversation_id'] = datetime.now().strftime('%Y%m%d_%H%M%S')
+        session['conversation_id'] = uuid.uuid4().hex
         session['message_count'] = 0
         return render_template('chat.html')
     
@@ -34,20 +116,28 @@ def create_app():
     def chat_api():
         """Chat API endpoint"""
         try:
-            data = request.json
-            user_message = data.get('message', '')
-            conversation_id = session.get('conversation_id')
+            data = request.get_json(silent=True)
+            user_message = chat_message(data)
+            if user_message is None:
+                return jsonify({'success': False, 'error': 'Expected a JSON object with a string "message"'}), 400
+            conversation_id = request_conversation_id(data)
+            session['conversation_id'] = conversation_id
             
-            # Generate response
+            # Generate response within the request's latency budget
+            trace = RequestTrace(g.get('deadline'))
             response, intent, confidence = response_generator.generate_response(
-                user_message, conversation_id
+                user_message, conversation_id, deadline=trace.deadline, trace=trace
             )
+            if trace.degraded:
+                logging.info(f"Degraded chat answer: {trace.to_dict()}")
             
-            # Check if escalation is needed
+            # Check if escalation is needed; degraded answers say nothing about model confidence
             session['message_count'] = session.get('message_count', 0) + 1
-            if confidence < 0.5 and session['message_count'] >= settings.ESCALATION_THRESHOLD:
+            if (not trace.degraded and confidence < 0.5
+                    and session['message_count'] >= settings.ESCALATION_THRESHOLD):
+                # Only enqueues; delivery to support happens on a background worker
                 escalation_info = escalation_manager.escalate(
-                    user_message, conversation_id
+                    user_message, conversation_id, intent=intent, confidence=float(confidence)
                 )
                 response = f"{response}\n\n{escalation_info}"
             
@@ -60,12 +150,15 @@ def create_app():
                 confidence=confidence
             )
             
-            return jsonify({
+            return json_response({
                 'success': True,
+                'conversation_id': conversation_id,
                 'response': response,
                 'intent': intent,
-                'confidence': float(confidence)
-            })
+                'confidence': float(confidence),
+                'tier': trace.tier,
+                'trace': trace.to_dict()
+            }, accept_encoding=request.headers.get('Accept-Encoding', ''))
             
         except Exception as e:
             logging.error(f"Error in chat API: {str(e)}")
@@ -100,9 +193,48 @@ def create_app():
         """Search knowledge base"""
         query = request.args.get('q', '')
         category = request.args.get('category', '')
-        
-        results = response_generator.search_knowledge_base(query, category)
-        return jsonify({'results': results})
+
+        if response_generator.shards is not None:
+            # Scatter-gather results can be partial when a shard times out, so don't cache them
+            return json_response(
+                body=response_generator.search_knowledge_base_encoded(query, category),
+                accept_encoding=request.headers.get('Accept-Encoding', '')
+            )
+        return json_response(
+            accept_encoding=request.headers.get('Accept-Encoding', ''),
+            cache=search_cache,
+            cache_key=(query, category),
+            build=lambda: response_generator.search_knowledge_base_encoded(query, category)
+        )
+    
+    @app.route('/api/knowledge-base/facets', methods=['GET'])
+    def faceted_search():
+        """Faceted search: repeat a facet parameter to OR values, e.g. ?country=USA&country=UK"""
+        query = request.args.get('q', '')
+        filters = {facet: request.args.getlist(facet) for facet in FACETS if facet in request.args}
+        cache_key = ('facets', query) + tuple((f, tuple(sorted(v))) for f, v in sorted(filters.items()))
+
+        if response_generator.shards is not None:
+            return json_response(
+                body=response_generator.faceted_search_encoded(query, filters),
+                accept_encoding=request.headers.get('Accept-Encoding', '')
+            )
+        return json_response(
+            accept_encoding=request.headers.get('Accept-Encoding', ''),
+            cache=search_cache,
+            cache_key=cache_key,
+            build=lambda: response_generator.faceted_search_encoded(query, filters)
+        )
+    
+    @app.route('/api/chat/stats')
+    def chat_stats():
+        """Chat answers per degradation tier and stage latency estimates"""
+        return jsonify(response_generator.answer_stats())
+    
+    @app.route('/api/admission/stats')
+    def admission_stats():
+        """Admitted/shed request counts and current in-flight inference requests"""
+        return jsonify(admission.stats())
     
     @app.route('/health')
     def health():
@@ -0,0 +1,113 @@
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from flask import Response
+from src.utils.json_codec import dumps
+
+# brotli is optional; without it only gzip is offered
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Bodies smaller than this are not worth the compression overhead
+MIN_COMPRESS_SIZE = 512
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """Pick br, gzip or identity from an Accept-Encoding header (honours q=0)."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+class CompressedResponseCache:
+    """LRU of JSON bodies keyed by request, holding one compressed copy per encoding.
+
+    Only meant for responses that depend on the request alone (e.g. knowledge-base
+    search), never for anything tied to a session.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Dict[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], bytes], encoding: str) -> Tuple[bytes, str]:
+        """Return (body, encoding actually applied) for ``key``."""
+        with self._lock:
+            variants = self._entries.get(key)
+            if variants is not None:
+                self._entries.move_to_end(key)
+                if len(variants["identity"]) < MIN_COMPRESS_SIZE:
+                    encoding = "identity"
+                if encoding in variants:
+                    return variants[encoding], encoding
+        if variants is None:
+            variants = {"identity": build()}
+            if len(variants["identity"]) < MIN_COMPRESS_SIZE:
+                encoding = "identity"
+        body = variants["identity"]
+        if encoding != "identity":
+            body = compress(body, encoding)
+        with self._lock:
+            variants[encoding] = body
+            self._entries[key] = variants
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, encoding
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def json_response(payload=None, status: int = 200, body: bytes = None,
+                  accept_encoding: str = "", cache: Optional[CompressedResponseCache] = None,
+                  cache_key: Hashable = None, build: Callable[[], bytes] = None) -> Response:
+    """Build a JSON response from a payload, pre-encoded bytes or a cached body.
+
+    With ``cache`` and ``cache_key`` the body (and its compressed variants) is taken
+    from the cache, calling ``build`` only on a miss.
+    """
+    encoding = negotiate_encoding(accept_encoding)
+    if cache is not None and cache_key is not None:
+        data, encoding = cache.get(cache_key, build, encoding)
+    else:
+        data = body if body is not None else dumps(payload)
+        if len(data) >= MIN_COMPRESS_SIZE:
+            data = compress(data, encoding)
+        else:
+            encoding = "identity"
+    response = Response(data, status=status, mimetype="application/json")
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
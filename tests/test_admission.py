@@ -0,0 +1,42 @@
+from src.web.admission import (INFERENCE, STANDARD, AdmissionController, admission_key, chat_message,
+                                 client_address)
+
+
+def controller():
+    return AdmissionController(global_rate=1000, global_burst=1000, session_rate=0, session_burst=2,
+                               max_concurrency=4)
+
+
+def test_clients_behind_one_nat_get_their_own_buckets():
+    admission = controller()
+    alice = admission_key("alice-id", "203.0.113.7")
+    bob = admission_key("bob-id", "203.0.113.7")
+    assert all(admission.admit(STANDARD, alice).admitted for _ in range(2))
+    assert not admission.admit(STANDARD, alice).admitted
+    assert admission.admit(STANDARD, bob).admitted
+
+
+def test_first_time_visitors_are_keyed_by_address():
+    admission = controller()
+    assert admission_key(None, "203.0.113.7") == "addr:203.0.113.7"
+    decisions = [admission.admit(INFERENCE, admission_key(None, "203.0.113.7")) for _ in range(3)]
+    for decision in decisions:
+        admission.release(decision)
+    assert [d.admitted for d in decisions] == [True, True, False]
+
+
+def test_forwarded_for_needs_a_trusted_proxy():
+    # Without a configured proxy the header is client-controlled and ignored
+    assert client_address("10.0.0.2", "198.51.100.1") == "10.0.0.2"
+    # One proxy: the address it appended; entries left of it may be spoofed
+    assert client_address("10.0.0.2", "6.6.6.6, 198.51.100.1", trusted_proxies=1) == "198.51.100.1"
+    assert client_address("10.0.0.3", "6.6.6.6, 198.51.100.1, 10.0.0.2", trusted_proxies=2) == "198.51.100.1"
+    # Header shorter than the proxy chain: not from the proxies, fall back to the peer
+    assert client_address("10.0.0.2", "198.51.100.1", trusted_proxies=2) == "10.0.0.2"
+
+
+def test_malformed_chat_bodies_have_no_message():
+    assert chat_message({"message": "What about the UK?"}) == "What about the UK?"
+    assert chat_message({}) == ""
+    for body in (None, [], ["message"], "message", {"message": 5}, {"message": None}, {"message": ["hi"]}):
+        assert chat_message(body) is None
@@ -0,0 +1,79 @@
+import threading
+import time
+import pytest
+from src.ai_engine import conversation_store
+from src.ai_engine.conversation_store import ConversationStore
+from src.ai_engine.deadline import CACHED, RequestTrace
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    # Empty working directory: no KB, models created under tmp_path
+    monkeypatch.chdir(tmp_path)
+    from src.ai_engine.response_generator import ResponseGenerator
+    return ResponseGenerator()
+
+
+def test_follow_up_keeps_previous_confidence(generator, monkeypatch):
+    monkeypatch.setattr(generator.nlp, "classify_intent", lambda text: ("visa_information", 0.42))
+    generator.generate_response("visa for USA", "c1")
+    monkeypatch.setattr(generator.nlp, "classify_intent", lambda text: ("general_question", 0.1))
+    _, intent, confidence = generator.generate_response("what about the UK?", "c1")
+    assert (intent, confidence) == ("visa_information", 0.42)
+
+
+def test_follow_up_after_fallback_is_rescored(generator, monkeypatch):
+    monkeypatch.setattr(generator.nlp, "classify_intent", lambda text: ("general_question", 0.1))
+    generator.generate_response("blah", "c2")
+    _, intent, confidence = generator.generate_response("what about the UK?", "c2")
+    # Not a follow-up of the fallback, so low confidence still lets the app escalate
+    assert (intent, confidence) == ("general_question", 0.1)
+
+
+def test_confidence_persists_across_restart(tmp_path):
+    db = str(tmp_path / "conv.db")
+    store = ConversationStore(db_path=db)
+    store.update("c", intent="visa_information", confidence=0.7)
+    store.close()
+    assert ConversationStore(db_path=db).get("c").last_confidence == 0.7
+
+
+def test_concurrent_updates_are_not_lost():
+    store = ConversationStore()
+
+    def worker(n):
+        for i in range(200):
+            store.update("shared", intent="visa_information", entities={f"k{n}_{i}": i + 1})
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(store.get("shared").entities) == 8 * 200
+
+
+def test_expired_states_swept_every_n_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(conversation_store, "EVICT_EVERY_WRITES", 5)
+    store = ConversationStore(ttl_seconds=60, db_path=str(tmp_path / "conv.db"))
+    store.update("old", intent="visa_information")
+    store._states["old"].updated_at = time.time() - 120
+    store._conn.execute("UPDATE conversation_state SET updated_at = ?", (time.time() - 120,))
+    for i in range(4):
+        store.update(f"new{i}", intent="visa_information")
+    rows = {r[0] for r in store._conn.execute("SELECT conversation_id FROM conversation_state")}
+    assert "old" not in rows and "old" not in store._states
+    assert len(rows) == 4
+
+
+def test_admission_and_generation_agree_on_follow_ups(generator, monkeypatch):
+    monkeypatch.setattr(generator.nlp, "classify_intent", lambda text: ("general_question", 0.1))
+    generator.generate_response("what about the UK?", "fresh")  # no earlier turn: cached as is
+    generator.generate_response("blah", "after-fallback")
+    monkeypatch.setattr(generator.nlp, "classify_intent", lambda text: ("visa_information", 0.42))
+    generator.generate_response("visa for USA", "after-visa")
+    for conversation_id, cached in (("after-fallback", True), ("after-visa", False)):
+        assert generator.has_cached_response("what about the UK?", conversation_id) is cached
+        trace = RequestTrace()
+        generator.generate_response("what about the UK?", conversation_id, trace=trace)
+        assert (trace.tier == CACHED) is cached
@@ -0,0 +1,40 @@
+import time
+import pytest
+from src.ai_engine.deadline import FULL, TOP_PROGRAMS, Deadline, RequestTrace
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    # Empty working directory: no KB, models created under tmp_path
+    monkeypatch.chdir(tmp_path)
+    from src.ai_engine.response_generator import ResponseGenerator
+    generator = ResponseGenerator()
+    generator.fragments.programs_default = "top programs"
+    return generator
+
+
+def test_slow_understanding_skips_route(generator, monkeypatch):
+    generator.stage_estimates.observe("understand", 0.001)
+    generator.stage_estimates.observe("route", 0.05)
+
+    def slow_classify(text):
+        time.sleep(0.08)
+        return "visa_information", 0.9
+
+    monkeypatch.setattr(generator.nlp, "classify_intent", slow_classify)
+    trace = RequestTrace(Deadline(100))
+    response, intent, _ = generator.generate_response("visa for the UK", deadline=trace.deadline, trace=trace)
+
+    assert (response, intent) == ("top programs", "general_question")
+    result = trace.to_dict()
+    assert result["tier"] == TOP_PROGRAMS and result["reason"] == "deadline before route"
+    assert "understand" in result["stages_ms"] and "route" not in result["stages_ms"]
+    assert result["budget_ms"] == 100
+
+
+def test_route_runs_when_budget_remains(generator, monkeypatch):
+    monkeypatch.setattr(generator.nlp, "classify_intent", lambda text: ("visa_information", 0.9))
+    trace = RequestTrace(Deadline(10000))
+    _, intent, _ = generator.generate_response("visa for the UK", deadline=trace.deadline, trace=trace)
+    assert intent == "visa_information"
+    assert trace.tier == FULL and set(trace.to_dict()["stages_ms"]) == {"understand", "route"}
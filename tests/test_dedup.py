@@ -0,0 +1,67 @@
+import random
+import time
+from src.knowledge_base.dedup import Deduplicator, LSHIndex, MinHasher
+
+COUNTRIES = ["USA", "UK", "Canada", "Australia", "Germany"]
+SUBJECTS = ["Computer Science", "Law", "Medicine", "Economics", "Nursing", "Architecture"]
+
+
+def base_programs(n):
+    return [{
+        "country": COUNTRIES[i % len(COUNTRIES)],
+        "university": f"University of Place {i}",
+        "program": SUBJECTS[i % len(SUBJECTS)],
+        "duration": f"{3 + i % 3} years",
+        "tuition_fee": f"KES {1000 * (100 + i):,}",
+        "requirements": [f"GPA: {2.5 + (i % 4) * 0.3:.1f}+", "IELTS: 6.5", f"Interview round {i % 2 + 1}"],
+        "description": f"A {SUBJECTS[i % len(SUBJECTS)].lower()} degree with labs, placements and a final project "
+                       f"supervised by faculty at campus {i}",
+    } for i in range(n)]
+
+
+def scraped_copy(program, rng, n):
+    """The same program as another site would list it: reformatted, reordered, lightly edited."""
+    copy = dict(program, id=f"copy-{n}", source=rng.choice(["siteA", "siteB", "siteC"]))
+    copy["requirements"] = rng.sample(program["requirements"], len(program["requirements"]))
+    if rng.random() < 0.5:
+        copy["tuition_fee"] = program["tuition_fee"].replace(",", "").lower()
+    if rng.random() < 0.3:
+        copy["description"] = program["description"] + " apply early"
+    return copy
+
+
+def test_many_near_duplicates_collapse_to_their_originals():
+    rng = random.Random(0)
+    bases = base_programs(150)
+    records = [scraped_copy(p, rng, n) for n, p in enumerate(bases * 40)]
+    rng.shuffle(records)
+
+    dedup = Deduplicator(threshold=0.7, num_perm=120, bands=20, key_fields=["country", "university", "program"],
+                         precedence={"requirements": "union", "description": "longest"}, source_precedence=[])
+    start = time.perf_counter()
+    merged = dedup.dedup(records)
+    elapsed = time.perf_counter() - start
+
+    assert sorted(r["university"] for r in merged) == sorted(p["university"] for p in bases)
+    for record in merged:
+        assert len(record["requirements"]) == 3
+    # Each copy is compared with about one member of its cluster, not with every bucket mate
+    assert dedup.stats["comparisons"] <= 2 * len(records)
+    assert elapsed < 10
+
+
+def test_different_programs_are_not_merged():
+    dedup = Deduplicator(threshold=0.7, key_fields=["country", "university", "program"], precedence={},
+                         source_precedence=[])
+    bases = base_programs(300)
+    assert len(dedup.dedup(bases)) == 300
+
+
+def test_lsh_candidates_come_most_shared_bands_first():
+    hasher = MinHasher(num_perm=40)
+    lsh = LSHIndex(bands=20, rows=2)
+    text = "computer science at the university of nairobi four years"
+    lsh.add(0, hasher.signature("law at the university of leeds three years"))
+    lsh.add(1, hasher.signature(text + " with placement"))
+    lsh.add(2, hasher.signature(text))
+    assert lsh.add(3, hasher.signature(text))[0] == 2
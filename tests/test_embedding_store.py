@@ -0,0 +1,40 @@
+import numpy as np
+from src.ai_engine.embedding_store import EmbeddingStore, normalize, recall_at_k
+
+
+def clustered(n, clusters=200, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    return (centres[rng.integers(0, clusters, n)] + 0.35 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def queries_near(embeddings, count=100, seed=1):
+    rng = np.random.default_rng(seed)
+    sample = embeddings[rng.choice(len(embeddings), count, replace=False)]
+    return sample + 0.05 * rng.normal(size=sample.shape).astype(np.float32)
+
+
+def test_prefilter_is_opt_in():
+    store = EmbeddingStore("int8").build(clustered(1000))
+    assert store.bits is None
+
+
+def test_candidates_scale_with_store_size():
+    assert EmbeddingStore("int8", rerank_k=50, rerank_fraction=0.01).build(clustered(1000)).candidate_count == 50
+    assert EmbeddingStore("int8", rerank_k=50, rerank_fraction=0.01).build(clustered(20000)).candidate_count == 200
+
+
+def test_prefilter_keeps_int8_recall_on_clustered_data():
+    embeddings = clustered(20000)
+    queries = queries_near(embeddings)
+    full = recall_at_k(EmbeddingStore("int8").build(embeddings), embeddings, queries)["recall@10"]
+    filtered = recall_at_k(EmbeddingStore("int8", binary_prefilter=True).build(embeddings), embeddings, queries)
+    assert full > 0.9
+    assert filtered["recall@10"] >= full - 0.01
+
+
+def test_prenormalized_build_matches():
+    embeddings = clustered(500)
+    query = embeddings[7]
+    assert (EmbeddingStore("float32").build(embeddings).search(query, 5)
+            == EmbeddingStore("float32").build(normalize(embeddings), normalized=True).search(query, 5))
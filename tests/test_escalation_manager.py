@@ -0,0 +1,164 @@
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.utils.escalation_manager import EscalationManager, HTTPSink, SMTPSink
+
+
+class FakeWebhook(ThreadingHTTPServer):
+    """Records POSTed digests and the client connections they arrived on."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.digests = []
+        self.connections = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                server.digests.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                server.connections.add(self.client_address)
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(("127.0.0.1", 0), Handler)
+
+
+class FakeSMTP(socketserver.ThreadingTCPServer):
+    """Just enough SMTP to accept messages; keeps each message body and counts sessions."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                server.sessions += 1
+                self.reply("220 fake ESMTP")
+                while True:
+                    line = self.rfile.readline().decode().strip()
+                    command = line.split(" ", 1)[0].upper()
+                    if not line or command == "QUIT":
+                        self.reply("221 bye")
+                        return
+                    if command == "DATA":
+                        self.reply("354 end with .")
+                        body = []
+                        for data in iter(self.rfile.readline, b".\r\n"):
+                            body.append(data.decode())
+                        server.messages.append("".join(body))
+                    self.reply("250 ok")
+
+        super().__init__(("127.0.0.1", 0), Handler)
+
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def webhook():
+    server = serve(FakeWebhook())
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def smtp():
+    server = serve(FakeSMTP())
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class BlockingSink:
+    def __init__(self):
+        self.release = threading.Event()
+        self.digests = []
+
+    def deliver(self, digest):
+        self.release.wait(5)
+        self.digests.append(digest)
+
+    def close(self):
+        pass
+
+
+def test_escalate_does_not_wait_for_delivery():
+    sink = BlockingSink()
+    manager = EscalationManager(sinks=[sink], coalesce_seconds=0)
+    start = time.perf_counter()
+    reply = manager.escalate("help", "c1")
+    assert time.perf_counter() - start < 0.5
+    assert "ticket ESC-" in reply and sink.digests == []
+    sink.release.set()
+    manager.close()
+    assert sink.digests[0]["escalations"][0]["conversation_id"] == "c1"
+
+
+def test_digests_reach_webhook_and_smtp(webhook, smtp):
+    host, port = webhook.server_address[:2]
+    sinks = [HTTPSink(f"http://{host}:{port}/hook"),
+             SMTPSink("127.0.0.1", smtp.server_address[1], "bot@example.com", "support@example.com")]
+    manager = EscalationManager(sinks=sinks, coalesce_seconds=0.2)
+    manager.escalate("first", "c1", intent="visa_information", confidence=0.2)
+    manager.escalate("second", "c2")
+    assert manager.flush()
+    manager.escalate("third", "c3")
+    manager.close()
+
+    # The first two coalesce into one digest; the third goes out in its own
+    assert [d["count"] for d in webhook.digests] == [2, 1]
+    assert len(webhook.connections) == 1 and smtp.sessions == 1  # connections reused
+    assert len(smtp.messages) == 2
+    assert "2 conversation(s) need human assistance" in smtp.messages[0]
+    assert "Last user message: third" in smtp.messages[1]
+    assert manager.stats["digests"] == 2 and manager.stats["delivery_failures"] == 0
+
+
+def test_failed_sink_does_not_block_the_others(webhook):
+    host, port = webhook.server_address[:2]
+    manager = EscalationManager(sinks=[HTTPSink("http://127.0.0.1:9/hook"), HTTPSink(f"http://{host}:{port}/")],
+                                coalesce_seconds=0)
+    manager.escalate("help", "c1")
+    manager.close()
+    assert manager.stats["delivery_failures"] == 1 and len(webhook.digests) == 1
+
+
+def test_escalations_without_conversation_id_are_deduplicated():
+    sink = BlockingSink()
+    sink.release.set()
+    manager = EscalationManager(sinks=[sink], coalesce_seconds=0)
+    by_contact = {manager.escalate("Need help", intent="visa_information", user_contact="+254711000000"),
+                  manager.escalate("still stuck", intent="visa_information", user_contact="+254711000000")}
+    by_message = {manager.escalate("Need help!"), manager.escalate("need help")}
+    other = manager.escalate("Need help", intent="visa_information", user_contact="+254722000000")
+    manager.close()
+    assert len(by_contact) == 1 and len(by_message) == 1
+    assert other not in by_contact | by_message
+    assert manager.stats["deduplicated"] == 2
+
+
+def test_close_is_idempotent():
+    manager = EscalationManager(sinks=[], coalesce_seconds=0)
+    manager.close()
+    manager.close()
+    assert not manager._worker.is_alive()
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from src.knowledge_base.facets import FacetIndex
+from src.knowledge_base.search_index import SearchIndex
+from src.knowledge_base.snapshot import KnowledgeBaseSnapshot, build_snapshot, restore_facet_index
+
+BANDS = [[10000, "under_10k"], [30000, "10k_30k"], [None, "30k_plus"]]
+COUNTRIES = ["USA", "UK", "Canada", "Germany"]
+
+
+def make_kb(n):
+    programs = [{
+        "id": f"p{i}",
+        "country": COUNTRIES[i % len(COUNTRIES)],
+        "program": f"Program {i % 7}",
+        "scholarship_available": i % 3 == 0,
+        "tuition_fee_usd": float(5000 + (i * 997) % 40000),
+        "requirements": ["IELTS 6.5"] if i % 2 else [],
+    } for i in range(n)]
+    return {"study_abroad_programs": programs, "visa_requirements": {"USA": {"visa": "F-1"}, "UK": {"visa": "Student"}}}
+
+
+def brute_force(index, query, filters):
+    matches = []
+    for pos, item in enumerate(index.search_index.items):
+        values = index._facet_values(item)
+        if all(values.get(f) in vs for f, vs in filters.items() if vs):
+            if not query or query.lower() in index.search_index.texts[pos]:
+                matches.append(pos)
+    return matches
+
+
+@pytest.mark.parametrize("query,filters", [
+    ("", {}),
+    ("", {"country": ["USA", "UK"]}),
+    ("program 3", {"scholarship_available": ["true"]}),
+    ("ielts", {"country": ["Canada"], "tuition_band": ["10k_30k", "30k_plus"]}),
+    ("", {"country": ["Atlantis"]}),
+])
+def test_search_matches_brute_force(query, filters):
+    index = FacetIndex(SearchIndex(make_kb(500)), BANDS)
+    positions, total, counts = index.search(query, filters, limit=20)
+    expected = brute_force(index, query, filters)
+    assert positions == expected[:20]
+    assert total == len(expected)
+    assert sum(counts["category"].values()) == total
+    country_total = sum(1 for p in expected if index._facet_values(index.search_index.items[p]).get("country"))
+    assert sum(counts["country"].values()) == country_total
+
+
+def test_bitmap_and_unknown_value():
+    index = FacetIndex(SearchIndex(make_kb(40)), BANDS)
+    usa = index.bitmap("country", "USA")
+    assert usa.dtype == bool and usa.sum() == 11  # 10 programs + the USA visa entry
+    assert not index.bitmap("country", "Atlantis").any()
+
+
+def test_large_index_is_vectorized():
+    # 200k items: a query has to stay well under the bigint bitset's multi-second cost
+    index = FacetIndex(SearchIndex(make_kb(200000)), BANDS)
+    positions, total, counts = index.search("program 1", {"country": ["UK"]}, limit=5)
+    assert total == len(brute_force_ids(index, "program 1", "UK"))
+    assert len(positions) == 5
+
+
+def brute_force_ids(index, query, country):
+    codes = index.codes["country"]
+    uk = index.labels["country"].index(country)
+    return [p for p in np.flatnonzero(codes == uk) if query in index.search_index.texts[p]]
+
+
+def test_snapshot_round_trip(tmp_path):
+    kb = make_kb(100)
+    path = tmp_path / "kb.snapshot"
+    build_snapshot(kb, str(path), tuition_bands=BANDS)
+    snapshot = KnowledgeBaseSnapshot(str(path))
+    search_index = SearchIndex(kb)
+    restored = restore_facet_index(snapshot, search_index, BANDS)
+    built = FacetIndex(search_index, BANDS)
+    assert restored.labels == built.labels
+    for facet in built.codes:
+        assert np.array_equal(restored.codes[facet], built.codes[facet])
+    assert restored.search("", {"country": ["UK"]}) == built.search("", {"country": ["UK"]})
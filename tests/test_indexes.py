@@ -0,0 +1,25 @@
+import random
+import pytest
+from src.knowledge_base.indexes import EligibilityIndex, SortedIndex
+
+TESTS = ["GPA", "SAT", "IELTS", "TOEFL"]
+
+
+def brute_force(thresholds, scores, strict):
+    return [pos for pos, required in enumerate(thresholds)
+            if all(required[t] <= s for t, s in scores.items() if t in required)
+            and (not strict or all(t in scores for t in required))]
+
+
+@pytest.mark.parametrize("scores,strict", [
+    ({}, False), ({}, True), ({"GPA": 3.5}, False), ({"GPA": 3.5, "IELTS": 6.5}, True), ({"SAT": 1.0}, False),
+])
+def test_eligible_matches_brute_force(scores, strict):
+    rng = random.Random(0)
+    thresholds = [{t: rng.choice([1.0, 3.5, 6.5, 9.0]) for t in rng.sample(TESTS, rng.randint(0, 3))}
+                  for _ in range(500)]
+    index = EligibilityIndex(thresholds)
+    assert index.eligible(scores, strict) == brute_force(thresholds, scores, strict)
+    restored = EligibilityIndex.from_indexes(len(thresholds), {t: SortedIndex.from_sorted(i.keys, i.positions)
+                                                                for t, i in index.tests.items()})
+    assert restored.eligible(scores, strict) == index.eligible(scores, strict)
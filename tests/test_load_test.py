@@ -0,0 +1,77 @@
+import asyncio
+import importlib.util
+import json
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("load_test", ROOT / "scripts" / "load_test.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+load_test = load_script()
+
+
+class FakeConnection:
+    """Answers chat turns after a short delay, recording what each conversation sent."""
+
+    def __init__(self, server):
+        self.server = server
+
+    async def request(self, method, path, body=b"", headers=None):
+        sent = json.loads(body)
+        conversation_id = sent.get("conversation_id") or f"conv-{len(self.server['turns'])}"
+        self.server["turns"].append((conversation_id, sent["message"], (headers or {}).get("Cookie")))
+        self.server["in_flight"][conversation_id] = self.server["in_flight"].get(conversation_id, 0) + 1
+        self.server["overlaps"] += self.server["in_flight"][conversation_id] > 1
+        await asyncio.sleep(0.01)
+        self.server["in_flight"][conversation_id] -= 1
+        return 200, {"set-cookie": f"session={conversation_id}; HttpOnly"}, json.dumps(
+            {"conversation_id": conversation_id}).encode()
+
+    async def close(self):
+        pass
+
+
+def test_conversation_turns_are_sent_one_at_a_time():
+    server = {"turns": [], "in_flight": {}, "overlaps": 0}
+    driver = load_test.LoadDriver("http://localhost:5000", [["hi", "what about the UK?", "and Canada?"]], [],
+                                  rate=1, concurrency=1, duration=1, search_ratio=0)
+    conversation = next(driver.conversations)
+    driver.conversations = iter([conversation] * 6)
+
+    async def run():
+        conns = [FakeConnection(server) for _ in range(3)]
+        await asyncio.gather(*(driver._send(conns[i % 3], driver._next_request(), 0.0) for i in range(6)))
+
+    asyncio.run(run())
+    assert server["overlaps"] == 0
+    assert [message for _, message, _ in server["turns"]] == ["hi", "what about the UK?", "and Canada?"] * 2
+    # Every turn after the first carries the id and cookie the server gave the first one
+    assert {(cid, cookie) for cid, _, cookie in server["turns"][1:]} == {("conv-0", "session=conv-0")}
+    assert all(s["error"] is None for s in driver.samples)
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert [load_test.percentile(values, p) for p in (50, 90, 99, 99.9, 100)] == [50, 90, 99, 100, 100]
+    assert load_test.percentile([7.0], 50) == 7.0
+    assert load_test.percentile([], 99) == 0.0
+
+
+def test_summarize_counts_errors_and_latencies():
+    samples = [{"error": None, "service": 0.010, "corrected": 0.020},
+               {"error": None, "service": 0.030, "corrected": 0.040},
+               {"error": "HTTP 503", "service": 0.001, "corrected": 0.100}]
+    summary = load_test.summarize(samples, elapsed=2.0)
+    assert (summary["requests"], summary["errors"], summary["throughput_rps"]) == (3, 1, 1.0)
+    assert summary["error_rate"] == pytest.approx(1 / 3)
+    assert summary["service_latency_ms"]["p50"] == 10.0 and summary["service_latency_ms"]["max"] == 30.0
+    assert summary["corrected_latency_ms"]["p99"] == 100.0
+    assert summary["corrected_latency_ms"]["mean"] == pytest.approx(53.333, abs=1e-3)
+    assert load_test.summarize([], elapsed=0)["service_latency_ms"]["p99"] == 0.0
@@ -0,0 +1,19 @@
+import json
+from src.main import main
+
+
+def test_batch_mode_answers_a_file(tmp_path, monkeypatch, capsys):
+    # Empty working directory: no KB, models created under tmp_path
+    monkeypatch.chdir(tmp_path)
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text('{"id": 1, "message": "visa for USA"}\n"IGCSE tuition fees"\nnot json\n')
+    answers = tmp_path / "answers.jsonl"
+
+    main(["--batch", str(questions), "--output", str(answers), "--workers", "1", "--no-embed"])
+
+    records = [json.loads(line) for line in answers.read_text().splitlines()]
+    assert [r["line"] for r in records] == [1, 2, 3]
+    assert records[0]["id"] == 1 and records[0]["response"]
+    assert "response" in records[1]
+    assert records[2]["error"].startswith("invalid JSON")
+    assert "Answered 3 questions (1 errors)" in capsys.readouterr().out
@@ -0,0 +1,66 @@
+import pytest
+from src.knowledge_base.normalizers import annotate_program, parse_deadline_day, parse_fee, parse_requirements
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("$54,000/year", (54000.0, "USD")),
+    ("£28,000/year", (28000.0, "GBP")),
+    ("CAD 45,000/year", (45000.0, "CAD")),
+    # Trailing ISO codes
+    ("45,000 CAD/year", (45000.0, "CAD")),
+    ("28,000 GBP per year", (28000.0, "GBP")),
+    # Prefixed-dollar symbols
+    ("AU$ 40,000", (40000.0, "AUD")),
+    ("A$40,000", (40000.0, "AUD")),
+    ("C$45,000", (45000.0, "CAD")),
+    ("US$30,000", (30000.0, "USD")),
+    # "." as thousands separator, "," as decimal separator
+    ("€15.000/year", (15000.0, "EUR")),
+    ("€15.000,50", (15000.5, "EUR")),
+    ("$1,250.50", (1250.5, "USD")),
+    ("USD 40k", (40000.0, "USD")),
+    # The amount is the number next to the currency, not the first digit
+    ("2 x $10,000 per semester", (20000.0, "USD")),
+    # Per-period fees are annualized
+    ("KES 15,000/term", (45000.0, "KES")),
+    ("$1,000 per month", (12000.0, "USD")),
+    ("£9,250 annually", (9250.0, "GBP")),
+])
+def test_parse_fee(text, expected):
+    assert parse_fee(text) == expected
+
+
+@pytest.mark.parametrize("text", ["45,000", "45000/year", "SAT 1500", "Free", "", None])
+def test_parse_fee_unknown_currency(text):
+    assert parse_fee(text) is None
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("January 1", 1),
+    ("Jan 13", 13),
+    ("15 October", 288),
+    ("15th January", 15),
+    ("January 15th", 15),
+    ("1st of March", 60),
+    ("Sept. 1", 244),
+    ("31 Dec 2025", 365),
+    ("Apply by March 1, 2025", 60),
+])
+def test_parse_deadline_day(text, expected):
+    assert parse_deadline_day(text) == expected
+
+
+@pytest.mark.parametrize("text", ["March 2025", "May", "February 30", "Rolling", "32 January", None])
+def test_parse_deadline_day_rejects(text):
+    assert parse_deadline_day(text) is None
+
+
+def test_annotate_program_unknown_currency_has_no_usd():
+    program = annotate_program({"tuition_fee": "45,000 per year", "deadline": "March 2025"})
+    assert program["tuition_fee_usd"] is None and program["tuition_fee_currency"] is None
+    assert program["deadline_day"] is None
+
+
+def test_parse_requirements_reads_grouped_thousands():
+    assert parse_requirements(["SAT: 1,500+", "IELTS: 7.0+", "TOEFL: 100", "GPA: 3.75", "A-levels: A*AA"]) == {
+        "SAT": 1500.0, "IELTS": 7.0, "TOEFL": 100.0, "GPA": 3.75}
@@ -0,0 +1,14 @@
+from src.knowledge_base.renderer import RenderedFragments, render_program_line
+
+PROGRAMS = [
+    {"id": "p1", "university": "University of Nairobi", "program": "Law", "country": "Kenya"},
+    {"university": "University of Toronto", "program": "Medicine", "country": "Canada"},
+    {"university": "University of Oxford", "program": "History", "country": "UK"},
+]
+
+
+def test_programs_without_an_id_get_their_own_line():
+    fragments = RenderedFragments({"study_abroad_programs": PROGRAMS})
+    assert [fragments.program_line(p) for p in PROGRAMS] == [render_program_line(p) for p in PROGRAMS]
+    assert list(fragments.programs) == ["p1"]
+    assert "Toronto" in fragments.programs_default and "Oxford" in fragments.programs_default
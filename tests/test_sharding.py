@@ -0,0 +1,132 @@
+import copy
+import threading
+import pytest
+from src.knowledge_base.facets import FacetIndex
+from src.knowledge_base.indexes import ProgramIndex
+from src.knowledge_base.renderer import RenderedFragments
+from src.knowledge_base.search_index import SearchIndex
+from src.knowledge_base.sharding import ShardCoordinator, ShardNode, ShardServer, partition_kb
+from config.settings import config as settings
+
+COUNTRIES = ["USA", "UK", "Canada", "Germany", "Kenya"]
+
+KB = {
+    "study_abroad_programs": [{
+        "id": f"p{i}",
+        "country": COUNTRIES[i % len(COUNTRIES)],
+        "university": f"University {i % 11}",
+        "program": f"Program {i % 7}",
+        "tuition_fee": f"${5000 + (i * 997) % 40000} per year",
+        "scholarship_available": i % 3 == 0,
+        "requirements": ["IELTS 6.5"] if i % 2 else [],
+    } for i in range(120)],
+    "visa_requirements": {c: {"visa_type": f"{c} student visa", "requirements": ["Passport"]} for c in COUNTRIES},
+    "application_guides": {"USA_Application_Guide": {"steps": ["Apply"]}, "UK_Application_Guide": {"steps": ["UCAS"]}},
+    "tuition_programs": [{"program": "IGCSE", "subjects": ["Math"]}, {"program": "A-Level"}],
+}
+
+
+def single_node():
+    kb = copy.deepcopy(KB)
+    programs = ProgramIndex(kb["study_abroad_programs"])
+    search = SearchIndex(kb)
+    return kb, programs, search, FacetIndex(search, settings.TUITION_BANDS_USD)
+
+
+@pytest.fixture(scope="module")
+def shard_urls():
+    servers = [ShardServer(ShardNode(shard)) for shard in partition_kb(copy.deepcopy(KB), 3, by="country")]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield [server.url for server in servers]
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def coordinator(shard_urls):
+    coordinator = ShardCoordinator(shard_urls, timeout=5.0)
+    yield coordinator
+    coordinator.close()
+
+
+@pytest.mark.parametrize("query,filters", [
+    ("", {}),
+    ("", {"country": ["USA", "UK"]}),
+    ("program 3", {"scholarship_available": ["true"]}),
+    ("ielts", {"country": ["Canada", "Kenya"], "tuition_band": ["10k_30k", "30k_plus"]}),
+])
+def test_faceted_search_matches_single_node(coordinator, query, filters):
+    _, _, search, facets = single_node()
+    positions, total, counts = facets.search(query, filters, 10)
+    result = coordinator.faceted_search(query, filters, 10)
+    assert result["results"] == [search.items[i] for i in positions]
+    assert (result["total"], result["facets"], result["partial"]) == (total, counts, False)
+
+
+def test_program_candidates_match_single_node(coordinator):
+    kb, _, _, _ = single_node()
+    expected = [p["id"] for p in kb["study_abroad_programs"] if p["country"] == "UK" and "Program 2" in p["program"]]
+    result = coordinator.program_candidates("uk", "program 2")
+    assert [p["id"] for p in result["results"]] == expected
+
+
+def test_reference_kb_is_reassembled_in_kb_order(coordinator):
+    kb = coordinator.reference_kb()["kb"]
+    assert "study_abroad_programs" not in kb
+    assert list(kb) == ["visa_requirements", "application_guides", "tuition_programs"]
+    assert list(kb["visa_requirements"]) == COUNTRIES
+    assert kb["tuition_programs"] == KB["tuition_programs"]
+
+
+def test_generator_with_shards_does_not_load_the_kb(shard_urls, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "SHARD_URLS", shard_urls)
+    from src.ai_engine.response_generator import ResponseGenerator
+    generator = ResponseGenerator()
+    assert generator.search_index is None and generator.program_index is None
+    assert "study_abroad_programs" not in generator.kb
+    kb, _, _, _ = single_node()
+    assert generator.fragments.programs_default == RenderedFragments(kb).programs_default
+    candidates = generator._find_program_candidates({"country": "Kenya"})
+    assert [p["id"] for p in candidates] == [p["id"] for p in kb["study_abroad_programs"] if p["country"] == "Kenya"]
+    assert generator._handle_visa_info({"country": "uk"}).startswith("Visa: UK student visa")
+    facets = generator.faceted_search("", {"country": ["Kenya"], "category": ["study_abroad_programs"]})
+    assert facets["total"] == len(candidates)
+    generator.shards.close()
+
+
+def test_stats_are_counted_under_concurrency(coordinator):
+    def worker():
+        for _ in range(20):
+            coordinator.search("program")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert coordinator.stats == {"queries": 160, "partial": 0, "shard_failures": 0, "shard_timeouts": 0}
+
+
+def test_unreachable_shard_marks_result_partial(shard_urls):
+    coordinator = ShardCoordinator(shard_urls + ["http://127.0.0.1:9"], timeout=5.0)
+    result = coordinator.faceted_search("", {"country": ["USA"]})
+    coordinator.close()
+    assert result["partial"] and result["failed_shards"] == ["http://127.0.0.1:9"]
+    assert coordinator.stats["shard_failures"] == 1
+
+
+def test_generator_replies_hide_shard_urls(shard_urls, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "SHARD_URLS", shard_urls + ["http://127.0.0.1:9"])
+    monkeypatch.setattr(settings, "SHARD_TIMEOUT_MS", 5000)
+    from src.ai_engine.response_generator import ResponseGenerator
+    generator = ResponseGenerator()
+    bodies = [generator.search_knowledge_base_encoded("program"),
+              generator.faceted_search_encoded("", {"country": ["USA"]})]
+    generator.shards.close()
+    for body in bodies:
+        assert b'"partial":true' in body
+        assert b"failed_shards" not in body and b"127.0.0.1" not in body
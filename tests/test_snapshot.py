@@ -0,0 +1,31 @@
+import copy
+import numpy as np
+from src.knowledge_base.indexes import ProgramIndex
+from src.knowledge_base.snapshot import KnowledgeBaseSnapshot, build_snapshot, restore_program_index
+
+PROGRAMS = [{
+    "id": f"p{i}",
+    "country": "USA",
+    "tuition_fee": f"${5000 + (i * 997) % 40000}/year",
+    "deadline": f"{['January', 'March', 'June', 'November'][i % 4]} {1 + i % 28}",
+    "requirements": [f"GPA: {2.0 + (i % 5) * 0.4:.1f}+", "IELTS: 6.5"] if i % 3 else ["SAT: 1400"],
+} for i in range(300)]
+
+
+def test_restored_program_index_uses_mapped_arrays(tmp_path):
+    kb = {"study_abroad_programs": copy.deepcopy(PROGRAMS)}
+    build_snapshot(kb, tmp_path / "kb.snapshot", tuition_bands=[])
+    built = ProgramIndex(copy.deepcopy(PROGRAMS))
+    snapshot = KnowledgeBaseSnapshot(tmp_path / "kb.snapshot")
+    restored = restore_program_index(snapshot, snapshot.json("records")["study_abroad_programs"])
+
+    for index in [restored.fee_usd, restored.deadline_day] + list(restored.eligibility.tests.values()):
+        # Read-only views into the mapping, not copies
+        assert not index.keys.flags.owndata and not index.keys.flags.writeable
+        assert not index.positions.flags.owndata
+    assert restored.query(min_fee_usd=10000, max_fee_usd=20000) == built.query(min_fee_usd=10000, max_fee_usd=20000)
+    assert restored.query(deadline_start_day=330, deadline_days=90) == built.query(deadline_start_day=330,
+                                                                                   deadline_days=90)
+    for scores, strict in [({"GPA": 3.0}, False), ({"GPA": 3.0, "IELTS": 7}, True), ({"SAT": 1500}, True)]:
+        assert restored.eligibility.eligible(scores, strict) == built.eligibility.eligible(scores, strict)
+    assert isinstance(restored.fee_range(0, 1e9)[0], int)
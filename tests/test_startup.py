@@ -0,0 +1,62 @@
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from src.main import COMMAND_IMPORTS, OPTIONAL_COMMANDS, command_available, main
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = ("sklearn", "torch", "sentence_transformers", "transformers")
+
+
+def load_bench():
+    spec = importlib.util.spec_from_file_location("bench_startup", ROOT / "scripts" / "bench_startup.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+bench = load_bench()
+
+
+def imported_after(code):
+    """Top-level packages loaded by running ``code`` in a fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    out = subprocess.run([sys.executable, "-c", code + "; import sys; print(' '.join(sys.modules))"],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return {name.split(".", 1)[0] for name in out.split()}
+
+
+def test_importing_main_stays_light():
+    assert not imported_after("import src.main") & set(HEAVY)
+
+
+@pytest.mark.parametrize("command", sorted(set(COMMAND_IMPORTS) - OPTIONAL_COMMANDS))
+def test_command_modules_exist(command):
+    assert command_available(command)
+
+
+@pytest.mark.parametrize("command", sorted(COMMAND_IMPORTS))
+def test_command_within_startup_budget(command):
+    if not command_available(command):
+        pytest.skip(f"{command} is not part of this install")
+    result = bench.run(command, repeat=3)
+    if "error" in result:
+        missing = re.search(r"No module named '([\w.]+)'", result["error"])
+        # Only third-party packages may be missing, and only where requirements.txt isn't installed
+        if missing and missing.group(1).split(".", 1)[0] not in ("src", "config"):
+            pytest.skip(f"{missing.group(1)} is not installed")
+        pytest.fail(result["error"])
+    assert bench.budget_status(result, bench.load_budget()) == "ok", result["heaviest"][:3]
+
+
+def test_whatsapp_without_the_bot_module_is_a_usage_error(capsys):
+    if command_available("whatsapp"):
+        pytest.skip("WhatsApp bot is installed")
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--whatsapp"])
+    assert exit_info.value.code == 2
+    assert "src.whatsapp.whatsapp_bot" in capsys.readouterr().err
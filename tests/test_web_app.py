@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+from src.web.app import create_app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Empty working directory: no KB, feedback and escalations written under tmp_path
+    monkeypatch.chdir(tmp_path)
+    return create_app().test_client()
+
+
+@pytest.mark.parametrize("body", [[], ["message"], {"message": 5}, {"message": None}])
+def test_malformed_chat_bodies_get_a_json_error(client, body):
+    response = client.post("/api/chat", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_cheap_requests_leave_the_session_alone(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert "Set-Cookie" not in response.headers
+    assert "Cookie" not in response.headers.get("Vary", "")
+
+
+def test_client_id_is_issued_by_a_rate_limited_request(client):
+    assert "Set-Cookie" not in client.get("/health").headers
+    response = client.post("/api/chat", json={"message": "visa for USA"})
+    assert response.status_code == 200
+    with client.session_transaction() as session:
+        assert session["client_id"]